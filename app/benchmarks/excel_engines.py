@@ -0,0 +1,85 @@
+"""
+Compare the Excel readers on a generated student workbook.
+
+    python benchmarks/excel_engines.py --rows 500000
+
+Times the sheet/header listing, a full read with each available engine and a
+read of a few columns only, and checks that every engine returns the same frame.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from openpyxl import Workbook
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_engine.excel import CALAMINE_AVAILABLE, excel_outline, read_excel_fast
+
+COLUMNS = ["id_situation", "GenreFr", "cycle", "niveux", "LL_MIL", "ll_com", "NOM_ETABL", "Age",
+           "Internat", "Dar talib", "Programme Tayssir", "Fournitures scolaires",
+           "Transport scolaire", "Restauration", "Un million de cartables", "Observation"]
+SUBSET = ["id_situation", "GenreFr", "NOM_ETABL", "Age"]
+
+
+def generate_workbook(rows, seed=0):
+    """Build an in-memory .xlsx with one student per row"""
+    rng = np.random.default_rng(seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("eleves")
+    sheet.append(COLUMNS)
+    communes = [f"Commune {i}" for i in range(200)]
+    for i in range(rows):
+        commune = int(rng.integers(len(communes)))
+        sheet.append([
+            int(rng.integers(1, 6)), "F" if rng.random() < 0.5 else "M",
+            "Primaire", f"Niveau {int(rng.integers(1, 7))}",
+            "Urbain" if rng.random() < 0.6 else "Rural", communes[commune],
+            f"Etablissement {commune}-{int(rng.integers(40))}", int(rng.integers(6, 20)),
+            *(int(flag) for flag in rng.random(7) < 0.2), f"ligne {i}",
+        ])
+    workbook.create_sheet("notes").append(["commentaire"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<40} {time.perf_counter() - start:8.2f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    workbook = timed(f"génération ({args.rows:,} lignes)", lambda: generate_workbook(args.rows))
+    print(f"{'taille du classeur':<40} {workbook.getbuffer().nbytes / 1024 ** 2:8.1f} Mo")
+
+    outline = timed("feuilles et en-têtes (openpyxl read-only)", lambda: excel_outline(workbook))
+    assert outline["eleves"]["columns"] == COLUMNS
+
+    engines = ["openpyxl"] + (["calamine"] if CALAMINE_AVAILABLE else [])
+    frames = {}
+    for engine in engines:
+        frames[engine] = timed(f"lecture complète ({engine})", lambda: read_excel_fast(workbook, "eleves", engine=engine))
+        timed(f"lecture de {len(SUBSET)} colonnes ({engine})",
+              lambda: read_excel_fast(workbook, "eleves", usecols=SUBSET, engine=engine))
+
+    reference = frames["openpyxl"]
+    for engine, frame in frames.items():
+        assert frame.shape == reference.shape, engine
+        assert (frame.to_numpy() == reference.to_numpy()).all(), engine
+    if not CALAMINE_AVAILABLE:
+        print("python-calamine n'est pas installé (ou pandas < 2.2) : seul openpyxl est mesuré")
+
+
+if __name__ == "__main__":
+    main()
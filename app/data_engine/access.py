@@ -0,0 +1,472 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+try:
+    import pyodbc
+except ImportError:
+    # Sous Linux sans unixODBC, les bases sont lues avec mdb-tools
+    pyodbc = None
+
+from data_engine.cache import load_dataset, store_dataset
+from data_engine.compaction import compact_dataframe, dataframe_memory
+from data_engine.ingestion import concat_aligned
+
+# Pilote ODBC des bases Access
+ACCESS_DRIVER = os.environ.get("ESTK_ACCESS_DRIVER", "Microsoft Access Driver (*.mdb, *.accdb)")
+# Nombre de connexions inactives gardées ouvertes par base
+ACCESS_POOL_SIZE = int(os.environ.get("ESTK_ACCESS_POOL_SIZE", 4))
+# Mémoire maximale des tables gardées en mémoire (au-delà, elles sont relues depuis le cache Parquet)
+ACCESS_TABLE_CACHE_MAX_BYTES = int(os.environ.get("ESTK_ACCESS_TABLE_CACHE_MAX_BYTES", 1024 ** 3))
+# Dossier des bases converties en Parquet (un sous-dossier par fichier téléchargé)
+ACCESS_STORE_DIR = os.environ.get(
+    "ESTK_ACCESS_STORE_DIR", os.path.join(tempfile.gettempdir(), "estk_access_store")
+)
+# Taille maximale du dossier avant suppression des conversions les moins récemment utilisées
+ACCESS_STORE_MAX_BYTES = int(os.environ.get("ESTK_ACCESS_STORE_MAX_BYTES", 20 * 1024 ** 3))
+# Nombre de lignes lues par bloc (conversion et lecture des tables)
+ACCESS_CHUNK_ROWS = int(os.environ.get("ESTK_ACCESS_CHUNK_ROWS", 100_000))
+# Format des dates écrites par mdb-export (reconnu ensuite par l'inférence de schéma)
+MDB_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+MANIFEST_NAME = "manifest.json"
+
+logger = logging.getLogger(__name__)
+
+# Pools de connexions : chemin de la base -> ConnectionPool
+_pools = {}
+# Tables lues, de la moins récemment utilisée à la plus récente : clé -> (DataFrame, taille)
+_tables = OrderedDict()
+# Colonnes des tables (métadonnées seules) : version du fichier et table -> colonnes
+_catalog = {}
+# Bases converties : chemin de la base -> dossier des fichiers Parquet
+_converted = {}
+_size = 0
+_stats = {"memory_hits": 0, "disk_hits": 0, "reads": 0}
+_lock = threading.Lock()
+
+
+def connection_string(db_path):
+    """ODBC connection string of an Access database file"""
+    return f"DRIVER={{{ACCESS_DRIVER}}};DBQ={db_path}"
+
+
+class ConnectionPool:
+    """Open connections to one Access database, reused between reads and sessions"""
+
+    def __init__(self, db_path, size=None):
+        self.db_path = db_path
+        self.size = ACCESS_POOL_SIZE if size is None else size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a connection (opened if none is idle); it returns to the pool after use"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = pyodbc.connect(connection_string(self.db_path))
+        try:
+            yield conn
+        except BaseException:
+            # Connexion peut-être inutilisable après une erreur (ou lecture abandonnée) : elle n'est pas remise dans le pool
+            conn.close()
+            raise
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        """Close the idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            try:
+                conn.close()
+            except pyodbc.Error:
+                pass
+
+
+def get_pool(db_path):
+    """Connection pool of the database at db_path"""
+    with _lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = ConnectionPool(db_path)
+        return pool
+
+
+def close_pool(db_path):
+    """Close the pooled connections of a database (before deleting or replacing the file)"""
+    with _lock:
+        pool = _pools.pop(db_path, None)
+    if pool is not None:
+        pool.close()
+
+
+def _file_version(db_path):
+    # Chemin, date de modification et taille : une base modifiée donne de nouvelles clés
+    stat = os.stat(db_path)
+    return f"{os.path.abspath(db_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+
+
+def table_key(db_path, table, columns=None):
+    """
+    Cache key of a table (or of some of its columns), derived from the path and
+    modification time of the database
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"access|{_file_version(db_path)}|{table}".encode())
+    if columns is not None:
+        digest.update(("|" + "|".join(columns)).encode())
+    return digest.hexdigest()
+
+
+def _remember(key, df):
+    global _size
+    size = dataframe_memory(df)
+    with _lock:
+        if key in _tables:
+            return
+        _tables[key] = (df, size)
+        _size += size
+        while _size > ACCESS_TABLE_CACHE_MAX_BYTES and len(_tables) > 1:
+            _, (_, evicted_size) = _tables.popitem(last=False)
+            _size -= evicted_size
+
+
+def access_backend():
+    """
+    How Access databases are read: "odbc" with the Microsoft Access ODBC driver,
+    "mdbtools" with the mdb-tools programs (Linux), None when neither is installed.
+    """
+    if pyodbc is not None and ACCESS_DRIVER in pyodbc.drivers():
+        return "odbc"
+    if shutil.which("mdb-export") and shutil.which("mdb-tables"):
+        return "mdbtools"
+    return None
+
+
+def _require_backend():
+    backend = access_backend()
+    if backend is None:
+        raise RuntimeError("Ni le pilote ODBC Microsoft Access ni mdb-tools ne sont installés")
+    return backend
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _converted_manifest(db_path):
+    with _lock:
+        directory = _converted.get(os.path.abspath(db_path))
+    if directory is None:
+        return None, None
+    manifest = _read_manifest(directory)
+    # Conversion supprimée entre-temps (éviction) : retour à la base
+    return (directory, manifest) if manifest else (None, None)
+
+
+def _mdb_tables(db_path):
+    output = subprocess.run(["mdb-tables", "-1", db_path], capture_output=True, text=True, check=True).stdout
+    return [line.strip() for line in output.splitlines() if line.strip()]
+
+
+def _mdb_chunks(db_path, table, chunk_rows, columns=None, nrows=None):
+    # Table exportée en CSV par mdb-export et lue par blocs au fil de l'export
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            ["mdb-export", "-D", MDB_DATE_FORMAT, "-b", "strip", db_path, table],
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+        )
+        completed = False
+        try:
+            yield from pd.read_csv(process.stdout, chunksize=chunk_rows, usecols=columns, nrows=nrows)
+            completed = nrows is None
+        finally:
+            # Lecture arrêtée avant la fin : mdb-export s'arrête à la fermeture du tube
+            process.stdout.close()
+            returncode = process.wait()
+        if completed and returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode(errors="replace").strip()
+            raise RuntimeError(f"mdb-export {table} : {message or returncode}")
+
+
+def _quote(name):
+    return "[" + str(name).replace("]", "]]") + "]"
+
+
+def _database_chunks(db_path, table, columns=None, chunk_rows=None):
+    chunk_rows = chunk_rows or ACCESS_CHUNK_ROWS
+    if _require_backend() == "mdbtools":
+        yield from _mdb_chunks(db_path, table, chunk_rows, columns)
+        return
+    projection = "*" if columns is None else ", ".join(_quote(col) for col in columns)
+    with get_pool(db_path).connection() as conn:
+        yield from pd.read_sql(f"SELECT {projection} FROM {_quote(table)}", conn, chunksize=chunk_rows)
+
+
+def table_chunks(db_path, table, columns=None, chunk_rows=None):
+    """
+    Rows of a table (or of some of its columns) by chunks of DataFrames, read
+    from the database, or from the Parquet files (one chunk per file) when the
+    database was converted.
+    """
+    directory, manifest = _converted_manifest(db_path)
+    if manifest is None:
+        yield from _database_chunks(db_path, table, columns, chunk_rows)
+        return
+    for part in manifest["tables"][table]["parts"]:
+        yield pd.read_parquet(os.path.join(directory, part), columns=columns)
+
+
+def list_tables(db_path):
+    """Names of the user tables of the database"""
+    _, manifest = _converted_manifest(db_path)
+    if manifest is not None:
+        return list(manifest["tables"])
+    if _require_backend() == "mdbtools":
+        return _mdb_tables(db_path)
+    with get_pool(db_path).connection() as conn:
+        return [table.table_name for table in conn.cursor().tables(tableType="TABLE")]
+
+
+def table_columns(db_path, table):
+    """
+    Columns of a table as a list of {"name", "type", "nullable"}, read from the
+    database metadata (ODBC catalog) without fetching any row. A converted
+    database answers from its manifest; with mdb-tools the types are inferred
+    from the first rows.
+    """
+    _, manifest = _converted_manifest(db_path)
+    if manifest is not None:
+        return manifest["tables"][table]["columns"]
+
+    key = (_file_version(db_path), table)
+    with _lock:
+        columns = _catalog.get(key)
+    if columns is None:
+        if _require_backend() == "mdbtools":
+            chunks = _mdb_chunks(db_path, table, 1000, nrows=1000)
+            with contextlib.closing(chunks):
+                sample = next(chunks, pd.DataFrame())
+            columns = [{"name": col, "type": str(dtype), "nullable": True} for col, dtype in sample.dtypes.items()]
+        else:
+            with get_pool(db_path).connection() as conn:
+                columns = [
+                    {"name": column.column_name, "type": column.type_name, "nullable": bool(column.nullable)}
+                    for column in conn.cursor().columns(table=table)
+                ]
+        with _lock:
+            _catalog[key] = columns
+    return columns
+
+
+def _read_converted(directory, entry, columns=None):
+    frames = [
+        (part, pd.read_parquet(os.path.join(directory, part), columns=columns))
+        for part in entry["parts"]
+    ]
+    if not frames:
+        return pd.DataFrame(columns=columns or [column["name"] for column in entry["columns"]])
+    if len(frames) == 1:
+        return frames[0][1]
+    # Types pouvant différer d'un bloc à l'autre (entiers puis valeurs manquantes...) : alignés à la concaténation
+    return concat_aligned(frames, source_column=None)
+
+
+def read_table(db_path, table, columns=None):
+    """
+    Content of an Access table (or only of the given columns), as a compacted
+    DataFrame. Only the requested columns are fetched from the database, or
+    read from the Parquet files when the database was converted.
+    Reads are cached in memory and on disk (Parquet) under a key that changes
+    when the database file is modified, so repeated reads never reach the
+    driver; a column selection is cut from the whole table when it is cached.
+    The frame is shared and must not be modified in place: a shallow copy is
+    returned.
+    """
+    columns = list(columns) if columns is not None else None
+    key = table_key(db_path, table, columns)
+    with _lock:
+        entry = _tables.get(key)
+        if entry is None and columns is not None:
+            full_key = table_key(db_path, table)
+            full = _tables.get(full_key)
+            if full is not None and all(col in full[0].columns for col in columns):
+                _tables.move_to_end(full_key)
+                _stats["memory_hits"] += 1
+                return full[0][columns]
+        if entry is not None:
+            _tables.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return entry[0].copy(deep=False)
+
+    directory, manifest = _converted_manifest(db_path)
+    if manifest is not None:
+        df, _ = compact_dataframe(_read_converted(directory, manifest["tables"][table], columns))
+        with _lock:
+            _stats["disk_hits"] += 1
+    else:
+        df = load_dataset(key)
+        if df is not None:
+            with _lock:
+                _stats["disk_hits"] += 1
+        else:
+            chunks = list(_database_chunks(db_path, table, columns))
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+            df, _ = compact_dataframe(df)
+            store_dataset(key, df)
+            with _lock:
+                _stats["reads"] += 1
+    _remember(key, df)
+    return df.copy(deep=False)
+
+
+def _attach_converted(db_path, directory):
+    with _lock:
+        _converted[os.path.abspath(db_path)] = directory
+    # La date du manifeste sert d'horodatage LRU pour l'éviction
+    os.utime(os.path.join(directory, MANIFEST_NAME), None)
+
+
+def convert_database(db_path, source_key, progress_callback=None, chunk_rows=None):
+    """
+    Convert every table of an Access database to Parquet files under
+    ACCESS_STORE_DIR/source_key (source_key: fingerprint of the upload).
+    Each table is streamed by chunks of rows, one Parquet file per chunk, so
+    the memory used stays bounded whatever the size of the table. Afterwards
+    list_tables, table_columns and read_table use these files instead of the
+    database. An upload already converted is not read again.
+
+    progress_callback, when given, is called after each chunk with a dict
+    containing table, rows, tables_done and tables_total (an exception it
+    raises stops the conversion).
+    Returns the report of each table (rows, seconds, rows_per_sec, size_bytes,
+    mb_per_sec), also written to the log.
+    """
+    directory = os.path.join(ACCESS_STORE_DIR, source_key)
+    manifest = _read_manifest(directory)
+    if manifest:
+        _attach_converted(db_path, directory)
+        return manifest["report"]
+
+    backend = _require_backend()
+    tables = list_tables(db_path)
+    os.makedirs(ACCESS_STORE_DIR, exist_ok=True)
+    tmp_dir = f"{directory}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    entries = {}
+    report = []
+    try:
+        for position, table in enumerate(tables):
+            start = time.perf_counter()
+            parts = []
+            columns = []
+            rows = 0
+            size = 0
+            for chunk in _database_chunks(db_path, table, chunk_rows=chunk_rows):
+                if not parts:
+                    columns = [{"name": col, "type": str(dtype), "nullable": True} for col, dtype in chunk.dtypes.items()]
+                # Noms de fichiers indépendants du nom de la table (espaces, accents...)
+                part = f"{position:04d}-{len(parts):05d}.parquet"
+                chunk.to_parquet(os.path.join(tmp_dir, part), index=False)
+                parts.append(part)
+                rows += len(chunk)
+                size += os.path.getsize(os.path.join(tmp_dir, part))
+                if progress_callback is not None:
+                    progress_callback({
+                        "table": table,
+                        "rows": rows,
+                        "tables_done": position,
+                        "tables_total": len(tables),
+                    })
+
+            seconds = time.perf_counter() - start
+            entries[table] = {"parts": parts, "columns": columns, "rows": rows}
+            report.append({
+                "table": table,
+                "rows": rows,
+                "seconds": seconds,
+                "rows_per_sec": rows / seconds if seconds > 0 else 0.0,
+                "size_bytes": size,
+                "mb_per_sec": size / seconds / 1024 ** 2 if seconds > 0 else 0.0,
+            })
+            logger.info(
+                "Access -> Parquet (%s) %s : %d lignes en %.2f s (%.0f lignes/s, %.1f Mo/s)",
+                backend, table, rows, seconds, report[-1]["rows_per_sec"], report[-1]["mb_per_sec"],
+            )
+
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+            json.dump({"backend": backend, "tables": entries, "report": report}, f)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # Même fichier converti en parallèle par une autre session : sa conversion est gardée
+            if not _read_manifest(directory):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _attach_converted(db_path, directory)
+    evict_converted(keep=directory)
+    return _read_manifest(directory)["report"]
+
+
+def evict_converted(max_bytes=None, keep=None):
+    """Remove the least recently used converted databases until the store fits in max_bytes"""
+    max_bytes = ACCESS_STORE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    for name in os.listdir(ACCESS_STORE_DIR):
+        directory = os.path.join(ACCESS_STORE_DIR, name)
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            continue
+        size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        total += size
+        if directory != keep:
+            entries.append((os.path.getmtime(manifest_path), size, directory))
+
+    for _, size, directory in sorted(entries):
+        if total <= max_bytes:
+            break
+        with _lock:
+            for db_path in [db_path for db_path, converted in _converted.items() if converted == directory]:
+                del _converted[db_path]
+        shutil.rmtree(directory, ignore_errors=True)
+        total -= size
+
+
+def access_cache_stats():
+    """Hit counters and memory of the Access table cache"""
+    with _lock:
+        stats = dict(_stats)
+        stats["tables"] = len(_tables)
+        stats["size_bytes"] = _size
+        stats["pools"] = {db_path: len(pool._idle) for db_path, pool in _pools.items()}
+    stats["max_bytes"] = ACCESS_TABLE_CACHE_MAX_BYTES
+    return stats
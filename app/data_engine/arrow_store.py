@@ -0,0 +1,146 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Dossier des fichiers Arrow IPC mappés en mémoire (partagés par tous les processus du serveur)
+ARROW_STORE_DIR = os.environ.get(
+    "ESTK_ARROW_STORE_DIR", os.path.join(tempfile.gettempdir(), "estk_arrow_store")
+)
+# Taille maximale du dossier avant suppression des fichiers les moins récemment ouverts
+ARROW_STORE_MAX_BYTES = int(os.environ.get("ESTK_ARROW_STORE_MAX_BYTES", 50 * 1024 ** 3))
+
+# Le type "str" de pandas 3 accepte des données Arrow sans copie et reste vu comme du texte
+# par select_dtypes ; avec pandas 2 le texte est converti en colonnes object
+ZERO_COPY_STRINGS = int(pd.__version__.split(".")[0]) >= 3
+
+# Zones mémoire des fichiers mappés : chemin -> (adresse, taille)
+_mapped = {}
+_lock = threading.Lock()
+
+
+def _types_mapper(arrow_type):
+    # Colonnes numériques et texte : tableaux pandas adossés directement aux tampons mappés
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_boolean(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    if ZERO_COPY_STRINGS and (pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)):
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    # Catégories (dictionnaires), dates... : conversion pandas habituelle
+    return None
+
+
+def _path(key):
+    return os.path.join(ARROW_STORE_DIR, f"{key}.arrow")
+
+
+def arrow_table(df):
+    """Arrow table of df, with text stored as large_string (the type open_mapped reads without copy)"""
+    table = pa.Table.from_pandas(df)
+    fields = [
+        field.with_type(pa.large_string()) if pa.types.is_string(field.type) else field
+        for field in table.schema
+    ]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def write_arrow(df, path):
+    """Write df as an uncompressed Arrow IPC (Feather v2) file, atomically"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        feather.write_feather(arrow_table(df), tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def open_mapped(path):
+    """
+    DataFrame whose numeric and text columns are views of the memory-mapped file.
+    Nothing is read up front: the OS pages in the parts of the columns that are
+    actually used, and processes mapping the same file share the page cache.
+    """
+    buffer = pa.memory_map(path, "r").read_buffer()
+    with _lock:
+        _mapped[path] = (buffer.address, buffer.size)
+    table = pa.ipc.open_file(buffer).read_all()
+    # La date d'accès sert d'horodatage LRU pour l'éviction
+    os.utime(path, None)
+    return table.to_pandas(types_mapper=_types_mapper)
+
+
+def load_mapped(key):
+    """Memory-mapped DataFrame stored under key, or None when there is none"""
+    path = _path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        return open_mapped(path)
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def map_dataset(key, df):
+    """
+    Memory-mapped version of df, stored under key (the content fingerprint).
+    The file is only written when it does not exist yet, so sessions and
+    processes loading the same file map the same bytes.
+    """
+    os.makedirs(ARROW_STORE_DIR, exist_ok=True)
+    path = _path(key)
+    if not os.path.exists(path):
+        write_arrow(df, path)
+        evict_arrow_files(keep=path)
+    return open_mapped(path)
+
+
+def mapped_path(key):
+    """Path of the Arrow file stored under key, or None when there is none"""
+    path = _path(key)
+    return path if os.path.exists(path) else None
+
+
+def is_memory_mapped(series):
+    """True when all the data buffers of series live in a mapped file (not in process memory)"""
+    if not hasattr(series.array, "__arrow_array__"):
+        return False
+    with _lock:
+        ranges = list(_mapped.values())
+    for chunk in series.array.__arrow_array__().chunks:
+        for buffer in chunk.buffers():
+            if buffer is None:
+                continue
+            if not any(start <= buffer.address < start + size for start, size in ranges):
+                return False
+    return True
+
+
+def evict_arrow_files(max_bytes=None, keep=None):
+    """Remove the least recently opened files until the store fits in max_bytes"""
+    max_bytes = ARROW_STORE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for name in os.listdir(ARROW_STORE_DIR):
+        path = os.path.join(ARROW_STORE_DIR, name)
+        if name.endswith(".arrow") and path != keep:
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    if keep is not None and os.path.exists(keep):
+        total += os.path.getsize(keep)
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            # Un fichier encore mappé par une session ne peut pas être supprimé sous Windows
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
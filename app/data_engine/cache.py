@@ -0,0 +1,189 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Dossier du cache disque des jeux de données (survit aux redémarrages du serveur)
+DATASET_CACHE_DIR = os.environ.get(
+    "ESTK_DATASET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "estk_dataset_cache")
+)
+# Taille maximale du cache avant éviction des entrées les moins récemment utilisées
+DATASET_CACHE_MAX_BYTES = int(os.environ.get("ESTK_DATASET_CACHE_MAX_BYTES", 5 * 1024 ** 3))
+# Taille des blocs lus pour calculer l'empreinte d'un fichier
+FINGERPRINT_BLOCK_SIZE = 8 * 1024 * 1024
+# Empreintes de contenu gardées par envoi (file_id) : un rerun ne relit pas le fichier
+FINGERPRINT_MEMO_SIZE = 256
+
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_lock = threading.Lock()
+_content_digests = OrderedDict()
+
+
+def _content_digest(file):
+    # Contenu entier haché par blocs (blake2b), la position de lecture est rétablie
+    position = file.tell()
+    file.seek(0, 2)
+    size = file.tell()
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+
+    file.seek(0)
+    while True:
+        block = file.read(FINGERPRINT_BLOCK_SIZE)
+        if not block:
+            break
+        digest.update(block)
+
+    file.seek(position)
+    return digest.hexdigest()
+
+
+def fingerprint_file(file, variant=""):
+    """
+    Compute the content fingerprint of an uploaded file.
+    The whole content is hashed: two extracts of the same size differing by a
+    single digit get different fingerprints, so a cached parse is never served
+    for changed data. The content hash is computed once per upload (Streamlit
+    file_id) and reused on later reruns. variant distinguishes different
+    parsings of the same bytes (reader, sheet, selected columns...).
+    """
+    file_id = getattr(file, "file_id", None)
+    content = None
+    if file_id is not None:
+        with _lock:
+            content = _content_digests.get(file_id)
+            if content is not None:
+                _content_digests.move_to_end(file_id)
+    if content is None:
+        content = _content_digest(file)
+        if file_id is not None:
+            with _lock:
+                _content_digests[file_id] = content
+                while len(_content_digests) > FINGERPRINT_MEMO_SIZE:
+                    _content_digests.popitem(last=False)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(content.encode())
+    digest.update(variant.encode())
+    return digest.hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(DATASET_CACHE_DIR, f"{key}.parquet")
+
+
+def load_dataset(key):
+    """Return the cached DataFrame for key, or None on a miss"""
+    path = _entry_path(key)
+    if not os.path.exists(path):
+        with _lock:
+            _stats["misses"] += 1
+        return None
+
+    try:
+        df = pd.read_parquet(path)
+    except Exception:
+        # Entrée corrompue (écriture interrompue, version de pyarrow...) : on la supprime
+        _remove(path)
+        with _lock:
+            _stats["misses"] += 1
+        return None
+
+    # La date de modification sert d'horodatage LRU
+    os.utime(path, None)
+    with _lock:
+        _stats["hits"] += 1
+    return df
+
+
+def store_dataset(key, df):
+    """
+    Write df to the cache as a Parquet file, then evict old entries if needed.
+    Returns False when the frame cannot be stored (mixed-type object columns...).
+    """
+    os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        _remove(tmp_path)
+        return False
+
+    with _lock:
+        _stats["writes"] += 1
+    evict_datasets()
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _entries():
+    """List cache entries as (path, size, last_used) tuples"""
+    if not os.path.isdir(DATASET_CACHE_DIR):
+        return []
+    entries = []
+    for name in os.listdir(DATASET_CACHE_DIR):
+        if not name.endswith(".parquet"):
+            continue
+        path = os.path.join(DATASET_CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((path, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def evict_datasets(max_bytes=None):
+    """Remove least recently used entries until the cache fits in max_bytes"""
+    max_bytes = DATASET_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = sorted(_entries(), key=lambda entry: entry[2])
+    total = sum(size for _, size, _ in entries)
+    for path, size, _ in entries:
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+        with _lock:
+            _stats["evictions"] += 1
+
+
+def cached_read(file, reader, variant=""):
+    """
+    Load an uploaded file through the dataset cache.
+    reader(file) is only called on a miss; its result is then stored for the next upload.
+    """
+    key = fingerprint_file(file, variant)
+    df = load_dataset(key)
+    if df is not None:
+        return df
+
+    file.seek(0)
+    df = reader(file)
+    if df is not None:
+        store_dataset(key, df)
+    return df
+
+
+def cache_stats():
+    """Return hit/miss counters and the current size of the dataset cache"""
+    entries = _entries()
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["entries"] = len(entries)
+    stats["size_bytes"] = sum(size for _, size, _ in entries)
+    stats["max_bytes"] = DATASET_CACHE_MAX_BYTES
+    return stats
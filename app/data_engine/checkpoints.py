@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pyarrow.feather as feather
+
+from data_engine.arrow_store import arrow_table, mapped_path, open_mapped
+from data_engine.spill import SpilledFrame
+
+# Dossier des points de sauvegarde des jeux de données de chaque utilisateur (un sous-dossier par utilisateur)
+CHECKPOINT_DIR = os.environ.get(
+    "ESTK_CHECKPOINT_DIR", os.path.join(tempfile.gettempdir(), "estk_checkpoints")
+)
+# Durée de conservation d'un point de sauvegarde non réécrit
+CHECKPOINT_RETENTION_DAYS = float(os.environ.get("ESTK_CHECKPOINT_RETENTION_DAYS", 7))
+# Taille maximale de l'ensemble des points de sauvegarde (les plus anciens sont supprimés d'abord)
+CHECKPOINT_MAX_BYTES = int(os.environ.get("ESTK_CHECKPOINT_MAX_BYTES", 20 * 1024 ** 3))
+
+MANIFEST_NAME = "manifest.json"
+
+_lock = threading.Lock()
+# Écritures en attente du thread d'écriture : (utilisateur, clé) -> (df, nom, clé du magasin Arrow)
+_pending = {}
+# Numéro de la dernière demande (écriture ou suppression) de chaque (utilisateur, clé)
+_generations = {}
+_writer_lock = threading.Condition()
+_writer = None
+
+
+class CheckpointFrame(SpilledFrame):
+    """Placeholder for a checkpointed DataFrame, memory-mapped on first access"""
+
+    def load(self):
+        """
+        The frame with its numeric and text columns as zero-copy views of the
+        uncompressed Arrow file (see arrow_store.open_mapped)
+        """
+        return open_mapped(self.path)
+
+
+def _user_dir(username):
+    # Nom de dossier dérivé du nom d'utilisateur (pas de caractères spéciaux dans le chemin)
+    digest = hashlib.blake2b(str(username).encode(), digest_size=8).hexdigest()
+    return os.path.join(CHECKPOINT_DIR, digest)
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def _link(source, tmp_path):
+    # Fichier du magasin Arrow réutilisé tel quel (lien physique) : aucune donnée réécrite
+    source = mapped_path(source) if source is not None else None
+    if source is None:
+        return False
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        return False
+    return True
+
+
+def save_checkpoint(username, key, df, name="", source=None):
+    """
+    Checkpoint df as the user's dataset key ("df", "df_filtered", "df_merged").
+    The frame is written as an uncompressed Arrow IPC (Feather) file so it can be
+    memory-mapped back. When source, the key of df in the Arrow store (see
+    arrow_store.map_dataset), names an existing file, that file is linked
+    instead of written again. Returns False when it cannot be written.
+    """
+    directory = _user_dir(username)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{key}.arrow")
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if not _link(source, tmp_path):
+            table = arrow_table(df)
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+    with _lock:
+        manifest = _read_manifest(directory)
+        manifest[key] = {
+            "name": name,
+            "rows": len(df),
+            "size_bytes": os.path.getsize(path),
+            "saved_at": time.time(),
+        }
+        _write_manifest(directory, manifest)
+    return True
+
+
+def _write_pending():
+    global _writer
+    while True:
+        with _writer_lock:
+            if not _pending:
+                _writer = None
+                _writer_lock.notify_all()
+                return
+            entry = next(iter(_pending))
+            df, name, source = _pending.pop(entry)
+            generation = _generations[entry]
+        username, key = entry
+        save_checkpoint(username, key, df, name, source)
+        with _writer_lock:
+            # Supprimé pendant l'écriture : le fichier écrit est périmé
+            stale = _generations[entry] != generation and entry not in _pending
+        if stale:
+            remove_checkpoint(username, key)
+
+
+def schedule_checkpoint(username, key, df, name="", source=None):
+    """
+    Checkpoint df (see save_checkpoint) on the background writer thread, so the
+    caller does not wait for the file to be written. A newer request for the
+    same user and key replaces a write that has not started yet.
+    """
+    global _writer
+    with _writer_lock:
+        _pending[(username, key)] = (df, name, source)
+        _generations[(username, key)] = _generations.get((username, key), 0) + 1
+        if _writer is None:
+            _writer = threading.Thread(target=_write_pending, name="checkpoint-writer", daemon=True)
+            _writer.start()
+
+
+def flush_checkpoints(timeout=None):
+    """Wait until the scheduled checkpoints are written; returns False on timeout"""
+    with _writer_lock:
+        return _writer_lock.wait_for(lambda: _writer is None, timeout)
+
+
+def remove_checkpoint(username, key):
+    """Delete one checkpointed dataset of the user (and cancel its pending write)"""
+    with _writer_lock:
+        _pending.pop((username, key), None)
+        _generations[(username, key)] = _generations.get((username, key), 0) + 1
+    directory = _user_dir(username)
+    with _lock:
+        manifest = _read_manifest(directory)
+        manifest.pop(key, None)
+        try:
+            os.remove(os.path.join(directory, f"{key}.arrow"))
+        except OSError:
+            pass
+        if os.path.isdir(directory):
+            _write_manifest(directory, manifest)
+
+
+def restore_checkpoints(username):
+    """
+    The user's checkpointed datasets as {key: CheckpointFrame}; nothing is read
+    until a placeholder is loaded. Also returns the manifest (name, rows, date per key).
+    """
+    directory = _user_dir(username)
+    manifest = _read_manifest(directory)
+    frames = {}
+    for key, entry in manifest.items():
+        path = os.path.join(directory, f"{key}.arrow")
+        if os.path.exists(path):
+            frames[key] = CheckpointFrame(path, entry["rows"], entry["size_bytes"])
+    return frames, manifest
+
+
+def prune_checkpoints(retention_days=None, max_bytes=None):
+    """
+    Apply the retention policy: delete checkpoints older than retention_days,
+    then the oldest ones while the total exceeds max_bytes.
+    Returns the number of checkpoints removed.
+    """
+    retention_days = CHECKPOINT_RETENTION_DAYS if retention_days is None else retention_days
+    max_bytes = CHECKPOINT_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(CHECKPOINT_DIR):
+        return 0
+
+    entries = []
+    with _lock:
+        for user in os.listdir(CHECKPOINT_DIR):
+            directory = os.path.join(CHECKPOINT_DIR, user)
+            manifest = _read_manifest(directory)
+            for key, entry in manifest.items():
+                entries.append((entry["saved_at"], entry["size_bytes"], directory, key))
+
+    removed = 0
+    limit = time.time() - retention_days * 24 * 3600
+    total = sum(size for _, size, _, _ in entries)
+    for saved_at, size, directory, key in sorted(entries):
+        if saved_at >= limit and total <= max_bytes:
+            break
+        with _lock:
+            manifest = _read_manifest(directory)
+            manifest.pop(key, None)
+            try:
+                os.remove(os.path.join(directory, f"{key}.arrow"))
+            except OSError:
+                pass
+            if manifest:
+                _write_manifest(directory, manifest)
+            else:
+                shutil.rmtree(directory, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
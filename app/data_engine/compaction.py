@@ -0,0 +1,61 @@
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_object_dtype, is_string_dtype
+
+# Une colonne texte devient catégorielle si elle a au plus cette proportion de valeurs distinctes
+CATEGORY_MAX_RATIO = 0.5
+
+
+def dataframe_memory(df):
+    """Return the memory used by df in bytes, counting the content of text columns"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compact_dataframe(df, category_max_ratio=CATEGORY_MAX_RATIO):
+    """
+    Shrink the in-memory representation of df without changing its values.
+
+    - repeated text columns (commune, etab, genre, milieu...) become categoricals
+    - integer columns are downcast to the smallest type holding their range
+      (situation, age and the 0/1 aid flags end up as int8)
+    Float columns are kept in float64 so displayed values are unchanged.
+
+    Returns the compacted frame (columns are replaced, df itself is not modified)
+    and a report dict with the memory before/after and the converted columns.
+    """
+    before = dataframe_memory(df)
+    compacted = {}
+    conversions = {}
+
+    for col in df.columns:
+        series = df[col]
+        if is_bool_dtype(series):
+            continue
+
+        if is_integer_dtype(series) and not isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            new_series = pd.to_numeric(series, downcast="integer")
+        elif is_object_dtype(series) or is_string_dtype(series):
+            non_null = series.dropna()
+            if not len(non_null) or non_null.nunique() > category_max_ratio * len(non_null):
+                continue
+            new_series = series.astype("category")
+        else:
+            continue
+
+        if new_series.dtype != series.dtype:
+            compacted[col] = new_series
+            conversions[col] = (str(series.dtype), str(new_series.dtype))
+
+    if compacted:
+        df = df.copy(deep=False)
+        for col, series in compacted.items():
+            df[col] = series
+
+    after = dataframe_memory(df)
+    report = {
+        "before": before,
+        "after": after,
+        "ratio": before / after if after else 1.0,
+        "conversions": conversions,
+    }
+    return df, report
+
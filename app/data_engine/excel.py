@@ -0,0 +1,65 @@
+import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    import python_calamine  # noqa: F401
+    # Le moteur "calamine" de read_excel existe à partir de pandas 2.2
+    CALAMINE_AVAILABLE = tuple(int(part) for part in pd.__version__.split(".")[:2]) >= (2, 2)
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# Moteur de lecture des classeurs : calamine (Rust) si disponible, sinon openpyxl
+EXCEL_ENGINE = "calamine" if CALAMINE_AVAILABLE else "openpyxl"
+
+
+def excel_outline(file):
+    """
+    Sheets of a workbook with their header row and approximate number of rows,
+    as {sheet: {"columns": [...], "rows": n}}.
+    openpyxl in read-only mode streams the sheet XML, so only the first row of
+    each sheet is parsed whatever the size of the workbook.
+    """
+    file.seek(0)
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        outline = {}
+        for sheet in workbook.worksheets:
+            header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+            # max_row vient de la dimension enregistrée dans le fichier (peut manquer)
+            rows = sheet.max_row - 1 if sheet.max_row else None
+            outline[sheet.title] = {
+                "columns": [str(value) for value in header if value is not None],
+                "rows": rows,
+            }
+        return outline
+    finally:
+        workbook.close()
+        file.seek(0)
+
+
+def excel_variant(sheet_name=0, usecols=None):
+    """Dataset cache variant of a sheet and column selection"""
+    columns = ",".join(usecols) if usecols else "*"
+    return f"xlsx:{sheet_name}:{columns}"
+
+
+def read_excel_fast(file, sheet_name=0, usecols=None, engine=None):
+    """
+    Read one sheet (and optionally only some columns, by header name or with a
+    callable testing each header) of a workbook.
+    Uses the calamine engine when available and falls back to openpyxl if it
+    cannot read the file. Selected columns missing from the sheet are ignored.
+    """
+    engine = engine or EXCEL_ENGINE
+    if usecols is not None and not callable(usecols):
+        # Comparaison sur le texte de l'en-tête (une année en en-tête est lue comme un nombre)
+        selected = {str(col) for col in usecols}
+        usecols = lambda col: str(col) in selected  # noqa: E731
+    file.seek(0)
+    try:
+        return pd.read_excel(file, sheet_name=sheet_name, usecols=usecols, engine=engine)
+    except Exception:
+        if engine == "openpyxl":
+            raise
+    file.seek(0)
+    return pd.read_excel(file, sheet_name=sheet_name, usecols=usecols, engine="openpyxl")
@@ -0,0 +1,357 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from data_engine.masks import cached_mask, selection_key
+
+# Une valeur présente sur moins de n / SPARSE_DIVISOR lignes est stockée comme liste de lignes,
+# au-delà comme bitmap compacté (1 bit par ligne)
+SPARSE_DIVISOR = 32
+# Au-delà de ce nombre de valeurs touchées par une mise à jour, l'index est reconstruit en entier
+UPDATE_MAX_VALUES = 64
+
+
+def mask_to_bits(mask):
+    """Pack a boolean row mask into a bitmap (1 bit per row)"""
+    return np.packbits(np.asarray(mask, dtype=bool))
+
+
+def rows_to_bits(rows, n_rows):
+    """Build the bitmap of the given row positions"""
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[rows] = True
+    return np.packbits(mask)
+
+
+def bits_to_rows(bits, n_rows):
+    """Row positions set in a bitmap, in increasing order"""
+    return np.flatnonzero(np.unpackbits(bits, count=n_rows))
+
+
+def _upserted_rows(old_rows, n_rows, changed_rows):
+    """Rows rewritten by an upsert: the changed rows, then the rows appended after the old end"""
+    return np.concatenate([np.asarray(changed_rows, dtype=np.int64), np.arange(old_rows, n_rows)])
+
+
+def combine_bits(left, right):
+    """AND two bitmaps; None stands for "all rows" """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return left & right
+
+
+class CategoryIndex:
+    """
+    Compressed row bitmaps for every value of one column.
+    Rare values keep the sorted list of their rows, frequent values a packed
+    bitmap, so the index never holds more than a few bytes per row whatever
+    the number of distinct values.
+    """
+
+    def __init__(self, series):
+        self.n_rows = len(series)
+        codes, uniques = pd.factorize(series, sort=False)
+        self.codes = codes.astype(np.int32)
+        self.values = list(uniques)
+        self._positions = {value: position for position, value in enumerate(self.values)}
+        self._containers = self._build_containers()
+
+    def _build_containers(self):
+        present = self.codes >= 0
+        codes = self.codes[present]
+        # Le tri stable d'entiers 16 bits est un tri par base, bien plus rapide
+        if len(self.values) < np.iinfo(np.int16).max:
+            codes = codes.astype(np.int16)
+        order = np.argsort(codes, kind="stable")
+        rows = np.flatnonzero(present)[order].astype(np.int64)
+        counts = np.bincount(self.codes[present], minlength=len(self.values))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        containers = []
+        for position in range(len(self.values)):
+            value_rows = rows[offsets[position]:offsets[position + 1]]
+            containers.append(self._container(value_rows))
+        return containers
+
+    def _container(self, value_rows):
+        if len(value_rows) * SPARSE_DIVISOR > self.n_rows:
+            return rows_to_bits(value_rows, self.n_rows)
+        return value_rows.astype(np.uint32)
+
+    def updated(self, series, changed_rows):
+        """
+        Index of series, the column after an upsert (see data_engine.upsert):
+        changed_rows were rewritten in place and rows past the old end appended.
+        Only the containers of the values that gained or lost rows are rebuilt.
+        """
+        rows = _upserted_rows(self.n_rows, len(series), changed_rows)
+        local_codes, uniques = pd.factorize(series.take(rows), sort=False)
+
+        index = copy.copy(self)
+        index.n_rows = len(series)
+        index.values = list(self.values)
+        index._positions = dict(self._positions)
+        for value in uniques:
+            if value not in index._positions:
+                index._positions[value] = len(index.values)
+                index.values.append(value)
+        lookup = np.array([index._positions[value] for value in uniques] + [-1], dtype=np.int32)
+        new_codes = lookup[local_codes]
+
+        index.codes = np.concatenate([self.codes, np.full(index.n_rows - self.n_rows, -1, dtype=np.int32)])
+        old_codes = index.codes[rows]
+        index.codes[rows] = new_codes
+
+        affected = set(old_codes[old_codes >= 0].tolist()) | set(new_codes[new_codes >= 0].tolist())
+        if len(affected) > UPDATE_MAX_VALUES:
+            index._containers = index._build_containers()
+            return index
+
+        padding = np.zeros((index.n_rows + 7) // 8 - (self.n_rows + 7) // 8, dtype=np.uint8)
+        index._containers = []
+        for position in range(len(index.values)):
+            if position in affected:
+                index._containers.append(index._container(np.flatnonzero(index.codes == position)))
+            elif self._containers[position].dtype == np.uint8:
+                index._containers.append(np.concatenate([self._containers[position], padding]))
+            else:
+                index._containers.append(self._containers[position])
+        return index
+
+    def bits(self, values):
+        """Bitmap of the rows holding any of values (unknown values match nothing)"""
+        positions = [self._positions[value] for value in values if value in self._positions]
+        sparse = [self._containers[p] for p in positions if self._containers[p].dtype == np.uint32]
+        dense = [self._containers[p] for p in positions if self._containers[p].dtype == np.uint8]
+
+        if sparse:
+            result = rows_to_bits(np.concatenate(sparse), self.n_rows)
+        else:
+            result = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for bitmap in dense:
+            result |= bitmap
+        return result
+
+    def values_in(self, bits=None):
+        """Values present on the rows of bits (all values when bits is None), in order of appearance"""
+        if bits is None:
+            return list(self.values)
+        codes = np.unique(self.codes[bits_to_rows(bits, self.n_rows)])
+        return [self.values[code] for code in codes if code >= 0]
+
+    def memory_usage(self):
+        """Bytes held by the index"""
+        return self.codes.nbytes + sum(container.nbytes for container in self._containers)
+
+
+class NumericIndex:
+    """
+    Sorted permutation of a numeric column.
+    Range predicates (low <= value <= high, as for a slider) are answered by two
+    binary searches; the matching rows are a contiguous slice of the permutation.
+    Missing values are left out, like with a comparison.
+    """
+
+    def __init__(self, series):
+        self.n_rows = len(series)
+        values = series.to_numpy()
+        valid = ~pd.isna(values)
+        rows = np.flatnonzero(valid)
+        # Tri par base (stable) pour les entiers, tri rapide pour les flottants
+        kind = "stable" if np.issubdtype(values.dtype, np.integer) else "quicksort"
+        order = np.argsort(values[valid], kind=kind)
+        self.order = rows[order].astype(np.uint32 if self.n_rows < 2 ** 32 else np.int64)
+        self.sorted_values = values[valid][order]
+        self.has_missing = len(rows) < self.n_rows
+
+    def updated(self, series, changed_rows):
+        """
+        Index of series, the column after an upsert (see CategoryIndex.updated).
+        The rewritten rows are removed from the sorted arrays and their new values
+        merged in by binary search, without sorting the whole column again.
+        """
+        rows = _upserted_rows(self.n_rows, len(series), changed_rows)
+        keep = ~np.isin(self.order, rows)
+        values = series.take(rows).to_numpy()
+        valid = ~pd.isna(values)
+        rows, values = rows[valid], values[valid]
+        order = np.argsort(values, kind="stable")
+        rows, values = rows[order], values[order]
+
+        index = copy.copy(self)
+        index.n_rows = len(series)
+        sorted_values = self.sorted_values[keep].astype(np.result_type(self.sorted_values, values))
+        positions = np.searchsorted(sorted_values, values, side="right")
+        index.sorted_values = np.insert(sorted_values, positions, values)
+        index.order = np.insert(self.order[keep].astype(np.int64), positions, rows)
+        index.order = index.order.astype(np.uint32 if index.n_rows < 2 ** 32 else np.int64)
+        index.has_missing = len(index.order) < index.n_rows
+        return index
+
+    def bounds(self, bits=None):
+        """(min, max) of the column, over the rows of bits when given; None when no row matches"""
+        if bits is None:
+            if not len(self.sorted_values):
+                return None
+            return self.sorted_values[0], self.sorted_values[-1]
+        selected = np.unpackbits(bits, count=self.n_rows).view(bool)[self.order]
+        positions = np.flatnonzero(selected)
+        if not len(positions):
+            return None
+        return self.sorted_values[positions[0]], self.sorted_values[positions[-1]]
+
+    def rows(self, low, high):
+        """Row positions with low <= value <= high, in value order"""
+        start = np.searchsorted(self.sorted_values, low, side="left")
+        stop = np.searchsorted(self.sorted_values, high, side="right")
+        return self.order[start:stop]
+
+    def bits(self, low, high):
+        """
+        Bitmap of the rows with low <= value <= high.
+        Returns None ("all rows") when the range covers the whole column.
+        """
+        bounds = self.bounds()
+        if bounds is not None and not self.has_missing and low <= bounds[0] and high >= bounds[1]:
+            return None
+        return rows_to_bits(self.rows(low, high), self.n_rows)
+
+    def memory_usage(self):
+        """Bytes held by the index"""
+        return self.order.nbytes + self.sorted_values.nbytes
+
+
+class HierarchyIndex:
+    """
+    Sorted child values of each parent value (commune → établissements...).
+    Built once from the distinct (parent, child) pairs, so the options of a
+    dependent filter are a union of a few precomputed lists instead of a scan
+    of the frame. Missing parents or children are left out.
+    """
+
+    def __init__(self, df, parent, child):
+        self.parent = parent
+        self.child = child
+        pairs = df[[parent, child]].dropna().drop_duplicates()
+        self._children = {
+            value: sorted(children.tolist())
+            for value, children in pairs.groupby(parent, observed=True, sort=False)[child]
+        }
+        self._all = sorted(pairs[child].unique().tolist())
+
+    def updated(self, df):
+        """Hierarchy extended with the (parent, child) pairs of df (new or appended rows)"""
+        index = copy.copy(self)
+        index._children = dict(self._children)
+        pairs = df[[self.parent, self.child]].dropna().drop_duplicates()
+        for value, children in pairs.groupby(self.parent, observed=True, sort=False)[self.child]:
+            index._children[value] = sorted(set(index._children.get(value, [])) | set(children.tolist()))
+        index._all = sorted(set(self._all) | set(pairs[self.child].tolist()))
+        return index
+
+    def children(self, parents=None):
+        """Sorted child values of the given parents (all child values when parents is empty)"""
+        if not parents:
+            return list(self._all)
+        if len(parents) == 1:
+            return list(self._children.get(parents[0], []))
+        return sorted(set().union(*(self._children.get(value, ()) for value in parents)))
+
+
+class DatasetIndex:
+    """
+    Per-dataset indexes used to answer multiselect and range filters.
+
+    Category and numeric indexes are built lazily, the first time a column is
+    filtered. A combination of selections is answered by OR-ing the value
+    bitmaps of each column, range slices give one more bitmap per slider, all
+    bitmaps are AND-ed and the matching rows are taken from the frame in one go
+    at the end, without intermediate filtered copies.
+
+    When the dataset has a key (its fingerprint), each predicate bitmap goes
+    through the shared mask cache: changing one filter only recomputes that
+    filter's bitmap, the others are reused and simply AND-ed again.
+    """
+
+    def __init__(self, df, key=None):
+        self.df = df
+        self.key = key
+        self.n_rows = len(df)
+        self._categories = {}
+        self._numerics = {}
+
+    def category(self, col):
+        """Category index of col, built on first use"""
+        if col not in self._categories:
+            self._categories[col] = CategoryIndex(self.df[col])
+        return self._categories[col]
+
+    def numeric(self, col):
+        """Numeric index of col, built on first use"""
+        if col not in self._numerics:
+            self._numerics[col] = NumericIndex(self.df[col])
+        return self._numerics[col]
+
+    def upserted(self, df, changed_rows, key=None):
+        """
+        Index of df, the frame after an upsert into this index's frame, reusing
+        the category and numeric indexes already built (updated incrementally).
+        key is the fingerprint of the new content.
+        """
+        index = DatasetIndex(df, key=key)
+        for col, category in self._categories.items():
+            if col in df.columns:
+                index._categories[col] = category.updated(df[col], changed_rows)
+        for col, numeric in self._numerics.items():
+            if col in df.columns:
+                index._numerics[col] = numeric.updated(df[col], changed_rows)
+        return index
+
+    def _predicate(self, col, selection, compute):
+        if self.key is None:
+            return compute()
+        return cached_mask((self.key, col, selection_key(selection)), compute)
+
+    def select(self, selections, bits=None):
+        """
+        AND the bitmaps of selections ({column: selected values}) into bits.
+        Empty selections are ignored; returns None when nothing is filtered.
+        """
+        for col, values in selections.items():
+            if values is not None and len(values) and col in self.df.columns:
+                col_bits = self._predicate(col, values, lambda: self.category(col).bits(values))
+                bits = combine_bits(bits, col_bits)
+        return bits
+
+    def select_ranges(self, ranges, bits=None):
+        """AND the bitmaps of the ranges ({column: (low, high)}, bounds included) into bits"""
+        for col, (low, high) in ranges.items():
+            col_bits = self._predicate(col, (low, high), lambda: self.numeric(col).bits(low, high))
+            bits = combine_bits(bits, col_bits)
+        return bits
+
+    def bounds(self, col, bits=None):
+        """(min, max) of col among the selected rows, None when no row matches"""
+        return self.numeric(col).bounds(bits)
+
+    def values(self, col, bits=None):
+        """Distinct values of col among the selected rows"""
+        return self.category(col).values_in(bits)
+
+    def rows(self, bits):
+        """Row positions selected by bits, or None for all rows"""
+        return None if bits is None else bits_to_rows(bits, self.n_rows)
+
+    def take(self, bits):
+        """The selected rows of the frame (a shallow copy of it when nothing is filtered)"""
+        if bits is None:
+            return self.df.copy(deep=False)
+        return self.df.take(self.rows(bits))
+
+    def memory_usage(self):
+        """Bytes held by the indexes built so far"""
+        indexes = list(self._categories.values()) + list(self._numerics.values())
+        return sum(index.memory_usage() for index in indexes)
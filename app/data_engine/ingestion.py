@@ -0,0 +1,269 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_numeric_dtype, is_object_dtype, is_string_dtype, union_categoricals
+
+from data_engine.compaction import compact_dataframe
+from data_engine.excel import read_excel_fast
+
+# Taille des blocs lus par read_csv_chunked (en lignes)
+DEFAULT_CHUNK_ROWS = 200_000
+# Nombre de lignes lues pour deviner les types des colonnes
+DTYPE_SAMPLE_ROWS = 50_000
+# Au-delà de cette proportion de valeurs distinctes, une colonne texte reste en object
+CATEGORY_MAX_RATIO = 0.5
+# Nombre de processus de lecture des imports multi-fichiers (par défaut, un par cœur)
+INGEST_WORKERS = int(os.environ.get("ESTK_INGEST_WORKERS", 0)) or os.cpu_count() or 1
+# Colonne ajoutée aux imports multi-fichiers avec le nom du fichier d'origine de chaque ligne
+SOURCE_COLUMN = "source_file"
+
+
+def _file_size(file):
+    """Return the size in bytes of an uploaded file or file-like object"""
+    size = getattr(file, "size", None)
+    if size is not None:
+        return size
+    position = file.tell()
+    file.seek(0, 2)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+def infer_csv_dtypes(file, sample_rows=DTYPE_SAMPLE_ROWS, **read_kwargs):
+    """
+    Infer column dtypes from the first rows of a CSV file.
+    Repeated text columns become categories, float columns float64 (so that a
+    missing value in a later chunk does not change the column type, see
+    _apply_chunk_dtypes). Integer and date-like columns are left to pandas on
+    each chunk.
+    """
+    file.seek(0)
+    sample = pd.read_csv(file, nrows=sample_rows, **read_kwargs)
+    file.seek(0)
+
+    dtypes = {}
+    for col in sample.columns:
+        series = sample[col]
+        if is_object_dtype(series) or is_string_dtype(series):
+            non_null = series.dropna()
+            if len(non_null) and non_null.nunique() <= CATEGORY_MAX_RATIO * len(non_null):
+                dtypes[col] = "category"
+        elif is_float_dtype(series):
+            dtypes[col] = "float64"
+    return dtypes
+
+
+def _apply_chunk_dtypes(chunk, dtypes):
+    """
+    Cast the numeric columns of a parsed chunk to their inferred dtype.
+    Only categories are given to read_csv (any text fits a category): a value
+    the sample did not show ("ND", "-"...) would make a forced float64 fail,
+    whereas here the chunk keeps the type pandas parsed and the column ends up
+    as plain read_csv would return it.
+    """
+    for col, dtype in dtypes.items():
+        if dtype != "category" and col in chunk.columns and is_numeric_dtype(chunk[col].dtype):
+            chunk[col] = chunk[col].astype(dtype)
+    return chunk
+
+
+def _concat_chunks(chunks):
+    """
+    Concatenate parsed chunks, merging categorical columns without going through object.
+    The chunk list is emptied as it is consumed; column order is restored by the caller.
+    """
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+
+    categorical_cols = [
+        col for col in chunks[0].columns
+        if all(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks)
+    ]
+    merged = {}
+    for col in categorical_cols:
+        merged[col] = union_categoricals([chunk[col] for chunk in chunks], ignore_order=True)
+        for chunk in chunks:
+            del chunk[col]
+
+    df = pd.concat(chunks, ignore_index=True)
+    chunks.clear()
+    for col in categorical_cols:
+        df[col] = merged[col]
+    return df
+
+
+def read_csv_chunked(file, chunk_rows=DEFAULT_CHUNK_ROWS, progress_callback=None, **read_kwargs):
+    """
+    Read a CSV file block by block instead of in one shot.
+
+    The dtypes are inferred from a first sample so that every chunk is parsed
+    directly into its compact form (categories for repeated text), which keeps
+    the peak memory close to the size of the final DataFrame.
+
+    progress_callback, when given, is called after each chunk with a dict
+    containing rows, bytes_read, total_bytes, elapsed and rows_per_sec.
+    """
+    total_bytes = _file_size(file)
+    dtypes = infer_csv_dtypes(file, **read_kwargs)
+    columns = None
+    chunks = []
+    rows = 0
+    start = time.perf_counter()
+
+    read_dtypes = {col: dtype for col, dtype in dtypes.items() if dtype == "category"}
+    reader = pd.read_csv(file, chunksize=chunk_rows, dtype=read_dtypes, **read_kwargs)
+    for chunk in reader:
+        chunk = _apply_chunk_dtypes(chunk, dtypes)
+        if columns is None:
+            columns = list(chunk.columns)
+        chunks.append(chunk)
+        rows += len(chunk)
+
+        if progress_callback is not None:
+            elapsed = time.perf_counter() - start
+            # La position du fichier avance par blocs de lecture : c'est une estimation
+            bytes_read = min(file.tell(), total_bytes) if hasattr(file, "tell") else 0
+            progress_callback({
+                "rows": rows,
+                "bytes_read": bytes_read,
+                "total_bytes": total_bytes,
+                "elapsed": elapsed,
+                "rows_per_sec": rows / elapsed if elapsed > 0 else 0.0,
+            })
+
+    df = _concat_chunks(chunks)
+    if columns is not None:
+        df = df[columns]
+    return df
+
+
+def parse_file(name, path):
+    """
+    Parse one uploaded file (its name and the path of its content on disk) and
+    compact its dtypes.
+    Runs in a worker process: it must stay a top-level function so it can be pickled.
+    """
+    with open(path, "rb") as file:
+        if name.lower().endswith(".csv"):
+            df = pd.read_csv(file)
+        else:
+            df = read_excel_fast(file)
+    df, _ = compact_dataframe(df)
+    return df
+
+
+def _spill_upload(file, directory, position):
+    # Contenu copié par blocs dans un fichier temporaire : les processus reçoivent un chemin, pas les octets
+    path = os.path.join(directory, str(position))
+    file.seek(0)
+    with open(path, "wb") as target:
+        shutil.copyfileobj(file, target, 8 * 1024 * 1024)
+    file.seek(0)
+    return path
+
+
+def read_files_parallel(files, max_workers=None, progress_callback=None):
+    """
+    Parse several files (a list of (name, path or binary file object)) in a pool
+    of worker processes. File objects are first copied to temporary files, so
+    the workers read their input from disk instead of receiving it pickled.
+    The workers are spawned (not forked): forking the multi-threaded Streamlit
+    server could copy locks held by other threads and deadlock.
+
+    progress_callback, when given, is called as each file finishes with a dict
+    containing name, ok, rows, error, elapsed, done and total; an exception it
+    raises stops the import (files not started yet are not parsed).
+    Returns the parsed frames in the order of files (failed files are skipped)
+    and a {name: error message} dict of the failures.
+    """
+    with tempfile.TemporaryDirectory(prefix="estk_ingest_") as directory:
+        paths = [
+            source if isinstance(source, (str, os.PathLike)) else _spill_upload(source, directory, position)
+            for position, (_, source) in enumerate(files)
+        ]
+        return _read_paths_parallel([(name, path) for (name, _), path in zip(files, paths)], max_workers, progress_callback)
+
+
+def _read_paths_parallel(files, max_workers, progress_callback):
+    max_workers = min(max_workers or INGEST_WORKERS, len(files)) or 1
+    frames = {}
+    errors = {}
+    done = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {executor.submit(parse_file, name, path): position for position, (name, path) in enumerate(files)}
+        try:
+            for future in as_completed(futures):
+                position = futures[future]
+                name = files[position][0]
+                error = None
+                try:
+                    frames[position] = future.result()
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                    errors[name] = error
+                done += 1
+
+                if progress_callback is not None:
+                    progress_callback({
+                        "name": name,
+                        "ok": error is None,
+                        "rows": len(frames[position]) if error is None else 0,
+                        "error": error,
+                        "elapsed": time.perf_counter() - start,
+                        "done": done,
+                        "total": len(files),
+                    })
+        except BaseException:
+            # Lecture interrompue (annulation par progress_callback...) : les fichiers pas encore commencés sont abandonnés
+            for future in futures:
+                future.cancel()
+            raise
+
+    return [(files[position][0], frames[position]) for position in sorted(frames)], errors
+
+
+def concat_aligned(frames, source_column=SOURCE_COLUMN):
+    """
+    Concatenate frames (a list of (name, DataFrame)) whose columns may differ.
+    Columns are the union of all columns in order of first appearance, missing
+    ones are filled with NaN, categorical columns keep a shared category set,
+    and source_column (unless None) records the name each row comes from.
+    """
+    if not frames:
+        return pd.DataFrame()
+    names = [name for name, _ in frames]
+    frames = [df for _, df in frames]
+
+    columns = list(dict.fromkeys(col for df in frames for col in df.columns))
+    aligned = [df.copy(deep=False) for df in frames]
+    for col in columns:
+        present = [df[col] for df in frames if col in df.columns]
+        if not all(isinstance(series.dtype, pd.CategoricalDtype) for series in present):
+            continue
+        # Même jeu de catégories partout : la concaténation reste catégorielle
+        categories = union_categoricals(present, ignore_order=True).categories
+        for df in aligned:
+            if col in df.columns:
+                df[col] = df[col].cat.set_categories(categories)
+            else:
+                df[col] = pd.Categorical([None] * len(df), categories=categories)
+
+    combined = pd.concat([df.reindex(columns=columns) for df in aligned], ignore_index=True)
+    if source_column is None:
+        return combined
+    # Un même nom peut apparaître deux fois : les catégories sont les noms distincts
+    categories = list(dict.fromkeys(names))
+    codes = np.repeat([categories.index(name) for name in names], [len(df) for df in frames])
+    combined[source_column] = pd.Categorical.from_codes(codes, categories=categories)
+    return combined
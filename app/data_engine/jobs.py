@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+import uuid
+
+# Délai entre deux rafraîchissements de la page pendant un travail en arrière-plan (secondes)
+JOB_POLL_SECONDS = float(os.environ.get("ESTK_JOB_POLL_SECONDS", 1.0))
+# Durée de conservation d'un travail terminé dont le résultat n'a pas été récupéré
+JOB_RETENTION_SECONDS = float(os.environ.get("ESTK_JOB_RETENTION_SECONDS", 3600))
+
+# Travaux en cours ou terminés : id -> Job
+_jobs = {}
+_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by report() once its cancellation was requested"""
+
+
+class Job:
+    """
+    Background task started by a session: its state, progress and result.
+    The job thread only writes through report() and the final state; the
+    session reads the attributes when it polls.
+    """
+
+    def __init__(self, job_id, name, session_id):
+        self.id = job_id
+        self.name = name
+        self.session_id = session_id
+        # running, done, failed ou cancelled
+        self.status = "running"
+        self.progress = 0.0
+        self.message = ""
+        self.details = {}
+        self.result = None
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def done(self):
+        return self.status != "running"
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.started_at
+
+    def cancel(self):
+        """Request cancellation; the job stops at its next report()"""
+        self._cancel.set()
+
+    def report(self, progress=None, message=None, details=None):
+        """Update the progress from the job thread; raises JobCancelled when cancellation was requested"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        if progress is not None:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if details is not None:
+            self.details = details
+
+    def _finish(self, status, result=None, error=None):
+        # Le résultat n'est visible qu'avec le statut final, posés ensemble sous le verrou
+        with _lock:
+            if status == "done" and self._cancel.is_set():
+                status, result = "cancelled", None
+            self.result = result
+            self.error = error
+            self.finished_at = time.time()
+            self.status = status
+
+
+def _run(job, func):
+    try:
+        result = func(job)
+    except JobCancelled:
+        job._finish("cancelled")
+    except Exception as e:
+        job._finish("failed", error=str(e) or type(e).__name__)
+    else:
+        job._finish("done", result=result)
+
+
+def start_job(session_id, name, func):
+    """
+    Run func(job) in a background thread and return the job id.
+    func reports its progress with job.report() (which also stops it when the
+    job is cancelled) and returns the result handed over to the session.
+    func must not use Streamlit: it runs outside the script.
+    """
+    prune_jobs()
+    job = Job(uuid.uuid4().hex, name, session_id)
+    with _lock:
+        _jobs[job.id] = job
+    threading.Thread(target=_run, args=(job, func), name=f"estk-job-{job.id[:8]}", daemon=True).start()
+    return job.id
+
+
+def get_job(job_id):
+    """The job with this id, or None when it is unknown (finished and collected, pruned...)"""
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def cancel_job(job_id):
+    """Request the cancellation of a job"""
+    job = get_job(job_id)
+    if job is not None:
+        job.cancel()
+
+
+def collect_job(job_id):
+    """Remove a finished job from the registry and return it (None while it is still running)"""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or not job.done:
+            return None
+        return _jobs.pop(job_id)
+
+
+def cancel_inactive_jobs(is_active):
+    """Cancel the jobs of sessions that are no longer active"""
+    with _lock:
+        jobs = list(_jobs.values())
+    for job in jobs:
+        if job.session_id is not None and not is_active(job.session_id):
+            job.cancel()
+
+
+def prune_jobs(retention_seconds=None):
+    """Drop the finished jobs whose result was not collected within retention_seconds"""
+    retention_seconds = JOB_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+    limit = time.time() - retention_seconds
+    with _lock:
+        for job_id in [job_id for job_id, job in _jobs.items() if job.done and job.finished_at < limit]:
+            del _jobs[job_id]
@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype, union_categoricals
+
+from data_engine.ingestion import concat_aligned
+
+JOIN_TYPES = ("inner", "left", "outer")
+# Lignes examinées pour estimer la taille des colonnes de texte
+ROW_BYTES_SAMPLE_ROWS = 10_000
+
+
+def factorize_keys(left_keys, right_keys):
+    """
+    Dictionary-encode the join keys of both sides into one int64 code per row.
+    left_keys and right_keys are lists of Series (one per key column, in
+    matching order). Equal keys get equal codes on both sides; rows with a
+    missing key value get -1 (they never match).
+    Returns the left codes, the right codes and the number of distinct keys.
+    """
+    n_left = len(left_keys[0])
+    codes = None
+    n_keys = 0
+    for left_col, right_col in zip(left_keys, right_keys):
+        # Catégories réunies des deux côtés : la factorisation se fait sur les codes
+        combined = concat_aligned(
+            [("gauche", left_col.to_frame("key")), ("droite", right_col.to_frame("key"))], source_column=None
+        )["key"]
+        col_codes, uniques = pd.factorize(combined)
+        col_codes = col_codes.astype(np.int64)
+        if codes is None:
+            codes, n_keys = col_codes, len(uniques)
+            continue
+        missing = (codes < 0) | (col_codes < 0)
+        # Clé composée : couple de codes renuméroté pour rester dense
+        codes, uniques = pd.factorize(codes * len(uniques) + col_codes)
+        codes = codes.astype(np.int64)
+        codes[missing] = -1
+        n_keys = len(uniques)
+    return codes[:n_left], codes[n_left:], n_keys
+
+
+def _row_bytes(df, columns):
+    # Octets par ligne : taille de l'élément (codes pour les catégories), texte estimé sur un échantillon
+    total = 0.0
+    sample = df.head(ROW_BYTES_SAMPLE_ROWS)
+    for col in columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            total += series.cat.codes.dtype.itemsize
+        elif is_object_dtype(series.dtype) or is_string_dtype(series.dtype):
+            values = sample[col]
+            total += values.memory_usage(deep=True, index=False) / len(values) if len(values) else 8
+        else:
+            total += getattr(series.dtype, "itemsize", 8)
+    return total
+
+
+def output_columns(left_columns, right_columns, left_on, right_on, suffix="_droite"):
+    """
+    Right columns kept by a join, as {column: name in the result}: key columns
+    with the same name as on the left are dropped, columns clashing with a left
+    column get suffix.
+    """
+    shared_keys = {r for l, r in zip(left_on, right_on) if l == r}
+    left_columns = set(left_columns)
+    columns = {}
+    for col in right_columns:
+        if col in shared_keys:
+            continue
+        columns[col] = f"{col}{suffix}" if col in left_columns else col
+    return columns
+
+
+def plan_join(left, right, left_on, right_on, how="inner", suffix="_droite"):
+    """
+    Cardinality and memory of a join, computed before running it.
+    The keys are factorized once and counted per key, which gives the exact
+    number of output rows, the rows without a match on each side and the kind
+    of relation (1:1, 1:n, n:1, n:n). The estimated memory is the output rows
+    times the average row size of the kept columns.
+    The returned dict also holds the key codes, reused by join_indexers.
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError(f"Type de jointure inconnu : {how}")
+    if not left_on or len(left_on) != len(right_on):
+        raise ValueError("Il faut autant de colonnes clés à gauche qu'à droite")
+    left_codes, right_codes, n_keys = factorize_keys(
+        [left[col] for col in left_on], [right[col] for col in right_on]
+    )
+    left_counts = np.bincount(left_codes[left_codes >= 0], minlength=n_keys)
+    right_counts = np.bincount(right_codes[right_codes >= 0], minlength=n_keys)
+
+    matched = left_counts * right_counts
+    left_unmatched = int((left_codes < 0).sum() + left_counts[right_counts == 0].sum())
+    right_unmatched = int((right_codes < 0).sum() + right_counts[left_counts == 0].sum())
+    rows = int(matched.sum())
+    if how in ("left", "outer"):
+        rows += left_unmatched
+    if how == "outer":
+        rows += right_unmatched
+
+    both = matched > 0
+    many_left = bool((left_counts[both] > 1).any())
+    many_right = bool((right_counts[both] > 1).any())
+    relation = f"{'n' if many_left else '1'}:{'n' if many_right else '1'}"
+
+    right_columns = output_columns(left.columns, right.columns, left_on, right_on, suffix)
+    left_row_bytes = _row_bytes(left, left.columns)
+    right_row_bytes = _row_bytes(right, list(right_columns))
+    return {
+        "how": how,
+        "rows": rows,
+        "matched_rows": int(matched.sum()),
+        "left_unmatched": left_unmatched,
+        "right_unmatched": right_unmatched,
+        "keys": n_keys,
+        "relation": relation,
+        "left_row_bytes": left_row_bytes,
+        "right_row_bytes": right_row_bytes,
+        "estimated_bytes": int(rows * (left_row_bytes + right_row_bytes)),
+        "left_codes": left_codes,
+        "right_codes": right_codes,
+    }
+
+
+def join_indexers(left_codes, right_codes, n_keys, how="inner"):
+    """
+    Row positions of a hash join on factorized keys, as (left, right) int64
+    arrays; -1 stands for the missing side of an unmatched row.
+    The right side is grouped by key with a counting sort (the "hash table" is
+    the dense key code), then every left row is expanded to its matches. Rows
+    come in left order, unmatched right rows of an outer join last.
+    """
+    order = np.argsort(right_codes, kind="stable")
+    right_counts = np.bincount(right_codes[right_codes >= 0], minlength=n_keys)
+    # Les codes -1 sont triés en premier : les groupes commencent après eux
+    starts = np.cumsum(right_counts) - right_counts + int((right_codes < 0).sum())
+
+    left_rows = np.flatnonzero(left_codes >= 0)
+    codes = left_codes[left_rows]
+    matches = right_counts[codes]
+    total = int(matches.sum())
+    left_index = np.repeat(left_rows, matches)
+    offsets = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(matches) - matches, matches)
+    right_index = order[np.repeat(starts[codes], matches) + offsets]
+
+    if how in ("left", "outer"):
+        matched = np.zeros(len(left_codes), dtype=bool)
+        matched[left_rows[matches > 0]] = True
+        unmatched = np.flatnonzero(~matched)
+        left_index = np.concatenate([left_index, unmatched])
+        right_index = np.concatenate([right_index, np.full(len(unmatched), -1, dtype=np.int64)])
+        # Ordre des lignes de gauche conservé
+        positions = np.argsort(left_index, kind="stable")
+        left_index, right_index = left_index[positions], right_index[positions]
+
+    if how == "outer":
+        left_counts = np.bincount(codes, minlength=n_keys)
+        unmatched = np.flatnonzero((right_codes < 0) | (left_counts[np.maximum(right_codes, 0)] == 0))
+        left_index = np.concatenate([left_index, np.full(len(unmatched), -1, dtype=np.int64)])
+        right_index = np.concatenate([right_index, unmatched])
+    return left_index, right_index
+
+
+def _take(series, indexer):
+    # Valeurs manquantes (NaN, NaT...) là où l'indexeur vaut -1
+    fill = bool((indexer < 0).any())
+    return pd.Series(series.array.take(indexer, allow_fill=fill), name=series.name)
+
+
+def _coalesce_keys(left_keys, right_keys, right_rows):
+    # Clé commune : valeur de gauche, ou de droite pour les lignes venues seulement de droite
+    left_categorical = isinstance(left_keys.dtype, pd.CategoricalDtype)
+    right_categorical = isinstance(right_keys.dtype, pd.CategoricalDtype)
+    if left_categorical and right_categorical:
+        # Catégories réunies : where refuse deux catégorielles aux catégories différentes
+        categories = union_categoricals([left_keys, right_keys], ignore_order=True).categories
+        left_keys = left_keys.cat.set_categories(categories)
+        right_keys = right_keys.cat.set_categories(categories)
+    elif left_categorical or right_categorical:
+        left_keys = left_keys.astype(object) if left_categorical else left_keys
+        right_keys = right_keys.astype(object) if right_categorical else right_keys
+    return left_keys.where(~right_rows, right_keys)
+
+
+def take_joined(left, right, left_index, right_index, left_on, right_on, suffix="_droite"):
+    """
+    Build the joined frame from the row positions of join_indexers.
+    Key columns with the same name on both sides appear once (filled from the
+    right side for unmatched right rows); other right columns clashing with a
+    left column get suffix.
+    """
+    data = {col: _take(left[col], left_index) for col in left.columns}
+    right_rows = left_index < 0
+    for l, r in zip(left_on, right_on):
+        if l == r and right_rows.any():
+            right_keys = _take(right[r], right_index)
+            data[l] = _coalesce_keys(data[l], right_keys, right_rows)
+    for col, name in output_columns(left.columns, right.columns, left_on, right_on, suffix).items():
+        data[name] = _take(right[col], right_index)
+    return pd.DataFrame(data)
+
+
+def hash_join(left, right, left_on, right_on, how="inner", suffix="_droite", plan=None):
+    """
+    Join two frames on key columns (inner, left or outer), like DataFrame.merge
+    but on dictionary-encoded keys. plan, from plan_join, avoids factorizing
+    the keys again.
+    """
+    plan = plan or plan_join(left, right, left_on, right_on, how, suffix)
+    n_keys = plan["keys"]
+    left_index, right_index = join_indexers(plan["left_codes"], plan["right_codes"], n_keys, plan["how"])
+    return take_joined(left, right, left_index, right_index, left_on, right_on, suffix)
+
+
+def star_join(left, steps, how="inner"):
+    """
+    Join several tables onto one: steps is a list of (right, left_on, right_on,
+    suffix, plan) whose keys all refer to columns of left. Each plan (from
+    plan_join on left and right) is reused for its step, whatever the rows the
+    previous steps produced.
+    """
+    result = left
+    # Ligne de left d'où vient chaque ligne du résultat (-1 : ligne venue d'une autre table)
+    origin = np.arange(len(left), dtype=np.int64)
+    for right, left_on, right_on, suffix, plan in steps:
+        codes = np.where(origin >= 0, plan["left_codes"][np.maximum(origin, 0)], -1)
+        left_index, right_index = join_indexers(codes, plan["right_codes"], plan["keys"], how)
+        result = take_joined(result, right, left_index, right_index, left_on, right_on, suffix)
+        origin = np.where(left_index >= 0, origin[np.maximum(left_index, 0)], -1)
+    return result
@@ -0,0 +1,75 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Mémoire maximale occupée par les bitmaps de prédicats en cache (tous jeux de données confondus)
+MASK_CACHE_MAX_BYTES = int(os.environ.get("ESTK_MASK_CACHE_MAX_BYTES", 256 * 1024 ** 2))
+
+# Entrées du cache, de la moins récemment utilisée à la plus récente
+_masks = OrderedDict()
+_size = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_lock = threading.Lock()
+
+
+def selection_key(selection):
+    """Hashable form of a filter selection: the set of values, or the (low, high) bounds of a range"""
+    if isinstance(selection, tuple):
+        return ("range",) + selection
+    return ("values", frozenset(selection))
+
+
+def _nbytes(bits):
+    return 0 if bits is None else bits.nbytes
+
+
+def cached_mask(key, compute):
+    """
+    Bitmap of one predicate, computed by compute() on a miss.
+    key is (dataset fingerprint, column, selection key). Bitmaps are shared
+    between sessions and must not be modified in place.
+    """
+    global _size
+    with _lock:
+        if key in _masks:
+            _masks.move_to_end(key)
+            _stats["hits"] += 1
+            return _masks[key]
+        _stats["misses"] += 1
+
+    bits = compute()
+
+    with _lock:
+        if key not in _masks:
+            _masks[key] = bits
+            _size += _nbytes(bits)
+            _evict()
+    return bits
+
+
+def _evict():
+    global _size
+    while _size > MASK_CACHE_MAX_BYTES and len(_masks) > 1:
+        _, bits = _masks.popitem(last=False)
+        _size -= _nbytes(bits)
+        _stats["evictions"] += 1
+
+
+def clear_masks(dataset=None):
+    """Drop the cached bitmaps of one dataset fingerprint, or of all datasets"""
+    global _size
+    with _lock:
+        for key in [key for key in _masks if dataset is None or key[0] == dataset]:
+            _size -= _nbytes(_masks.pop(key))
+
+
+def mask_cache_stats():
+    """Hit/miss counters and current size of the predicate cache"""
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_masks)
+        stats["size_bytes"] = _size
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats["max_bytes"] = MASK_CACHE_MAX_BYTES
+    return stats
@@ -0,0 +1,311 @@
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+
+from data_engine.ingestion import concat_aligned
+from data_engine.joins import JOIN_TYPES, join_indexers, output_columns, plan_join, take_joined
+
+# Mémoire maximale d'une jointure hors mémoire (blocs en attente d'écriture, paire de partitions et résultat en cours)
+JOIN_MEMORY_BUDGET = int(os.environ.get("ESTK_JOIN_MEMORY_BYTES", 1024 ** 3))
+# Nombre de partitions créées à chaque passe de partitionnement
+JOIN_PARTITIONS = int(os.environ.get("ESTK_JOIN_PARTITIONS", 32))
+# Passes de partitionnement au plus : au-delà, une partition trop grosse (clé très fréquente) est jointe telle quelle
+JOIN_MAX_DEPTH = 3
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_values(series):
+    # Valeurs égales pour la jointure (après alignement des types) hachées de la même façon des deux côtés
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        values = _hash_values(pd.Series(series.cat.categories))
+        return values.take(np.maximum(codes, 0)).where(codes >= 0).reset_index(drop=True)
+    series = series.reset_index(drop=True)
+    if is_numeric_dtype(series.dtype):
+        # Entiers et décimaux égaux (1 et 1.0) : même partition
+        return series.astype("float64")
+    if is_datetime64_any_dtype(series.dtype):
+        return series.astype("datetime64[ns]")
+    return series.astype(str)
+
+
+def _mix(hashes, depth):
+    # Finaliseur splitmix64 avec un sel propre à la passe : hash_pandas_object ignore hash_key
+    # pour les nombres, le sel est donc appliqué ici pour que chaque passe répartisse autrement
+    with np.errstate(over="ignore"):
+        mixed = hashes + np.uint64(0x9E3779B97F4A7C15) * np.uint64(depth + 1)
+        mixed = (mixed ^ (mixed >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        mixed = (mixed ^ (mixed >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return mixed ^ (mixed >> np.uint64(31))
+
+
+def partition_numbers(keys, partitions, depth=0):
+    """
+    Partition of each row of keys (a list of key Series), from a hash of the key
+    values: rows with equal keys get the same partition on both sides of a join.
+    depth changes the hash function, to split a partition again.
+    """
+    normalized = pd.DataFrame({position: _hash_values(series) for position, series in enumerate(keys)})
+    hashes = pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+    return (_mix(hashes, depth) % np.uint64(partitions)).astype(np.int64)
+
+
+def _arrow_type(types):
+    # Type commun d'une colonne lue par blocs (entiers puis décimaux quand un bloc a des valeurs manquantes...)
+    types = [t.value_type if pa.types.is_dictionary(t) else t for t in types]
+    types = [t for t in types if not pa.types.is_null(t)]
+    if not types:
+        return pa.large_string()
+    if all(pa.types.is_integer(t) for t in types):
+        return pa.int64()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        return pa.float64()
+    if all(pa.types.is_string(t) or pa.types.is_large_string(t) for t in types):
+        # Texte en large_string : relu sans copie depuis le fichier mappé (voir arrow_store)
+        return pa.large_string()
+    if all(pa.types.is_timestamp(t) for t in types):
+        return pa.timestamp("ns", tz=types[0].tz)
+    if all(t == types[0] for t in types):
+        return types[0]
+    return pa.large_string()
+
+
+class _Partitioner:
+    """Rows of one side of a join routed to partition files on disk by hash of their keys"""
+
+    def __init__(self, directory, side, on, partitions, depth, flush_bytes):
+        self.directory = directory
+        self.side = side
+        self.on = on
+        self.partitions = partitions
+        self.depth = depth
+        self.flush_bytes = flush_bytes
+        self.columns = None
+        self.types = {}
+        self.rows = 0
+        # Mémoire (une fois chargée) et fichiers de chaque partition
+        self.sizes = [0] * partitions
+        self.files = [[] for _ in range(partitions)]
+        self._pending = [[] for _ in range(partitions)]
+        self._pending_bytes = 0
+
+    def add(self, chunk):
+        """Route the rows of chunk to their partitions; pending rows are written once over flush_bytes"""
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        for field in pa.Schema.from_pandas(chunk, preserve_index=False):
+            self.types.setdefault(field.name, []).append(field.type)
+        if not len(chunk):
+            return
+        self.rows += len(chunk)
+        chunk_bytes = int(chunk.memory_usage(deep=True, index=False).sum())
+
+        numbers = partition_numbers([chunk[col] for col in self.on], self.partitions, self.depth)
+        order = np.argsort(numbers, kind="stable")
+        counts = np.bincount(numbers, minlength=self.partitions)
+        ordered = chunk.take(order)
+        start = 0
+        for partition, count in enumerate(counts):
+            if count:
+                self._pending[partition].append(ordered.iloc[start:start + count])
+                self.sizes[partition] += chunk_bytes * int(count) // len(chunk)
+                start += count
+        self._pending_bytes += chunk_bytes
+        if self._pending_bytes >= self.flush_bytes:
+            self.flush()
+
+    def flush(self):
+        """Write the pending rows, one file per partition"""
+        for partition, pieces in enumerate(self._pending):
+            if not pieces:
+                continue
+            if len(pieces) == 1:
+                frame = pieces[0]
+            else:
+                # Types pouvant différer d'un bloc à l'autre : alignés à la concaténation
+                frame = concat_aligned([(str(position), piece) for position, piece in enumerate(pieces)], source_column=None)
+            path = os.path.join(self.directory, f"{self.side}-{partition:03d}-{len(self.files[partition]):05d}.parquet")
+            frame.to_parquet(path, index=False)
+            self.files[partition].append(path)
+        self._pending = [[] for _ in range(self.partitions)]
+        self._pending_bytes = 0
+
+    def file_chunks(self, partition):
+        """Rows of a partition, file by file"""
+        for path in self.files[partition]:
+            yield pd.read_parquet(path)
+
+    def read(self, partition):
+        """All the rows of a partition"""
+        frames = [(str(position), chunk) for position, chunk in enumerate(self.file_chunks(partition))]
+        if not frames:
+            return pd.DataFrame({col: pd.Series(dtype="object") for col in self.columns or self.on})
+        if len(frames) == 1:
+            return frames[0][1]
+        return concat_aligned(frames, source_column=None)
+
+    def remove(self, partition):
+        """Delete the files of a partition"""
+        for path in self.files[partition]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.files[partition] = []
+
+
+def _output_schema(left, right, left_on, right_on, suffix):
+    # Colonnes de gauche (clés communes : types des deux côtés), puis colonnes gardées de droite
+    shared = {l: r for l, r in zip(left_on, right_on) if l == r}
+    fields = []
+    for col in left.columns or left.on:
+        types = left.types.get(col, []) + (right.types.get(shared[col], []) if col in shared else [])
+        fields.append(pa.field(col, _arrow_type(types)))
+    right_columns = output_columns(left.columns or left.on, right.columns or right.on, left_on, right_on, suffix)
+    for col, name in right_columns.items():
+        fields.append(pa.field(name, _arrow_type(right.types.get(col, []))))
+    return pa.schema(fields)
+
+
+def _to_arrow(df, schema):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return pa.table([table.column(field.name).cast(field.type) for field in schema], schema=schema)
+
+
+def arrow_file_chunks(path):
+    """Rows of an Arrow IPC file by chunks of DataFrames (one per record batch), read through a memory map"""
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for position in range(reader.num_record_batches):
+            yield reader.get_batch(position).to_pandas()
+
+
+def partitioned_join(left_chunks, right_chunks, left_on, right_on, output_path, how="inner", suffix="_droite",
+                     memory_budget=None, partitions=None, progress_callback=None):
+    """
+    Join two tables that may not fit in memory, given as iterables of DataFrame
+    chunks, and write the result to output_path as an uncompressed Arrow IPC
+    file, to be memory-mapped back with arrow_store.open_mapped.
+
+    Grace hash join: each side is routed to partition files on disk by a hash
+    of its keys, so equal keys land in the same partition on both sides, then
+    the partitions are joined one pair at a time (joins.hash_join). A pair too
+    big for the budget is partitioned again with another hash, and the result
+    of a pair is written in slices of rows, so the peak memory follows
+    memory_budget (JOIN_MEMORY_BUDGET) rather than the size of the tables.
+    Rows with a missing key never match, as in joins.hash_join.
+
+    progress_callback, when given, is called with a dict containing phase
+    ("partition" or "join"), rows, partitions_done and partitions_total (an
+    exception it raises stops the join).
+    Returns a report: rows, left_rows, right_rows, partitions, spilled_bytes, seconds.
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError(f"Type de jointure inconnu : {how}")
+    if not left_on or len(left_on) != len(right_on):
+        raise ValueError("Il faut autant de colonnes clés à gauche qu'à droite")
+    memory_budget = memory_budget or JOIN_MEMORY_BUDGET
+    partitions = partitions or JOIN_PARTITIONS
+    # Un tiers du budget pour une paire de partitions, un tiers pour le résultat en cours, le reste pour les codes
+    pair_bytes = memory_budget // 3
+    start = time.perf_counter()
+
+    def report(phase, rows=0, done=0, total=0):
+        if progress_callback is not None:
+            progress_callback({"phase": phase, "rows": rows, "partitions_done": done, "partitions_total": total})
+
+    work_dir = f"{output_path}.{os.getpid()}.{threading.get_ident()}.parts"
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        sides = []
+        for side, chunks, on in (("gauche", left_chunks, left_on), ("droite", right_chunks, right_on)):
+            partitioner = _Partitioner(work_dir, side, on, partitions, 0, memory_budget // 2)
+            for chunk in chunks:
+                missing = [col for col in on if col not in chunk.columns]
+                if missing:
+                    raise ValueError(f"Colonnes clés absentes : {', '.join(map(str, missing))}")
+                partitioner.add(chunk)
+                report("partition", partitioner.rows)
+            partitioner.flush()
+            sides.append(partitioner)
+        left, right = sides
+        spilled_bytes = sum(entry.stat().st_size for entry in os.scandir(work_dir) if entry.is_file())
+
+        schema = _output_schema(left, right, left_on, right_on, suffix)
+        # Paires de partitions à joindre : (gauche, droite, numéro de partition)
+        pending = [(left, right, partition) for partition in reversed(range(partitions))]
+        done = 0
+        rows = 0
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            while pending:
+                left_part, right_part, partition = pending.pop()
+                size = left_part.sizes[partition] + right_part.sizes[partition]
+                if size > pair_bytes and left_part.depth + 1 < JOIN_MAX_DEPTH:
+                    # Paire trop grosse : nouvelle répartition de ses lignes avec un autre hachage
+                    sub_dir = os.path.join(work_dir, f"{left_part.depth + 1}-{partition:03d}-{len(pending)}")
+                    os.makedirs(sub_dir, exist_ok=True)
+                    split = []
+                    for part in (left_part, right_part):
+                        sub = _Partitioner(sub_dir, part.side, part.on, partitions, part.depth + 1, memory_budget // 2)
+                        sub.columns = part.columns
+                        for chunk in part.file_chunks(partition):
+                            sub.add(chunk)
+                        sub.flush()
+                        part.remove(partition)
+                        split.append(sub)
+                    pending.extend((split[0], split[1], sub_partition) for sub_partition in reversed(range(partitions)))
+                    continue
+                if size > pair_bytes:
+                    logger.warning("Partition %d de %s (%d octets) au-delà du budget de jointure", partition, left_part.side, size)
+
+                left_df = left_part.read(partition)
+                right_df = right_part.read(partition)
+                left_part.remove(partition)
+                right_part.remove(partition)
+                if len(left_df) or (how == "outer" and len(right_df)):
+                    plan = plan_join(left_df, right_df, left_on, right_on, how, suffix)
+                    left_index, right_index = join_indexers(plan["left_codes"], plan["right_codes"], plan["keys"], how)
+                    row_bytes = max(plan["left_row_bytes"] + plan["right_row_bytes"], 1)
+                    slice_rows = max(int(pair_bytes // row_bytes), 1)
+                    for position in range(0, len(left_index), slice_rows):
+                        piece = take_joined(
+                            left_df, right_df,
+                            left_index[position:position + slice_rows], right_index[position:position + slice_rows],
+                            left_on, right_on, suffix,
+                        )
+                        writer.write_table(_to_arrow(piece, schema))
+                        rows += len(piece)
+                done += 1
+                report("join", rows, done, done + len(pending))
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    seconds = time.perf_counter() - start
+    logger.info(
+        "Jointure hors mémoire (%s) : %d x %d lignes -> %d lignes en %.1f s (%d octets sur disque)",
+        how, left.rows, right.rows, rows, seconds, spilled_bytes,
+    )
+    return {
+        "rows": rows,
+        "left_rows": left.rows,
+        "right_rows": right.rows,
+        "partitions": done,
+        "spilled_bytes": spilled_bytes,
+        "seconds": seconds,
+    }
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype, is_datetime64_any_dtype, is_integer_dtype, is_numeric_dtype,
+)
+
+# Nombre de lignes examinées par colonne (réparties sur tout le fichier)
+SCHEMA_SAMPLE_ROWS = int(os.environ.get("ESTK_SCHEMA_SAMPLE_ROWS", 10_000))
+# Nombre de schémas gardés en mémoire (tous jeux de données et sessions confondus)
+SCHEMA_CACHE_ENTRIES = int(os.environ.get("ESTK_SCHEMA_CACHE_ENTRIES", 64))
+# Proportion minimale de valeurs reconnues pour classer une colonne texte en nombres ou en dates
+PARSE_MIN_RATIO = 0.95
+# Au-delà de cette proportion de valeurs distinctes, une colonne est un identifiant ou du texte libre
+ID_MIN_UNIQUE_RATIO = 0.95
+CATEGORY_MAX_RATIO = 0.5
+# Noms de colonnes d'identifiants (id_eleve, code_etab, massar...)
+ID_NAME_PATTERN = re.compile(r"(^|_)(id|code|cd|num|massar|cin)($|_)|massar", re.IGNORECASE)
+
+# Formats de date essayés, dans l'ordre (le premier qui reconnaît l'échantillon est retenu)
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%d-%m-%Y",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+]
+
+# Schémas déjà calculés : empreinte de l'échantillon -> schéma
+_schemas = OrderedDict()
+_lock = threading.Lock()
+
+
+def _sample(df, sample_rows):
+    # Lignes réparties régulièrement : début, milieu et fin du fichier sont représentés
+    if len(df) <= sample_rows:
+        return df
+    positions = np.unique(np.linspace(0, len(df) - 1, sample_rows).astype(np.int64))
+    return df.take(positions)
+
+
+def _sample_fingerprint(df, sample):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((len(df), [str(col) for col in df.columns], [str(dtype) for dtype in df.dtypes])).encode())
+    for col in range(sample.shape[1]):
+        values = sample.iloc[:, col]
+        try:
+            hashed = pd.util.hash_pandas_object(values, index=False)
+        except TypeError:
+            # Valeurs non hachables (listes...) : empreinte du texte
+            hashed = pd.util.hash_pandas_object(values.astype(str), index=False)
+        digest.update(hashed.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _parse_ratio(parsed, values):
+    return parsed.notna().sum() / len(values) if len(values) else 0.0
+
+
+def _detect_date_format(values):
+    for date_format in DATE_FORMATS:
+        parsed = pd.to_datetime(values, format=date_format, errors="coerce")
+        if _parse_ratio(parsed, values) >= PARSE_MIN_RATIO:
+            return date_format
+    return None
+
+
+def _detect_decimal(values):
+    if _parse_ratio(pd.to_numeric(values, errors="coerce"), values) >= PARSE_MIN_RATIO:
+        return "."
+    # Nombres saisis à la française (12,5)
+    if values.str.contains(",", regex=False).any():
+        converted = pd.to_numeric(values.str.replace(",", ".", regex=False), errors="coerce")
+        if _parse_ratio(converted, values) >= PARSE_MIN_RATIO:
+            return ","
+    return None
+
+
+def _column(kind, dtype, stored_as_text=False, date_format=None, decimal=None):
+    return {
+        "kind": kind,
+        "dtype": str(dtype),
+        "stored_as_text": stored_as_text,
+        "format": date_format,
+        "decimal": decimal,
+    }
+
+
+def infer_column(name, sample):
+    """
+    Classify one column from a sample of its values, as a dict with its kind
+    (numeric, categorical, datetime, id or text), its dtype, whether the values
+    are stored as text, and the detected date format or decimal separator.
+    """
+    dtype = sample.dtype
+    values = sample.dropna()
+    unique_ratio = values.nunique() / len(values) if len(values) else 0.0
+    id_name = bool(ID_NAME_PATTERN.search(str(name)))
+
+    if is_bool_dtype(dtype):
+        return _column("categorical", dtype)
+    if is_datetime64_any_dtype(dtype):
+        return _column("datetime", dtype)
+    if is_numeric_dtype(dtype):
+        if id_name and is_integer_dtype(dtype) and unique_ratio >= ID_MIN_UNIQUE_RATIO:
+            return _column("id", dtype)
+        return _column("numeric", dtype)
+
+    # Texte (y compris catégories) : seules les valeurs distinctes sont analysées
+    if isinstance(dtype, pd.CategoricalDtype):
+        distinct = pd.Series(values.cat.remove_unused_categories().cat.categories)
+    else:
+        distinct = pd.Series(values.unique())
+    if not len(distinct):
+        return _column("categorical", dtype)
+    text = distinct.astype(str).str.strip()
+
+    date_format = _detect_date_format(text)
+    if date_format is not None:
+        return _column("datetime", dtype, stored_as_text=True, date_format=date_format)
+
+    decimal = _detect_decimal(text)
+    # Codes avec zéros en tête (00123) : des identifiants, pas des nombres
+    leading_zeros = text.str.match(r"^0\d").any()
+    if decimal is not None and not leading_zeros:
+        if id_name and unique_ratio >= ID_MIN_UNIQUE_RATIO:
+            return _column("id", dtype, stored_as_text=True)
+        return _column("numeric", dtype, stored_as_text=True, decimal=decimal)
+
+    if unique_ratio >= ID_MIN_UNIQUE_RATIO and (id_name or leading_zeros or text.str.len().nunique() == 1):
+        return _column("id", dtype, stored_as_text=True)
+    if unique_ratio > CATEGORY_MAX_RATIO:
+        return _column("text", dtype, stored_as_text=True)
+    return _column("categorical", dtype, stored_as_text=True)
+
+
+def infer_schema(df, sample_rows=None):
+    """Schema of df as {column: infer_column(...)}, inferred from a sample of rows"""
+    sample = _sample(df, sample_rows or SCHEMA_SAMPLE_ROWS)
+    return {col: infer_column(col, sample[col]) for col in df.columns}
+
+
+def dataset_schema(df, sample_rows=None):
+    """
+    Schema of df, inferred once per dataset.
+    The cache key is a fingerprint of the shape, dtypes and sampled rows, i.e.
+    of everything the inference looks at, so sessions and pages working on the
+    same data share one schema and a modified frame gets a new one.
+    """
+    sample = _sample(df, sample_rows or SCHEMA_SAMPLE_ROWS)
+    key = _sample_fingerprint(df, sample)
+    with _lock:
+        if key in _schemas:
+            _schemas.move_to_end(key)
+            return _schemas[key]
+
+    schema = {col: infer_column(col, sample[col]) for col in df.columns}
+    with _lock:
+        _schemas[key] = schema
+        while len(_schemas) > SCHEMA_CACHE_ENTRIES:
+            _schemas.popitem(last=False)
+    return schema
+
+
+def columns_of_kind(schema, *kinds, as_text=None):
+    """
+    Columns of the given kinds, in schema order. With as_text=False only the
+    columns already stored with a matching dtype are returned, with as_text=True
+    only those stored as text (see convert_column).
+    """
+    return [
+        col for col, column in schema.items()
+        if column["kind"] in kinds and (as_text is None or column["stored_as_text"] == as_text)
+    ]
+
+
+def _convert(values, column):
+    if column["kind"] == "datetime":
+        return pd.to_datetime(values, format=column["format"], errors="coerce")
+    if column["decimal"] == ",":
+        values = values.astype(str).str.replace(",", ".", regex=False)
+    return pd.to_numeric(values, errors="coerce")
+
+
+def convert_column(series, column):
+    """
+    series converted to the type detected for it: numbers or dates stored as
+    text are parsed (with the detected format); other columns are returned as is.
+    Categorical columns are converted through their categories only.
+    """
+    if not column["stored_as_text"] or column["kind"] not in ("numeric", "datetime"):
+        return series
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        converted = _convert(pd.Series(series.cat.categories), column)
+        result = converted.take(np.maximum(codes, 0)).where(codes >= 0)
+        result.index = series.index
+        return result.rename(series.name)
+    return _convert(series, column)
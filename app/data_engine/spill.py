@@ -0,0 +1,152 @@
+import os
+import pickle
+import shutil
+import socket
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_engine.arrow_store import is_memory_mapped
+
+# Mémoire maximale des objets de données d'une session (df, df_filtered, df_merged, tableaux de bord)
+SESSION_MEMORY_BUDGET = int(os.environ.get("ESTK_SESSION_MEMORY_BYTES", 2 * 1024 ** 3))
+# Mémoire maximale de l'ensemble des sessions du processus
+GLOBAL_MEMORY_BUDGET = int(os.environ.get("ESTK_GLOBAL_MEMORY_BYTES", 16 * 1024 ** 3))
+# Dossier où les DataFrames dérivés évincés sont écrits (un sous-dossier par session)
+SPILL_DIR = os.environ.get("ESTK_SPILL_DIR", os.path.join(tempfile.gettempdir(), "estk_spill"))
+# Sous-dossier propre à ce processus : plusieurs serveurs peuvent partager SPILL_DIR
+PROCESS_SPILL_DIR = os.path.join(SPILL_DIR, f"{socket.gethostname()}-{os.getpid()}")
+
+# Mémoire comptée pour chaque session lors de sa dernière exécution
+_usage = {}
+_lock = threading.Lock()
+
+
+class SpilledFrame:
+    """Placeholder left in session state for a DataFrame written to disk"""
+
+    def __init__(self, path, rows, size_bytes):
+        self.path = path
+        self.rows = rows
+        self.size_bytes = size_bytes
+
+    def load(self):
+        """Read the frame back from disk"""
+        return pd.read_parquet(self.path)
+
+
+def _column_buffer(series):
+    # Adresse des données de la colonne : les copies superficielles (copy-on-write) la partagent
+    values = series.cat.codes if isinstance(series.dtype, pd.CategoricalDtype) else series
+    try:
+        array = values.to_numpy(copy=False)
+    except Exception:
+        return None
+    if not isinstance(array, np.ndarray) or not array.size:
+        return None
+    return array.__array_interface__["data"][0], array.dtype.str, array.shape
+
+
+def memory_by_key(objects):
+    """
+    Memory attributed to each data object of a session, as {key: bytes}.
+    Column buffers shared between frames (a filtered view sharing its parent's
+    data...) are only counted for the first frame holding them; memory-mapped
+    columns and spilled frames count for nothing and other objects for their
+    pickled size.
+    """
+    seen = set()
+    usage = {}
+    for key, value in objects.items():
+        if isinstance(value, pd.DataFrame):
+            size = int(value.index.memory_usage(deep=True))
+            for col in range(value.shape[1]):
+                series = value.iloc[:, col]
+                if is_memory_mapped(series):
+                    continue
+                buffer = _column_buffer(series)
+                if buffer is not None and buffer in seen:
+                    continue
+                if buffer is not None:
+                    seen.add(buffer)
+                size += int(series.memory_usage(deep=True, index=False))
+            usage[key] = size
+        elif isinstance(value, SpilledFrame) or value is None:
+            usage[key] = 0
+        else:
+            try:
+                usage[key] = len(pickle.dumps(value))
+            except Exception:
+                usage[key] = 0
+    return usage
+
+
+def record_usage(session_id, size_bytes):
+    """Record the memory used by a session; returns the total over all sessions"""
+    with _lock:
+        _usage[session_id] = size_bytes
+        return sum(_usage.values())
+
+
+def forget_usage(session_id):
+    """Drop the usage record of a session"""
+    with _lock:
+        _usage.pop(session_id, None)
+
+
+def spill_directory(session_id):
+    """Spill directory of a session of this process"""
+    return os.path.join(PROCESS_SPILL_DIR, str(session_id))
+
+
+def spill_frame(session_id, key, df):
+    """
+    Write df to the session's spill directory.
+    Returns the SpilledFrame to keep instead, or None when it cannot be written.
+    """
+    directory = spill_directory(session_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{key}.parquet")
+    try:
+        df.to_parquet(path)
+    except Exception:
+        return None
+    return SpilledFrame(path, len(df), int(df.memory_usage(deep=True).sum()))
+
+
+def frames_to_spill(usage, last_access, evictable, budget):
+    """
+    Keys of the evictable frames to spill, least recently used first, until the
+    usage fits in budget.
+    """
+    total = sum(usage.values())
+    keys = []
+    for key in sorted(evictable, key=lambda key: last_access.get(key, 0)):
+        if total <= budget:
+            break
+        if usage.get(key, 0) > 0:
+            keys.append(key)
+            total -= usage[key]
+    return keys
+
+
+def remove_spills(session_id):
+    """Delete the spill directory of a session"""
+    shutil.rmtree(spill_directory(session_id), ignore_errors=True)
+    forget_usage(session_id)
+
+
+def remove_inactive_spills(is_active):
+    """
+    Delete the spill directories and usage records of this process's sessions
+    that are no longer active (other processes' directories are left alone)
+    """
+    with _lock:
+        sessions = set(_usage)
+    if os.path.isdir(PROCESS_SPILL_DIR):
+        sessions.update(os.listdir(PROCESS_SPILL_DIR))
+    for session_id in sessions:
+        if not is_active(session_id):
+            remove_spills(session_id)
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from data_engine.compaction import dataframe_memory
+
+# Jeux de données résidents, partagés entre sessions : empreinte -> entrée
+_datasets = {}
+# Emplacements occupés par chaque session : id de session -> {emplacement ("df", "df_merged"...): empreinte}
+_sessions = {}
+_lock = threading.Lock()
+
+
+def acquire_dataset(session_id, slot, fingerprint, loader, name=""):
+    """
+    Shared DataFrame for fingerprint, loaded with loader() if no session holds it yet.
+    The session now references it in slot; the dataset it previously held in
+    that slot is released. The frame is shared between sessions and must only
+    be read (see utils.get_dataset).
+    """
+    with _lock:
+        entry = _datasets.get(fingerprint)
+        if entry is not None:
+            _attach(session_id, slot, fingerprint)
+            return entry["df"]
+
+    # Chargement hors verrou : les autres sessions ne sont pas bloquées pendant la lecture
+    df = loader()
+    if df is None:
+        return None
+
+    with _lock:
+        entry = _datasets.setdefault(fingerprint, {
+            "df": df,
+            "name": name,
+            "size_bytes": dataframe_memory(df),
+            "loaded_at": time.time(),
+            "sessions": set(),
+        })
+        _attach(session_id, slot, fingerprint)
+        return entry["df"]
+
+
+def _attach(session_id, slot, fingerprint):
+    slots = _sessions.setdefault(session_id, {})
+    previous = slots.get(slot)
+    slots[slot] = fingerprint
+    _datasets[fingerprint]["sessions"].add(session_id)
+    if previous is not None and previous != fingerprint:
+        _detach(session_id, previous)
+
+
+def _detach(session_id, fingerprint):
+    # La session garde le jeu de données tant qu'un autre de ses emplacements y fait référence
+    if fingerprint in _sessions.get(session_id, {}).values():
+        return
+    entry = _datasets.get(fingerprint)
+    if entry is None:
+        return
+    entry["sessions"].discard(session_id)
+    if not entry["sessions"]:
+        del _datasets[fingerprint]
+
+
+def release_dataset(session_id, slot=None):
+    """Release the dataset of one slot of the session, or all of its datasets"""
+    with _lock:
+        slots = _sessions.get(session_id, {})
+        for name in [name for name in slots if slot is None or name == slot]:
+            _detach(session_id, slots.pop(name))
+        if not slots:
+            _sessions.pop(session_id, None)
+
+
+def release_inactive_sessions(is_active):
+    """Release every dataset held by sessions for which is_active(session_id) is false"""
+    with _lock:
+        inactive = [session_id for session_id in _sessions if not is_active(session_id)]
+    for session_id in inactive:
+        release_dataset(session_id)
+    return len(inactive)
+
+
+def resident_datasets():
+    """Resident datasets, largest first, as a list of dicts (fingerprint, name, size, sessions...)"""
+    with _lock:
+        datasets = [
+            {
+                "fingerprint": fingerprint,
+                "name": entry["name"],
+                "rows": len(entry["df"]),
+                "size_bytes": entry["size_bytes"],
+                "sessions": len(entry["sessions"]),
+                "loaded_at": entry["loaded_at"],
+            }
+            for fingerprint, entry in _datasets.items()
+        ]
+    return sorted(datasets, key=lambda dataset: dataset["size_bytes"], reverse=True)
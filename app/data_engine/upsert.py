@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from data_engine.ingestion import concat_aligned
+
+
+def _cast_like(delta, base):
+    # Colonnes du delta aux types du jeu chargé : catégories complétées, entiers gardés à leur taille
+    delta = delta.copy(deep=False)
+    for col in delta.columns.intersection(base.columns):
+        dtype = base[col].dtype
+        values = delta[col]
+        if values.dtype == dtype:
+            continue
+        if isinstance(dtype, pd.CategoricalDtype):
+            observed = pd.Index(values.dropna().unique())
+            categories = dtype.categories.append(observed[~observed.isin(dtype.categories)])
+            delta[col] = pd.Categorical(values, categories=categories)
+        elif is_numeric_dtype(dtype) and is_numeric_dtype(values.dtype):
+            # Conversion gardée seulement si elle ne perd rien (dépassement, décimales, valeurs manquantes)
+            try:
+                cast = values.astype(dtype)
+            except (TypeError, ValueError, OverflowError):
+                continue
+            if (cast.eq(values) | (cast.isna() & values.isna())).all():
+                delta[col] = cast
+    return delta
+
+
+def upsert_frames(base, delta, key):
+    """
+    Merge delta into base by the key column (a student id...).
+
+    Rows of base whose key appears in delta are replaced by the delta row, in
+    place, and delta rows with new keys are appended at the end, so every other
+    row keeps its position and position-based indexes can be updated instead of
+    rebuilt. Delta columns take the dtype of the base column when the cast is
+    lossless (categories are extended, integers keep their width); columns only
+    present in delta are added (NaN for the other rows).
+    When a key is repeated in delta, its last row wins.
+
+    Returns the merged frame (with a fresh RangeIndex) and a dict with the
+    positions of the updated rows ("updated_rows"), of all rewritten rows,
+    updated then inserted ("new_rows"), the number of inserted rows
+    ("inserted") and the replaced base rows ("replaced").
+    """
+    if key not in base.columns or key not in delta.columns:
+        raise KeyError(f"La colonne clé '{key}' doit exister dans les deux jeux de données")
+    if base[key].duplicated().any():
+        raise ValueError(f"La colonne clé '{key}' contient des doublons dans le jeu de données chargé")
+
+    delta = _cast_like(delta.drop_duplicates(key, keep="last"), base)
+    positions = pd.Index(base[key]).get_indexer(delta[key])
+    updated = positions >= 0
+    updated_rows = np.sort(positions[updated])
+
+    # Base puis delta avec des colonnes et des catégories communes, puis une seule extraction :
+    # les lignes mises à jour prennent la place des anciennes, les nouvelles sont ajoutées à la fin
+    combined = concat_aligned([("base", base), ("delta", delta)], source_column=None)
+    take = np.arange(len(base) + int((~updated).sum()))
+    take[positions[updated]] = len(base) + np.flatnonzero(updated)
+    take[len(base):] = len(base) + np.flatnonzero(~updated)
+    merged = combined.take(take).reset_index(drop=True)
+
+    return merged, {
+        "updated_rows": updated_rows,
+        "new_rows": np.concatenate([updated_rows, np.arange(len(base), len(merged))]),
+        "inserted": int((~updated).sum()),
+        "replaced": base.take(updated_rows),
+    }
@@ -11,7 +11,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from utils import add_custom_css, add_navbar, add_bg_from_file, create_enhanced_sidebar_navigation, force_dark_mode
 
 # Import authentication functions
-from utils import authenticate_user, check_authentication
+from utils import authenticate_user, check_authentication, release_ended_sessions, show_memory_usage
+from utils import restore_session_datasets
 from pages.login import show_login_page
 
 # Initialize authentication session state variables
@@ -164,6 +165,14 @@ else:
         st.session_state["show_filter_numeric"] = False
     if "current_page" not in st.session_state:
         st.session_state["current_page"] = "🏠 Accueil"
+
+    # Libérer les jeux de données partagés des sessions fermées
+    release_ended_sessions()
+
+    # Reprendre les données de l'utilisateur sauvegardées avant un redémarrage du serveur
+    restored = restore_session_datasets()
+    if restored:
+        st.toast(f"♻️ Données restaurées : {', '.join(entry['name'] for entry in restored)}")
     
     # Create enhanced sidebar navigation with logout option
     sidebar_container = st.sidebar.container()
@@ -196,3 +205,6 @@ else:
     
     # Call the show_page function from the selected module
     show_page()
+
+    # Budget mémoire de la session (éviction des DataFrames dérivés) et indicateur
+    show_memory_usage()
@@ -1,9 +1,314 @@
 import streamlit as st
 import pandas as pd
-import pyodbc
 import tempfile
 import os
-from utils import display_enhanced_filter_options
+import hashlib
+import io
+import time
+from utils import checkpoint_dataset, current_session_id, display_enhanced_filter_options, format_bytes, get_dataset, get_dataset_index
+from data_engine.cache import cache_stats, cached_read, fingerprint_file, load_dataset, store_dataset
+from data_engine.access import access_backend, access_cache_stats, close_pool, convert_database, list_tables, read_table
+from data_engine.arrow_store import load_mapped, map_dataset
+from data_engine.compaction import compact_dataframe
+from data_engine.excel import excel_outline, excel_variant, read_excel_fast
+from data_engine.ingestion import concat_aligned, read_csv_chunked, read_files_parallel
+from data_engine.jobs import JOB_POLL_SECONDS, cancel_job, collect_job, get_job, start_job
+from data_engine.schema import columns_of_kind, dataset_schema
+from data_engine.store import acquire_dataset, release_dataset, resident_datasets
+from data_engine.upsert import upsert_frames
+
+def detached_upload(uploaded_file):
+    """
+    Copy of an upload for a background job: the job reads its own buffer while
+    the script keeps using (fingerprinting...) the upload.
+    """
+    copy = io.BytesIO(uploaded_file.getvalue())
+    copy.name = uploaded_file.name
+    copy.size = uploaded_file.size
+    # Même envoi : l'empreinte déjà calculée par le script est réutilisée
+    copy.file_id = getattr(uploaded_file, "file_id", None)
+    return copy
+
+def csv_chunked_reader(job):
+    """CSV reader by chunks reporting its progress and throughput to job"""
+    def reader(file):
+        def on_progress(info):
+            total = info["total_bytes"] or 1
+            mb_per_sec = info["bytes_read"] / info["elapsed"] / 1024 ** 2 if info["elapsed"] > 0 else 0
+            job.report(
+                min(info["bytes_read"] / total, 1.0),
+                f"{info['rows']:,} lignes • {format_bytes(info['bytes_read'])} / {format_bytes(info['total_bytes'])}"
+                f" • {info['rows_per_sec']:,.0f} lignes/s • {mb_per_sec:,.1f} Mo/s",
+            )
+
+        return read_csv_chunked(file, progress_callback=on_progress)
+
+    return reader
+
+def load_shared_dataset(uploaded_file, reader, variant, memory_mapped=False, job=None, session_id=None, slot="df"):
+    """
+    Load an upload through the cross-session store: sessions importing the same
+    file (same fingerprint) share one compacted DataFrame.
+    With memory_mapped, the frame is backed by an Arrow file mapped in memory
+    instead of living in the process (see data_engine.arrow_store).
+    Returns the frame, the compaction report (None when it was already resident)
+    and the fingerprint of the dataset.
+    """
+    fingerprint = fingerprint_file(uploaded_file, f"{variant}-mmap" if memory_mapped else variant)
+    return _load_shared(
+        fingerprint,
+        uploaded_file.name,
+        lambda: cached_read(uploaded_file, reader, variant=variant),
+        memory_mapped,
+        job,
+        session_id,
+        slot,
+    )
+
+def _load_shared(fingerprint, name, read, memory_mapped, job=None, session_id=None, slot="df"):
+    report = {}
+
+    def step(message):
+        if job is not None:
+            job.report(message=message)
+
+    def loader():
+        if memory_mapped:
+            df = load_mapped(fingerprint)
+            if df is not None:
+                report["mapped"] = True
+                return df
+        step("Lecture du fichier...")
+        df = read()
+        if df is None:
+            return None
+        step("Compactage des types...")
+        df, compaction_report = compact_dataframe(df)
+        report.update(compaction_report)
+        if memory_mapped:
+            step("Écriture du fichier Arrow...")
+            df = map_dataset(fingerprint, df)
+            report["mapped"] = True
+        return df
+
+    # Dans un travail en arrière-plan, il n'y a pas de contexte Streamlit : la session est passée
+    session_id = session_id if session_id is not None else current_session_id()
+    df = acquire_dataset(session_id, slot, fingerprint, loader, name=name)
+    if df is not None:
+        # Types des colonnes détectés une fois au chargement, pour toutes les pages
+        step("Analyse des types de colonnes...")
+        dataset_schema(df)
+    return df, report or None, fingerprint
+
+def upsert_loaded_dataset(delta_file, key):
+    """
+    Merge a delta upload (new period, corrected rows) into the loaded dataset by
+    the key column. Only the delta is parsed: the loaded rows are reused, and the
+    filter index is updated for the changed rows instead of rebuilt.
+    The merged frame is shared and cached under a fingerprint derived from the
+    loaded dataset and the delta. Returns the merge report.
+    """
+    if delta_file.name.endswith(".csv"):
+        delta = cached_read(delta_file, pd.read_csv, variant="csv")
+    else:
+        delta = cached_read(delta_file, read_excel_fast, variant=excel_variant())
+    delta, _ = compact_dataframe(delta)
+    base = st.session_state["df"]
+    merged, info = upsert_frames(base, delta, key)
+
+    base_fingerprint = st.session_state.get("df_fingerprint")
+    if base_fingerprint is not None:
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (base_fingerprint, fingerprint_file(delta_file, "upsert"), str(key)):
+            digest.update(part.encode())
+        fingerprint = digest.hexdigest()
+
+        def loader():
+            # Le Parquet ne se modifie pas en place : le résultat est une nouvelle entrée du cache
+            if load_dataset(fingerprint) is None:
+                store_dataset(fingerprint, merged)
+            return merged
+
+        merged = acquire_dataset(current_session_id(), "df", fingerprint, loader, name=f"Mise à jour {delta_file.name}")
+        st.session_state["df_fingerprint"] = fingerprint
+
+    # Index de filtrage : seules les lignes modifiées ou ajoutées sont indexées
+    index = st.session_state.get("df_index")
+    if index is not None and index.df is base:
+        st.session_state["df_index"] = index.upserted(merged, info["updated_rows"])
+    st.session_state["df"] = merged
+    st.session_state["df_filtered"] = merged.copy(deep=False)
+    checkpoint_dataset("df", merged, delta_file.name)
+    checkpoint_dataset("df_filtered", None)
+    return info
+
+def load_shared_files(uploaded_files, memory_mapped=False, job=None, session_id=None, slot="df"):
+    """
+    Parse several uploads (one per province) in parallel worker processes and
+    concatenate them with a source_file column. The status of each file is
+    reported to job as details["files"].
+    The result is cached and shared like a single upload (see load_shared_dataset).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for fingerprint in sorted(fingerprint_file(uploaded_file, "multi") for uploaded_file in uploaded_files):
+        digest.update(fingerprint.encode())
+    key = digest.hexdigest()
+
+    statuses = [
+        {"Fichier": uploaded_file.name, "Statut": "⏳ En attente", "Lignes": 0, "Erreur": ""}
+        for uploaded_file in uploaded_files
+    ]
+
+    def on_progress(info):
+        status = next(
+            status for status in statuses if status["Fichier"] == info["name"] and status["Statut"] == "⏳ En attente"
+        )
+        status.update({
+            "Statut": "✅ Lu" if info["ok"] else "❌ Échec",
+            "Lignes": info["rows"],
+            "Erreur": info["error"] or "",
+        })
+        if job is not None:
+            job.report(
+                info["done"] / info["total"],
+                f"{info['done']} / {info['total']} fichiers lus",
+                {"files": [dict(status) for status in statuses]},
+            )
+
+    def read():
+        # Ensemble de fichiers déjà importé : relu depuis le cache disque
+        df = load_dataset(key)
+        if df is not None:
+            return df
+        files = [(uploaded_file.name, uploaded_file) for uploaded_file in uploaded_files]
+        frames, errors = read_files_parallel(files, progress_callback=on_progress)
+        if not frames:
+            return None
+        df = concat_aligned(frames)
+        # Un import incomplet n'est pas mis en cache : les fichiers en échec pourront être corrigés
+        if not errors:
+            store_dataset(key, df)
+        return df
+
+    name = f"{len(uploaded_files)} fichiers ({uploaded_files[0].name}…)"
+    return _load_shared(f"{key}-mmap" if memory_mapped else key, name, read, memory_mapped, job, session_id, slot)
+
+def start_ingestion_job(name, load):
+    """
+    Run load(job, session_id, slot) as the session's background ingestion job.
+    The current dataset stays usable meanwhile: the new one is held in the
+    "ingest" slot of the shared store until it is handed over.
+    """
+    previous = st.session_state.get("ingest_job")
+    if previous is not None:
+        cancel_job(previous)
+    session_id = current_session_id()
+    st.session_state["ingest_job"] = start_job(session_id, name, lambda job: load(job, session_id, "ingest"))
+
+def collect_ingestion_job():
+    """Hand the dataset of the finished ingestion job over to the session"""
+    job_id = st.session_state.get("ingest_job")
+    if job_id is None:
+        return
+    job = collect_job(job_id)
+    if job is None:
+        if get_job(job_id) is None:
+            # Travail inconnu (serveur redémarré, résultat expiré...)
+            del st.session_state["ingest_job"]
+        return
+    del st.session_state["ingest_job"]
+
+    session_id = current_session_id()
+    df = None
+    if job.status == "done" and job.result is not None:
+        df, compaction_report, fingerprint = job.result
+    if df is not None:
+        # Remplacement en une fois : le jeu de données passe de l'emplacement de chargement à celui de la session
+        acquire_dataset(session_id, "df", fingerprint, lambda: df, name=job.name)
+        set_loaded_dataset(df, job.name, compaction_report, fingerprint)
+        failed = [status for status in job.details.get("files", []) if status["Statut"] == "❌ Échec"]
+        if failed:
+            st.warning(f"⚠️ {len(failed)} fichier(s) ignoré(s) sur {len(job.details['files'])}")
+    elif job.status == "cancelled":
+        st.info(f"⛔ Chargement de {job.name} annulé")
+    elif job.status == "failed":
+        st.error(f"❌ Échec du chargement de {job.name} : {job.error}")
+    else:
+        st.error(f"❌ Aucune donnée n'a pu être lue dans {job.name}")
+    release_dataset(session_id, "ingest")
+
+def show_ingestion_job(state_key="ingest_job"):
+    """
+    Progress of the running background job of the session (ingestion, Access
+    conversion...) with a cancel button; returns True until it is collected
+    """
+    job_id = st.session_state.get(state_key)
+    job = get_job(job_id) if job_id is not None else None
+    if job is None or job.done:
+        return job is not None
+
+    st.progress(job.progress, text=f"⏳ {job.name} • {job.message or 'Démarrage...'}")
+    if job.details.get("files"):
+        st.dataframe(pd.DataFrame(job.details["files"]), use_container_width=True, hide_index=True)
+    st.caption(f"⏱️ {job.elapsed:,.0f} s • Les données actuelles restent disponibles pendant le chargement")
+    if st.button("⛔ Annuler le chargement", key=f"cancel_{state_key}"):
+        cancel_job(job_id)
+    return True
+
+def start_conversion_job(db_path, source_key, name):
+    """Convert every table of the uploaded Access database to Parquet in a background job"""
+    def convert(job):
+        def on_progress(info):
+            job.report(
+                info["tables_done"] / info["tables_total"],
+                f"Table {info['table']} : {info['rows']:,} lignes "
+                f"({info['tables_done'] + 1} / {info['tables_total']})",
+            )
+
+        return source_key, convert_database(db_path, source_key, progress_callback=on_progress)
+
+    st.session_state["access_job"] = start_job(current_session_id(), f"Conversion de {name}", convert)
+
+def collect_conversion_job():
+    """Report the end of the Access conversion job; the tables are then read from the Parquet files"""
+    job_id = st.session_state.get("access_job")
+    if job_id is None:
+        return
+    job = collect_job(job_id)
+    if job is None:
+        if get_job(job_id) is None:
+            del st.session_state["access_job"]
+        return
+    del st.session_state["access_job"]
+
+    if job.status == "done":
+        st.session_state["access_report"] = job.result
+        st.success(f"✅ {len(job.result[1])} tables converties en Parquet")
+    elif job.status == "cancelled":
+        st.info("⛔ Conversion en Parquet annulée")
+    else:
+        st.error(f"❌ Échec de la conversion en Parquet : {job.error}")
+
+def set_loaded_dataset(df, name, compaction_report, fingerprint=None):
+    """Put a freshly loaded dataset in session state and report its memory footprint"""
+    st.session_state["df"] = df
+    # Empreinte du jeu chargé : base des empreintes des mises à jour incrémentales
+    st.session_state["df_fingerprint"] = fingerprint
+    st.session_state["df_filtered"] = df.copy(deep=False)
+    # Point de sauvegarde des données brutes (celui des données nettoyées est périmé) ; un jeu
+    # mappé en mémoire réutilise son fichier Arrow
+    checkpoint_dataset("df", df, name, source=fingerprint)
+    checkpoint_dataset("df_filtered", None)
+    st.success(f"✅ Fichier {name} chargé avec succès!")
+    if compaction_report is None:
+        st.caption("♻️ Jeu de données déjà en mémoire, partagé avec les autres sessions")
+    elif "before" not in compaction_report:
+        st.caption("🗺️ Jeu de données mappé depuis un fichier Arrow existant")
+    else:
+        st.caption(
+            f"💾 Mémoire: {format_bytes(compaction_report['before'])} → "
+            f"{format_bytes(compaction_report['after'])} (÷{compaction_report['ratio']:.1f})"
+        )
 
 def show_page():
     # Titre avec animation et style amélioré
@@ -17,6 +322,12 @@ def show_page():
         unsafe_allow_html=True,
     )
 
+    # Données chargées en arrière-plan depuis la dernière exécution
+    collect_ingestion_job()
+    collect_conversion_job()
+    # Jeu restauré d'un point de sauvegarde : mappé en mémoire ici, la page lit st.session_state["df"]
+    get_dataset("df")
+
     # Disposition en colonnes pour une meilleure organisation
     col1, col2 = st.columns([2, 1])
 
@@ -31,43 +342,188 @@ def show_page():
             unsafe_allow_html=True,
         )
 
-        uploaded_file = st.file_uploader(
-            "Téléchargez un fichier CSV, Excel ou Access", type=["csv", "xlsx", "accdb"]
+        # Plusieurs fichiers (un par province) : lecture parallèle puis concaténation
+        multi_files = st.checkbox(
+            "📚 Plusieurs fichiers (un par province)",
+            value=False,
+            help="Les fichiers sont lus en parallèle puis réunis, avec une colonne source_file",
+        )
+        uploaded_file = None
+        uploaded_files = []
+        if multi_files:
+            uploaded_files = st.file_uploader(
+                "Téléchargez les fichiers CSV ou Excel", type=["csv", "xlsx"], accept_multiple_files=True
+            )
+        else:
+            uploaded_file = st.file_uploader(
+                "Téléchargez un fichier CSV, Excel ou Access", type=["csv", "xlsx", "accdb"]
+            )
+
+        # Lecture par blocs pour les gros fichiers CSV (mémoire bornée et suivi du débit)
+        chunked_csv = st.checkbox(
+            "⚡ Lecture par blocs (fichiers CSV volumineux)",
+            value=False,
+            help="Lit le fichier par blocs de lignes et affiche la progression",
+        )
+        # Fichier Arrow mappé en mémoire : le système ne charge que les colonnes utilisées
+        memory_mapped = st.checkbox(
+            "🗺️ Fichier mappé en mémoire (jeux de données plus grands que la RAM)",
+            value=False,
+            help="Stocke les données dans un fichier Arrow partagé par toutes les sessions du serveur",
         )
 
+        # Les fichiers CSV et Excel sont lus en arrière-plan : la page reste utilisable pendant le chargement
         if uploaded_file:
-            with st.spinner("Chargement des données en cours..."):
-                file_extension = uploaded_file.name.split(".")[-1]
-
-                if "df" not in st.session_state or st.session_state["df"] is None:
-                    if file_extension == "csv":
-                        df = pd.read_csv(uploaded_file)
-                    elif file_extension == "xlsx":
-                        df = pd.read_excel(uploaded_file)
-                    elif file_extension == "accdb":
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".accdb") as tmp_file:
-                            tmp_file.write(uploaded_file.read())
-                            st.session_state["db_path"] = tmp_file.name
-
-                        conn_str = f"DRIVER={{Microsoft Access Driver (*.mdb, *.accdb)}};DBQ={st.session_state['db_path']}"
-                        conn = pyodbc.connect(conn_str)
-                        cursor = conn.cursor()
-
-                        st.session_state["tables"] = [
-                            table.table_name for table in cursor.tables(tableType="TABLE")
-                        ]
+            file_extension = uploaded_file.name.split(".")[-1]
+            # Un fichier déjà en mémoire dans une autre session est partagé, sinon il est
+            # relu depuis le cache disque (Parquet) et ses types sont compactés
+            if file_extension == "csv":
+                variant = "csv-chunked" if chunked_csv else "csv"
+                import_key = fingerprint_file(uploaded_file, variant)
+                # Sans données chargées, l'import démarre dès le téléchargement (une seule fois par fichier)
+                auto_start = st.session_state["df"] is None and st.session_state.get("ingest_source") != import_key
+                if auto_start or st.button("📥 Importer le fichier", key="import_csv"):
+                    st.session_state["ingest_source"] = import_key
+                    source = detached_upload(uploaded_file)
+
+                    def load_csv(job, session_id, slot):
+                        reader = csv_chunked_reader(job) if chunked_csv else pd.read_csv
+                        return load_shared_dataset(source, reader, variant, memory_mapped, job, session_id, slot)
+
+                    start_ingestion_job(uploaded_file.name, load_csv)
+            elif file_extension == "xlsx":
+                # Feuilles et en-têtes lus sans parser le classeur, puis lecture de la sélection seule
+                outline_key = fingerprint_file(uploaded_file, "xlsx-outline")
+                if st.session_state.get("excel_outline", (None,))[0] != outline_key:
+                    st.session_state["excel_outline"] = (outline_key, excel_outline(uploaded_file))
+                outline = st.session_state["excel_outline"][1]
+
+                sheet_name = st.selectbox(
+                    "📑 Feuille",
+                    list(outline),
+                    format_func=lambda sheet: (
+                        f"{sheet} (~{outline[sheet]['rows']:,} lignes)" if outline[sheet]["rows"] else sheet
+                    ),
+                )
+                sheet_columns = outline[sheet_name]["columns"]
+                usecols = st.multiselect("🧾 Colonnes à importer", sheet_columns, default=sheet_columns)
+                if len(usecols) == len(sheet_columns):
+                    usecols = None
+
+                if st.button("📥 Importer la feuille", disabled=not sheet_columns):
+                    source = detached_upload(uploaded_file)
+
+                    def load_sheet(job, session_id, slot):
+                        return load_shared_dataset(
+                            source,
+                            lambda _file: read_excel_fast(_file, sheet_name, usecols),
+                            excel_variant(sheet_name, usecols),
+                            memory_mapped,
+                            job,
+                            session_id,
+                            slot,
+                        )
+
+                    start_ingestion_job(f"{uploaded_file.name} [{sheet_name}]", load_sheet)
+            elif file_extension == "accdb" and st.session_state["df"] is None:
+                with st.spinner("Chargement des données en cours..."):
+                    if access_backend() is None:
+                        st.error("❌ Lecture impossible : installez le pilote ODBC Microsoft Access ou mdb-tools")
+                    else:
+                        # La base n'est écrite qu'une fois par fichier téléchargé : son chemin et sa date
+                        # de modification restent stables et les tables lues restent en cache
+                        db_source = fingerprint_file(uploaded_file, "accdb")
+                        if st.session_state.get("db_source") != db_source or not os.path.exists(st.session_state["db_path"] or ""):
+                            if st.session_state["db_path"]:
+                                close_pool(st.session_state["db_path"])
+                            with tempfile.NamedTemporaryFile(delete=False, suffix=".accdb") as tmp_file:
+                                tmp_file.write(uploaded_file.getvalue())
+                                st.session_state["db_path"] = tmp_file.name
+                            st.session_state["db_source"] = db_source
+                            st.session_state["tables"] = list_tables(st.session_state["db_path"])
+
+                        # Conversion de toutes les tables en Parquet : les pages lisent ensuite les fichiers locaux
+                        convert_all = st.checkbox(
+                            "🗜️ Convertir toutes les tables en Parquet",
+                            value=False,
+                            help="Chaque table est lue une seule fois, par blocs ; la visualisation et la fusion "
+                            "lisent ensuite les fichiers Parquet au lieu de la base",
+                        )
+                        converting = "access_job" in st.session_state
+                        if convert_all and st.session_state.get("access_converted") != db_source and not converting:
+                            st.session_state["access_converted"] = db_source
+                            start_conversion_job(st.session_state["db_path"], db_source, uploaded_file.name)
+                            converting = True
+
+                        conversion = st.session_state.get("access_report")
+                        if conversion is not None and conversion[0] == db_source:
+                            with st.expander("🗜️ Tables converties en Parquet", expanded=False):
+                                st.dataframe(
+                                    pd.DataFrame({
+                                        "Table": [entry["table"] for entry in conversion[1]],
+                                        "Lignes": [entry["rows"] for entry in conversion[1]],
+                                        "Durée (s)": [round(entry["seconds"], 2) for entry in conversion[1]],
+                                        "Lignes/s": [round(entry["rows_per_sec"]) for entry in conversion[1]],
+                                        "Parquet": [format_bytes(entry["size_bytes"]) for entry in conversion[1]],
+                                    }),
+                                    use_container_width=True,
+                                    hide_index=True,
+                                )
+
                         selected_table = st.selectbox(
                             "📑 Sélectionnez une table", st.session_state["tables"]
                         )
 
-                        if selected_table:
-                            df = pd.read_sql(f"SELECT * FROM [{selected_table}]", conn)
+                        # Pendant la conversion, la table sera lue ensuite depuis les fichiers Parquet
+                        df = None
+                        if selected_table and not converting:
+                            df, compaction_report, fingerprint = load_shared_dataset(
+                                uploaded_file,
+                                lambda _file: read_table(st.session_state["db_path"], selected_table),
+                                f"accdb:{selected_table}",
+                                memory_mapped,
+                            )
+
+                        if df is not None:
+                            set_loaded_dataset(df, uploaded_file.name, compaction_report, fingerprint)
+
+        # Import de plusieurs fichiers (un par province), lus en parallèle puis concaténés
+        if uploaded_files:
+            if st.button(f"📥 Importer les {len(uploaded_files)} fichiers", key="import_multi_files"):
+                sources = [detached_upload(uploaded_file) for uploaded_file in uploaded_files]
+
+                def load_files(job, session_id, slot):
+                    return load_shared_files(sources, memory_mapped, job, session_id, slot)
+
+                start_ingestion_job(f"{len(uploaded_files)} fichiers", load_files)
 
-                        conn.close()
+        # Chargement en cours : progression et annulation
+        ingest_running = show_ingestion_job()
+        conversion_running = show_ingestion_job("access_job")
 
-                    st.session_state["df"] = df
-                    st.session_state["df_filtered"] = df.copy()
-                    st.success(f"✅ Fichier {uploaded_file.name} chargé avec succès!")
+        # Ajout d'une nouvelle période (ou de lignes corrigées) au jeu déjà chargé
+        if st.session_state["df"] is not None:
+            with st.expander("🔄 Mise à jour incrémentale (ajout/mise à jour)", expanded=False):
+                delta_file = st.file_uploader(
+                    "Fichier des lignes nouvelles ou modifiées",
+                    type=["csv", "xlsx"],
+                    key="delta_file",
+                )
+                if delta_file is not None:
+                    key_column = st.selectbox(
+                        "Colonne clé", st.session_state["df"].columns, key="delta_key"
+                    )
+                    if st.button("🔄 Appliquer la mise à jour", key="apply_delta"):
+                        try:
+                            with st.spinner("Mise à jour en cours..."):
+                                info = upsert_loaded_dataset(delta_file, key_column)
+                        except (KeyError, ValueError) as e:
+                            st.error(f"❌ Mise à jour impossible : {e}")
+                        else:
+                            st.success(
+                                f"✅ {len(info['updated_rows']):,} lignes mises à jour, "
+                                f"{info['inserted']:,} lignes ajoutées"
+                            )
 
     with col2:
         # Statistiques du jeu de données
@@ -76,6 +532,40 @@ def show_page():
             nb_colonnes = len(st.session_state["df"].columns)
             nb_valeurs_manquantes = st.session_state["df"].isna().sum().sum()
 
+        # Statistiques du cache disque des jeux de données
+        with st.expander("🗄️ Cache des jeux de données", expanded=False):
+            stats = cache_stats()
+            st.write(f"**Succès:** {stats['hits']} • **Échecs:** {stats['misses']} • **Taux:** {stats['hit_rate']:.0%}")
+            st.write(
+                f"**Entrées:** {stats['entries']} • **Taille:** {format_bytes(stats['size_bytes'])}"
+                f" / {format_bytes(stats['max_bytes'])}"
+            )
+            access_stats = access_cache_stats()
+            if access_stats["reads"] or access_stats["tables"]:
+                st.write(
+                    f"**Tables Access:** {access_stats['tables']} en mémoire ({format_bytes(access_stats['size_bytes'])})"
+                    f" • **Lectures base:** {access_stats['reads']} • **Cache:** "
+                    f"{access_stats['memory_hits']} mémoire, {access_stats['disk_hits']} disque"
+                )
+
+        # Jeux de données en mémoire, partagés entre les sessions ouvertes
+        with st.expander("🧩 Jeux de données partagés", expanded=False):
+            datasets = resident_datasets()
+            if datasets:
+                st.dataframe(
+                    pd.DataFrame({
+                        "Fichier": [dataset["name"] for dataset in datasets],
+                        "Lignes": [dataset["rows"] for dataset in datasets],
+                        "Mémoire": [format_bytes(dataset["size_bytes"]) for dataset in datasets],
+                        "Sessions": [dataset["sessions"] for dataset in datasets],
+                    }),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+                st.write(f"**Total:** {format_bytes(sum(dataset['size_bytes'] for dataset in datasets))}")
+            else:
+                st.write("Aucun jeu de données en mémoire")
+
     # Organisation des boutons d'actions dans la sidebar - UNIQUEMENT SI UN FICHIER EST CHARGÉ
     if st.session_state["df"] is not None:
         # Affichage des actions disponibles seulement si un fichier est chargé
@@ -142,15 +632,15 @@ def show_page():
 
             if apply_cleaning_clicked:
                 with st.spinner("Nettoyage en cours..."):
-                    df_filtered = st.session_state["df"].copy()
+                    df_filtered = get_dataset("df")
 
                     if cleaning_options["dropna"]:
                         df_filtered.dropna(inplace=True)
 
+                    # Colonnes numériques d'après le schéma du jeu chargé (identifiants exclus)
+                    numeric_cols = columns_of_kind(dataset_schema(st.session_state["df"]), "numeric", as_text=False)
+
                     if cleaning_options["fillna"]:
-                        numeric_cols = df_filtered.select_dtypes(
-                            include=["float64", "int64"]
-                        ).columns
                         for col in numeric_cols:
                             df_filtered[col] = df_filtered[col].fillna(df_filtered[col].mean())
 
@@ -158,16 +648,16 @@ def show_page():
                         df_filtered.drop_duplicates(inplace=True)
 
                     if cleaning_options["normalize"]:
-                        numeric_cols = df_filtered.select_dtypes(
-                            include=["float64", "int64"]
-                        ).columns
                         for col in numeric_cols:
-                            min_val = df_filtered[col].min()
-                            max_val = df_filtered[col].max()
+                            # Passage en float64 : les entiers compactés (int8...) débordent sur max - min
+                            values = df_filtered[col].astype("float64")
+                            min_val = values.min()
+                            max_val = values.max()
                             if max_val > min_val:  # Éviter la division par zéro
-                                df_filtered[col] = (df_filtered[col] - min_val) / (max_val - min_val)
+                                df_filtered[col] = (values - min_val) / (max_val - min_val)
 
                     st.session_state["df_filtered"] = df_filtered
+                    checkpoint_dataset("df_filtered", df_filtered, "Données nettoyées")
                     st.success("✅ Nettoyage appliqué avec succès!")
 
         # Filtrage par catégories
@@ -181,14 +671,15 @@ def show_page():
                 unsafe_allow_html=True,
             )
 
-            df_filtered = st.session_state["df"].copy()
-            cat_columns = df_filtered.select_dtypes(include=["object", "category"]).columns
+            # Index bitmap par catégorie : les filtres sont combinés sans copier le DataFrame
+            df_index = get_dataset_index(st.session_state["df"])
+            cat_columns = columns_of_kind(dataset_schema(st.session_state["df"]), "categorical")
             filter_changes = False
             category_filters = {}
 
             for col in cat_columns:
                 category_filters[col] = st.sidebar.multiselect(
-                    f"📌 {col}", df_filtered[col].dropna().unique()
+                    f"📌 {col}", df_index.values(col)
                 )
                 if category_filters[col]:
                     filter_changes = True
@@ -199,12 +690,10 @@ def show_page():
                 )
 
                 if apply_cat_filters_clicked:
-                    # Appliquer les filtres
-                    for col, values in category_filters.items():
-                        if values:
-                            df_filtered = df_filtered[df_filtered[col].isin(values)]
-
-                    st.session_state["df_filtered"] = df_filtered
+                    # Appliquer les filtres : ET des bitmaps puis une seule extraction des lignes
+                    selected_bits = df_index.select(category_filters)
+                    st.session_state["df_filtered"] = df_index.take(selected_bits)
+                    checkpoint_dataset("df_filtered", st.session_state["df_filtered"], "Données filtrées")
                     st.success("✅ Filtres catégoriels appliqués!")
 
         # Filtrage par valeurs numériques
@@ -218,13 +707,17 @@ def show_page():
                 unsafe_allow_html=True,
             )
 
-            df_filtered = st.session_state["df"].copy()
-            num_columns = df_filtered.select_dtypes(include=["int64", "float64"]).columns
+            # Index trié par colonne : bornes et plages obtenues par recherche dichotomique
+            df_index = get_dataset_index(st.session_state["df"])
+            num_columns = columns_of_kind(dataset_schema(st.session_state["df"]), "numeric", as_text=False)
             filter_changes = False
             numeric_filters = {}
 
             for col in num_columns:
-                min_val, max_val = float(df_filtered[col].min()), float(df_filtered[col].max())
+                bounds = df_index.bounds(col)
+                if bounds is None:
+                    continue
+                min_val, max_val = float(bounds[0]), float(bounds[1])
                 if min_val < max_val:
                     numeric_filters[col] = st.sidebar.slider(
                         f"📏 {col}", min_val, max_val, (min_val, max_val)
@@ -237,18 +730,17 @@ def show_page():
                 )
 
                 if apply_num_filters_clicked:
-                    # Appliquer les filtres
-                    for col, range_vals in numeric_filters.items():
-                        df_filtered = df_filtered[
-                            (df_filtered[col] >= range_vals[0]) & (df_filtered[col] <= range_vals[1])
-                        ]
-
-                    st.session_state["df_filtered"] = df_filtered
+                    # Appliquer les filtres : ET des plages puis une seule extraction des lignes
+                    selected_bits = df_index.select_ranges(numeric_filters)
+                    st.session_state["df_filtered"] = df_index.take(selected_bits)
+                    checkpoint_dataset("df_filtered", st.session_state["df_filtered"], "Données filtrées")
                     st.success("✅ Filtres numériques appliqués!")
 
     # Affichage des données avec un titre adaptatif et des métriques
     if "df" in st.session_state and st.session_state["df"] is not None:
         container = st.container()
+        # Données filtrées (relues depuis le disque si elles ont été évincées de la mémoire)
+        df_filtered = get_dataset("df_filtered")
 
         if st.session_state.get("show_cleaning", False):
             container.markdown(
@@ -279,9 +771,9 @@ def show_page():
             )
             
         # Métriques des données filtrées vs données originales
-        if "df" in st.session_state and "df_filtered" in st.session_state:
+        if df_filtered is not None:
             orig_rows = len(st.session_state["df"])
-            filtered_rows = len(st.session_state["df_filtered"])
+            filtered_rows = len(df_filtered)
             percentage = (
                 round((filtered_rows / orig_rows) * 100, 1) if orig_rows > 0 else 0
             )
@@ -302,21 +794,26 @@ def show_page():
             show_all = st.checkbox("Afficher toutes les lignes", value=False)
 
             if show_all:
-                st.dataframe(st.session_state["df_filtered"], use_container_width=True)
+                st.dataframe(df_filtered, use_container_width=True)
             else:
-                st.dataframe(st.session_state["df_filtered"].head(50), use_container_width=True)
+                st.dataframe(df_filtered.head(50), use_container_width=True)
                 st.info(
-                    f"Affichage limité aux 50 premières lignes. {len(st.session_state['df_filtered'])} lignes au total."
+                    f"Affichage limité aux 50 premières lignes. {len(df_filtered)} lignes au total."
                 )
 
         with tab2:
-            if "df_filtered" in st.session_state and not st.session_state["df_filtered"].empty:
-                st.write(st.session_state["df_filtered"].describe())
+            if df_filtered is not None and not df_filtered.empty:
+                st.write(df_filtered.describe())
 
                 # Informations sur les types de données
                 st.markdown("#### Types de données:")
-                dtypes = st.session_state["df_filtered"].dtypes.reset_index()
+                dtypes = df_filtered.dtypes.reset_index()
                 dtypes.columns = ["Colonne", "Type"]
                 st.dataframe(dtypes, use_container_width=True)
             else:
-                st.warning("Aucune donnée disponible après filtrage.")
\ No newline at end of file
+                st.warning("Aucune donnée disponible après filtrage.")
+
+    # Rafraîchissement de la page jusqu'à la fin du chargement en arrière-plan
+    if ingest_running or conversion_running:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
\ No newline at end of file
@@ -1,18 +1,201 @@
 import base64
+import os
+import time
 import streamlit as st
 import pandas as pd
-import pyodbc
 import plotly.express as px
+from data_engine.access import read_table, table_chunks, table_columns
+from data_engine.arrow_store import open_mapped
+from data_engine.jobs import JOB_POLL_SECONDS, cancel_job, collect_job, get_job, start_job
+from data_engine.joins import plan_join, star_join
+from data_engine.partitioned_join import JOIN_MEMORY_BUDGET, arrow_file_chunks, partitioned_join
+from data_engine.schema import columns_of_kind, dataset_schema
+from data_engine.spill import SESSION_MEMORY_BUDGET, spill_directory
+from utils import checkpoint_dataset, current_session_id, format_bytes, get_dataset
+
+# Types de jointure proposés (libellé -> type de plan_join)
+JOIN_TYPES = {"Interne": "inner", "Gauche": "left", "Complète": "outer"}
+
+def start_join_job(db_path, base, base_columns, steps, how, selection):
+    """
+    Join the tables out of core in a background job: each table is read by
+    chunks and joined onto the result of the previous join (an Arrow file in
+    the session's spill directory).
+    """
+    session_id = current_session_id()
+    directory = spill_directory(session_id)
+    
+    def run(job):
+        os.makedirs(directory, exist_ok=True)
+        path = None
+        reports = []
+        try:
+            for position, (table, columns, left_on, right_on) in enumerate(steps):
+                def on_progress(info, position=position, table=table):
+                    if info["phase"] == "partition":
+                        job.report(position / len(steps), f"{table} : répartition sur disque ({info['rows']:,} lignes lues)")
+                    else:
+                        done = info["partitions_done"] / max(info["partitions_total"], 1)
+                        job.report(
+                            (position + done) / len(steps),
+                            f"{table} : partition {info['partitions_done']} / {info['partitions_total']} ({info['rows']:,} lignes)",
+                        )
+                
+                # Jointures successives : la table de départ, puis le résultat de la jointure précédente
+                left_chunks = table_chunks(db_path, base, base_columns) if path is None else arrow_file_chunks(path)
+                output = os.path.join(directory, f"jointure-{job.id}-{position}.arrow")
+                reports.append(partitioned_join(
+                    left_chunks, table_chunks(db_path, table, columns), left_on, right_on, output, how,
+                    suffix=f"_{table}", progress_callback=on_progress,
+                ))
+                if path is not None:
+                    os.remove(path)
+                path = output
+        except BaseException:
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+            raise
+        return path, reports
+    
+    st.session_state["join_job"] = start_job(session_id, f"Jointure hors mémoire de {base}", run)
+    st.session_state["join_job_selection"] = selection
+
+def collect_join_job():
+    """Hand the result of the finished out-of-core join over to the session, memory-mapped"""
+    job_id = st.session_state.get("join_job")
+    if job_id is None:
+        return
+    job = collect_job(job_id)
+    if job is None:
+        if get_job(job_id) is None:
+            del st.session_state["join_job"]
+        return
+    del st.session_state["join_job"]
+    
+    if job.status == "done":
+        path, reports = job.result
+        # Colonnes adossées au fichier : lues à la demande, hors du budget mémoire de la session
+        st.session_state["df_merged"] = open_mapped(path)
+        st.session_state["merged_selection"] = st.session_state.pop("join_job_selection", None)
+        # Pas de point de sauvegarde pour un résultat hors mémoire : le précédent est périmé
+        checkpoint_dataset("df_merged", None)
+        st.success(
+            f"✅ Jointure terminée : {reports[-1]['rows']:,} lignes en {sum(report['seconds'] for report in reports):,.1f} s "
+            f"({format_bytes(sum(report['spilled_bytes'] for report in reports))} écrits sur disque)"
+        )
+    elif job.status == "cancelled":
+        st.info("⛔ Jointure hors mémoire annulée")
+    else:
+        st.error(f"❌ Échec de la jointure hors mémoire : {job.error}")
+
+def show_join_job():
+    """Progress of the running out-of-core join with a cancel button; returns True while it runs"""
+    job_id = st.session_state.get("join_job")
+    job = get_job(job_id) if job_id is not None else None
+    if job is None or job.done:
+        return job is not None
+    
+    st.progress(job.progress, text=f"⏳ {job.name} • {job.message or 'Démarrage...'}")
+    st.caption(f"⏱️ {job.elapsed:,.0f} s • Mémoire limitée à {format_bytes(JOIN_MEMORY_BUDGET)}")
+    if st.button("⛔ Annuler la jointure"):
+        cancel_job(job_id)
+    return True
+
+def show_key_join(db_path, tables, selected_columns, table_fields):
+    """
+    Join the selected tables on key columns: every other table is joined onto the
+    first one. The cardinality and estimated memory of each join are shown before
+    it runs; the result becomes the merged dataset.
+    """
+    base = tables[0]
+    how = JOIN_TYPES[st.selectbox("Type de jointure", list(JOIN_TYPES))]
+    
+    keys = []
+    for table in tables[1:]:
+        col1, col2 = st.columns(2)
+        with col1:
+            left_on = st.multiselect(f"Clés de {base} (jointure avec {table})", table_fields[base], key=f"join_left_{table}")
+        with col2:
+            right_on = st.multiselect(f"Clés correspondantes de {table}", table_fields[table], key=f"join_right_{table}")
+        if not left_on or len(left_on) != len(right_on):
+            st.info(f"Choisissez autant de clés de {base} que de {table} (dans le même ordre).")
+            return
+        keys.append((table, left_on, right_on))
+    
+    # Colonnes lues : celles choisies plus les clés
+    base_columns = list(dict.fromkeys(selected_columns.get(base, []) + [col for _, left_on, _ in keys for col in left_on]))
+    selection = {"how": how, "keys": keys, "columns": selected_columns}
+    
+    if st.checkbox(
+        "💽 Jointure hors mémoire (tables plus grandes que la mémoire)",
+        help=f"Les tables sont lues par blocs et réparties sur disque ; mémoire limitée à {format_bytes(JOIN_MEMORY_BUDGET)}.",
+    ):
+        steps = [
+            (table, list(dict.fromkeys(selected_columns.get(table, []) + right_on)), left_on, right_on)
+            for table, left_on, right_on in keys
+        ]
+        if st.button("💽 Exécuter la jointure hors mémoire", disabled=st.session_state.get("join_job") is not None):
+            start_join_job(db_path, base, base_columns, steps, how, selection)
+        elif st.session_state.get("merged_selection") != selection:
+            st.caption("Les données fusionnées ne correspondent pas encore à ces choix : exécutez la jointure.")
+        return
+    
+    left = read_table(db_path, base, base_columns)
+    
+    # Plans gardés entre deux affichages tant que les tables, colonnes et clés sont les mêmes
+    previous_plans = st.session_state.get("join_plans", {})
+    plans = {}
+    steps = []
+    rows = []
+    for table, left_on, right_on in keys:
+        columns = list(dict.fromkeys(selected_columns.get(table, []) + right_on))
+        right = read_table(db_path, table, columns)
+        spec = (db_path, how, base, tuple(base_columns), table, tuple(columns), tuple(left_on), tuple(right_on))
+        plan = previous_plans.get(spec) or plan_join(left, right, left_on, right_on, how, suffix=f"_{table}")
+        plans[spec] = plan
+        steps.append((right, left_on, right_on, f"_{table}", plan))
+        rows.append({
+            "Table": table,
+            "Relation": plan["relation"],
+            "Lignes": plan["rows"],
+            f"Sans correspondance ({base})": plan["left_unmatched"],
+            f"Sans correspondance ({table})": plan["right_unmatched"],
+            "Mémoire estimée": format_bytes(plan["estimated_bytes"]),
+        })
+    st.session_state["join_plans"] = plans
+    
+    st.write("### Plan de la jointure :")
+    st.dataframe(pd.DataFrame(rows), hide_index=True)
+    # Chaque jointure multiplie les lignes de la table de départ par son facteur de cardinalité
+    total_rows = float(len(left))
+    for plan in plans.values():
+        total_rows *= plan["rows"] / len(left) if len(left) else 0
+    row_bytes = steps[0][4]["left_row_bytes"] + sum(plan["right_row_bytes"] for plan in plans.values())
+    estimated_bytes = int(total_rows * row_bytes)
+    st.write(f"Résultat estimé : {int(total_rows):,} lignes, {format_bytes(estimated_bytes)}")
+    if estimated_bytes > SESSION_MEMORY_BUDGET:
+        st.warning(
+            f"Le résultat dépasse le budget mémoire de la session ({format_bytes(SESSION_MEMORY_BUDGET)}) : "
+            "utilisez la jointure hors mémoire."
+        )
+    
+    if st.button("🔗 Exécuter la jointure"):
+        with st.spinner("Jointure en cours..."):
+            joined = star_join(left, steps, how)
+        st.session_state["df_merged"] = joined
+        st.session_state["merged_selection"] = selection
+        checkpoint_dataset("df_merged", joined, "Données fusionnées")
+    elif st.session_state.get("merged_selection") != selection:
+        st.caption("Les données fusionnées ne correspondent pas encore à ces choix : exécutez la jointure.")
 
 def show_page():
     st.title("🔀 Fusion et Nettoyage de Données")
     
+    collect_join_job()
+    join_running = show_join_job()
+    
     if st.session_state["db_path"]:
         try:
-            conn_str = f"DRIVER={{Microsoft Access Driver (*.mdb, *.accdb)}};DBQ={st.session_state['db_path']}"
-            conn = pyodbc.connect(conn_str)
-            cursor = conn.cursor()
-            
             # Sélection des tables
             selected_tables = st.multiselect("Sélectionnez les tables à combiner", st.session_state["tables"])
             
@@ -20,29 +203,57 @@ def show_page():
             selected_columns = {}
             
             if selected_tables:
+                mode = st.radio("Mode de combinaison", ["Colonnes côte à côte", "Jointure par clé"], horizontal=True)
+                key_join = mode == "Jointure par clé"
+                table_fields = {}
                 for table in selected_tables:
-                    df_temp = pd.read_sql(f"SELECT * FROM [{table}]", conn)
-                    columns = st.multiselect(f"Sélectionnez les colonnes de {table}", df_temp.columns, key=table)
+                    # Colonnes lues dans les métadonnées de la base, sans lire de lignes
+                    table_schema = table_columns(st.session_state["db_path"], table)
+                    column_types = {column["name"]: column["type"] for column in table_schema}
+                    table_fields[table] = list(column_types)
+                    columns = st.multiselect(
+                        f"Sélectionnez les colonnes de {table}",
+                        list(column_types),
+                        format_func=lambda name, types=column_types: f"{name} ({types[name]})",
+                        key=table,
+                    )
                     if columns:
                         selected_columns[table] = columns
+                        if key_join:
+                            continue
+                        # Seules les colonnes choisies sont lues (puis servies par le cache)
+                        df_temp = read_table(st.session_state["db_path"], table, columns)
                         if combined_df.empty:
-                            combined_df = df_temp[columns]
+                            combined_df = df_temp
                         else:
-                            combined_df = pd.concat([combined_df, df_temp[columns]], axis=1)
+                            combined_df = pd.concat([combined_df, df_temp], axis=1)
                 
-                st.session_state["df_merged"] = combined_df
-                st.write("### Données combinées :")
-                st.dataframe(combined_df)
-            
-            conn.close()
+                if key_join:
+                    if len(selected_tables) < 2:
+                        st.info("Sélectionnez au moins deux tables pour une jointure.")
+                    else:
+                        show_key_join(st.session_state["db_path"], selected_tables, selected_columns, table_fields)
+                else:
+                    st.session_state["df_merged"] = combined_df
+                    # Point de sauvegarde uniquement quand la sélection de tables/colonnes change
+                    if selected_columns != st.session_state.get("merged_selection"):
+                        st.session_state["merged_selection"] = selected_columns
+                        checkpoint_dataset("df_merged", combined_df, "Données fusionnées")
+                    st.write("### Données combinées :")
+                    st.dataframe(combined_df)
         except Exception as e:
             st.error(f"Erreur de connexion à la base de données: {e}")
     else:
         st.warning("Veuillez d'abord charger une base de données dans l'onglet Accueil")
     
     # Nettoyage des données fusionnées
-    if "df_merged" in st.session_state and not st.session_state["df_merged"].empty:
-        df_cleaned = st.session_state["df_merged"].copy()
+    df_merged = get_dataset("df_merged")
+    if df_merged is not None and not df_merged.empty:
+        df_cleaned = df_merged
+        # Types des colonnes détectés une fois pour la fusion (nettoyage et filtres gardent les colonnes)
+        schema = dataset_schema(df_merged)
+        numeric_columns = columns_of_kind(schema, 'numeric', as_text=False)
+        category_columns = columns_of_kind(schema, 'categorical')
         
         # Sidebar buttons for toggling sections
         with st.sidebar:
@@ -69,26 +280,26 @@ def show_page():
                     df_cleaned.drop_duplicates(inplace=True)
                     st.write("✔️ Doublons supprimés.")
                 
-                numeric_cols = df_cleaned.select_dtypes(include=['float64', 'int64']).columns
+                numeric_cols = numeric_columns
                 if st.checkbox("Normaliser les données numériques") and len(numeric_cols) > 0:
-                    df_cleaned[numeric_cols] = (df_cleaned[numeric_cols] - df_cleaned[numeric_cols].min()) / (df_cleaned[numeric_cols].max() - df_cleaned[numeric_cols].min())
+                    # Passage en float64 : les entiers compactés (int8...) débordent sur max - min
+                    values = df_cleaned[numeric_cols].astype('float64')
+                    df_cleaned[numeric_cols] = (values - values.min()) / (values.max() - values.min())
                     st.write("✔️ Normalisation appliquée.")
         
-        # Filtrage dynamique
-        df_filtered = df_cleaned.copy()
+        # Filtrage dynamique (les filtres créent de nouveaux DataFrames, sans modifier df_cleaned)
+        df_filtered = df_cleaned
         if st.session_state.get("show_filtering_fusion", False):
             st.subheader("🎛️ Filtrage des Données")
             
             with st.expander("Filtrer par catégories", expanded=True):
-                cat_columns = df_filtered.select_dtypes(include=["object", "category"]).columns
-                for col in cat_columns:
+                for col in category_columns:
                     selected_values = st.multiselect(f"Filtrer {col}", df_filtered[col].dropna().unique())
                     if selected_values:
                         df_filtered = df_filtered[df_filtered[col].isin(selected_values)]
             
             with st.expander("Filtrer par valeurs numériques", expanded=True):
-                num_columns = df_filtered.select_dtypes(include=["int64", "float64"]).columns
-                for col in num_columns:
+                for col in numeric_columns:
                     min_val, max_val = float(df_filtered[col].min()), float(df_filtered[col].max())
                     if min_val < max_val:
                         selected_range = st.slider(f"Filtrer {col}", min_val, max_val, (min_val, max_val))
@@ -132,7 +343,7 @@ def show_page():
                     graph_type = st.selectbox("Choisissez un type de graphique", ["Histogramme", "Nuage de points", "Graphique en barres", "Camembert"])
                     
                     if graph_type == "Histogramme":
-                        num_cols = df_filtered.select_dtypes(include=['int64', 'float64']).columns
+                        num_cols = numeric_columns
                         if len(num_cols) > 0:
                             column = st.selectbox("Sélectionnez une colonne numérique", num_cols)
                             nbins = st.slider("Nombre de groupes", 5, 100, 30)
@@ -151,7 +362,7 @@ def show_page():
                             st.plotly_chart(fig, use_container_width=True)
                     
                     elif graph_type == "Graphique en barres":
-                        cat_cols = df_filtered.select_dtypes(include=['object', 'category']).columns
+                        cat_cols = columns_of_kind(schema, 'categorical', 'text')
                         if len(cat_cols) > 0:
                             column = st.selectbox("Sélectionnez une colonne catégorielle", cat_cols)
                             limit = st.slider("Limite de catégories à afficher", 1, 50, 10)
@@ -162,7 +373,7 @@ def show_page():
                             st.warning("Aucune colonne catégorielle disponible pour le graphique en barres")
                     
                     elif graph_type == "Camembert":
-                        cat_cols = df_filtered.select_dtypes(include=['object', 'category']).columns
+                        cat_cols = columns_of_kind(schema, 'categorical', 'text')
                         if len(cat_cols) > 0:
                             column = st.selectbox("Sélectionnez une colonne catégorielle", cat_cols)
                             limit = st.slider("Limite de catégories à afficher", 1, 20, 5)
@@ -173,5 +384,10 @@ def show_page():
                             st.warning("Aucune colonne catégorielle disponible pour le camembert")
             else:
                 st.warning("Aucune donnée disponible pour la visualisation.")
-    elif "df_merged" in st.session_state and st.session_state["df_merged"].empty:
-        st.warning("Le jeu de données fusionné est vide. Veuillez sélectionner des tables et des colonnes.")
\ No newline at end of file
+    elif df_merged is not None and df_merged.empty:
+        st.warning("Le jeu de données fusionné est vide. Veuillez sélectionner des tables et des colonnes.")
+    
+    # Rafraîchissement de la progression tant que la jointure hors mémoire tourne
+    if join_running:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
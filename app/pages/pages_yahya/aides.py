@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Aides sociales suivies par le tableau de bord ; la position dans la liste est le numéro du bit
+AIDES = ["Internat", "Dar talib", "Programme Tayssir", "Fournitures scolaires",
+         "Transport scolaire", "Restauration", "Un million de cartables"]
+
+# Colonne qui remplace les sept colonnes d'aides : un uint8 par étudiant
+AIDES_CODE_COLUMN = "code_aides"
+
+# Nombre de bits à 1 pour chaque code possible (nombre d'aides reçues)
+POPCOUNT = np.array([bin(code).count("1") for code in range(256)], dtype=np.uint8)
+# BIT_TABLE[code, i] vaut 1 si le code contient l'aide i
+BIT_TABLE = ((np.arange(256)[:, None] >> np.arange(len(AIDES))) & 1).astype(np.int64)
+
+
+def pack_aides(df, aides=AIDES):
+    """
+    Pack the aid flag columns of df into one uint8 code per student.
+    Bit i is set when the student receives aides[i]; missing columns and
+    missing values count as "no aid", any non-zero value as "aid".
+    """
+    codes = np.zeros(len(df), dtype=np.uint8)
+    for bit, aide in enumerate(aides):
+        if aide in df.columns:
+            flags = df[aide].fillna(0).to_numpy() != 0
+            codes |= flags.astype(np.uint8) << np.uint8(bit)
+    return pd.Series(codes, index=df.index, name=AIDES_CODE_COLUMN)
+
+
+def _as_codes(codes):
+    return np.asarray(codes, dtype=np.uint8)
+
+
+def has_any_aid(codes):
+    """Boolean mask of the students receiving at least one aid"""
+    return _as_codes(codes) != 0
+
+
+def has_aid(codes, aide):
+    """Boolean mask of the students receiving the given aid"""
+    return (_as_codes(codes) >> np.uint8(AIDES.index(aide))) & 1 == 1
+
+
+def aid_count(codes):
+    """Number of aids received by each student (popcount of the code)"""
+    return POPCOUNT[_as_codes(codes)]
+
+
+def aid_totals(codes, weights=None):
+    """
+    Number of beneficiaries of each aid, as a Series indexed by aid name.
+    The codes are first reduced to a 256-bin histogram, so the cost does not
+    depend on the number of aids. weights (row counts) is optional.
+    """
+    histogram = np.bincount(_as_codes(codes), weights=weights, minlength=256)
+    totals = histogram @ BIT_TABLE
+    return pd.Series(totals.round().astype(np.int64), index=AIDES)
+
+
+def group_aid_totals(codes, keys, weights=None):
+    """
+    Number of beneficiaries of each aid for each value of keys.
+    Returns a DataFrame indexed by the group values with one column per aid.
+    """
+    frame = pd.DataFrame({
+        "key": keys.values if isinstance(keys, pd.Series) else np.asarray(keys),
+        "code": _as_codes(codes),
+        "weight": 1 if weights is None else np.asarray(weights),
+    })
+    histogram = (
+        frame.groupby(["key", "code"], observed=True)["weight"].sum()
+        .unstack("code", fill_value=0)
+    )
+    totals = histogram.to_numpy() @ BIT_TABLE[histogram.columns.to_numpy(dtype=np.int64)]
+    result = pd.DataFrame(totals.round().astype(np.int64), index=histogram.index, columns=AIDES)
+    result.index.name = getattr(keys, "name", None)
+    return result
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from pages.pages_yahya.aides import AIDES_CODE_COLUMN
+
+# Dimensions du cube, dans l'ordre du regroupement (seules les colonnes présentes sont utilisées)
+CUBE_DIMENSIONS = ['age', 'genre', 'milieu', 'commune', 'etab', 'cycle', 'niveau', 'situation', AIDES_CODE_COLUMN]
+# Colonne du cube contenant le nombre d'étudiants de chaque combinaison
+COUNT_COLUMN = 'effectif'
+
+
+def build_cube(df):
+    """
+    Aggregate the student rows into a cube of counts over CUBE_DIMENSIONS.
+    Each cube row is one observed combination of dimension values with the
+    number of students sharing it; missing values are kept as their own member
+    so that totals match the row-level data.
+    """
+    dimensions = [dim for dim in CUBE_DIMENSIONS if dim in df.columns]
+    cube = (
+        df.groupby(dimensions, observed=True, dropna=False, sort=False)
+        .size()
+        .reset_index(name=COUNT_COLUMN)
+    )
+    cube[COUNT_COLUMN] = pd.to_numeric(cube[COUNT_COLUMN], downcast='integer')
+    return cube
+
+
+def update_cube(cube, removed, added):
+    """
+    Apply a delta of student rows to the cube without rebuilding it.
+    The counts of the removed rows (old versions of updated students) are
+    subtracted and those of the added rows added. Existing combinations keep
+    their cube row, so the cube's DatasetIndex stays valid for them; new
+    combinations are appended at the end and combinations left without any
+    student are dropped.
+    Returns the new cube, the positions of the appended rows in it and the
+    positions of the dropped rows in the old cube (the cube's indexes must be
+    rebuilt when some rows were dropped).
+    """
+    dimensions = [dim for dim in CUBE_DIMENSIONS if dim in cube.columns]
+    removed_cube = build_cube(removed[dimensions])
+    removed_cube[COUNT_COLUMN] = -removed_cube[COUNT_COLUMN].astype(np.int64)
+    changes = (
+        pd.concat([build_cube(added[dimensions]), removed_cube], ignore_index=True)
+        .groupby(dimensions, observed=True, dropna=False, sort=False)[COUNT_COLUMN].sum()
+    )
+    changes = changes[changes != 0]
+
+    positions = pd.MultiIndex.from_frame(cube[dimensions]).get_indexer(changes.index)
+    counts = cube[COUNT_COLUMN].to_numpy(dtype=np.int64).copy()
+    np.add.at(counts, positions[positions >= 0], changes.to_numpy()[positions >= 0])
+
+    appended = changes[positions < 0].reset_index()
+    for dim in dimensions:
+        if isinstance(cube[dim].dtype, pd.CategoricalDtype):
+            new_values = pd.Index(appended[dim].dropna().unique()).difference(cube[dim].cat.categories)
+            categories = cube[dim].cat.categories.append(new_values)
+            appended[dim] = pd.Categorical(appended[dim], categories=categories)
+
+    updated = cube.copy(deep=False)
+    updated[COUNT_COLUMN] = counts
+    for dim in dimensions:
+        if isinstance(cube[dim].dtype, pd.CategoricalDtype):
+            updated[dim] = updated[dim].cat.set_categories(appended[dim].cat.categories)
+    updated = pd.concat([updated, appended[updated.columns]], ignore_index=True)
+    updated[COUNT_COLUMN] = pd.to_numeric(updated[COUNT_COLUMN], downcast='integer')
+    appended = np.arange(len(cube), len(updated))
+
+    # Combinations sans plus aucun élève : retirées du cube (options de filtre, bornes d'âge...)
+    empty = updated[COUNT_COLUMN].to_numpy() == 0
+    dropped = np.flatnonzero(empty[:len(cube)])
+    if empty.any():
+        kept = np.flatnonzero(~empty)
+        appended = np.searchsorted(kept, appended[~empty[len(cube):]])
+        updated = updated.take(kept).reset_index(drop=True)
+    return updated, appended, dropped
+
+
+def slice_cube(index, age_range=None, selections=None):
+    """
+    Cube rows matching the sidebar filters.
+    index is the DatasetIndex of the cube: the multiselects are answered by its
+    bitmaps, the age range by its sorted age index, and the matching rows are
+    taken once. selections maps a dimension to the list of selected values; an
+    empty list means no filter.
+    """
+    bits = index.select(selections or {})
+    if age_range is not None:
+        bits = index.select_ranges({'age': age_range}, bits)
+    return index.take(bits)
+
+
+def total(cube, mask=None):
+    """Number of students in the (masked) cube"""
+    counts = cube[COUNT_COLUMN] if mask is None else cube.loc[mask, COUNT_COLUMN]
+    return int(counts.sum())
+
+
+def rollup(cube, by, mask=None):
+    """Number of students per value of the dimension(s) by, as a Series"""
+    view = cube if mask is None else cube[mask]
+    return view.groupby(by, observed=True)[COUNT_COLUMN].sum()
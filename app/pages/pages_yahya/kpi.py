@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from pages.pages_yahya.aides import AIDES_CODE_COLUMN, aid_count, aid_totals, group_aid_totals
+from pages.pages_yahya.cube import COUNT_COLUMN
+
+# Codes de la colonne situation
+NON_REINSCRIT_SITUATION = 2
+QUIT_SCHOOL_SITUATION = 5
+ABANDON_SITUATIONS = [NON_REINSCRIT_SITUATION, QUIT_SCHOOL_SITUATION]
+
+# Taux dérivés des indicateurs additifs (en % du total des étudiants)
+RATES = {
+    'Taux_Abandon': 'Total_Abandons',
+    'Taux_Non_Réinscrits': 'Non_Réinscrits',
+    'Taux_Quittent_École': 'Quittent_École',
+    'Taux_Bénéficiaires': 'Bénéficiaires',
+}
+
+
+def _add_rates(frame):
+    """Add the rate columns to a frame of additive indicators"""
+    totals = frame['Total_Étudiants']
+    for rate, indicator in RATES.items():
+        frame[rate] = np.where(totals > 0, frame[indicator] / np.maximum(totals, 1) * 100, 0.0)
+    return frame
+
+
+class KpiEngine:
+    """
+    Dashboard KPIs for one (filtered) cube or student frame.
+
+    The per-row indicators (abandons, non-réinscrits, quitters, beneficiaries,
+    number of aids) are built once as weighted columns; totals and any grouping
+    are then a single vectorized sum, memoized so that sections sharing a
+    grouping key reuse the same result.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        if COUNT_COLUMN in data.columns:
+            self.counts = data[COUNT_COLUMN].to_numpy(dtype=np.int64)
+        else:
+            self.counts = np.ones(len(data), dtype=np.int64)
+
+        situation = data['situation'].to_numpy()
+        self.abandon_mask = np.isin(situation, ABANDON_SITUATIONS)
+        if AIDES_CODE_COLUMN in data.columns:
+            self.aid_codes = data[AIDES_CODE_COLUMN].to_numpy()
+        else:
+            self.aid_codes = np.zeros(len(data), dtype=np.uint8)
+
+        self.indicators = pd.DataFrame({
+            'Total_Étudiants': self.counts,
+            'Total_Abandons': self.counts * self.abandon_mask,
+            'Non_Réinscrits': self.counts * (situation == NON_REINSCRIT_SITUATION),
+            'Quittent_École': self.counts * (situation == QUIT_SCHOOL_SITUATION),
+            'Bénéficiaires': self.counts * (self.aid_codes != 0),
+            'Total_Aides': self.counts * aid_count(self.aid_codes),
+        }, index=data.index)
+        self._results = {}
+
+    def totals(self):
+        """Indicators (as int) and rates (as float) over all rows, as a dict"""
+        if None not in self._results:
+            totals = {name: int(value) for name, value in self.indicators.sum().items()}
+            for rate, indicator in RATES.items():
+                totals[rate] = totals[indicator] / totals['Total_Étudiants'] * 100 if totals['Total_Étudiants'] > 0 else 0.0
+            self._results[None] = totals
+        return self._results[None]
+
+    def by(self, keys):
+        """Indicators and rates per value of the dimension(s) keys, as a DataFrame"""
+        cache_key = tuple(keys) if isinstance(keys, list) else keys
+        if cache_key not in self._results:
+            grouped = self.indicators.groupby(
+                [self.data[key] for key in keys] if isinstance(keys, list) else self.data[keys],
+                observed=True,
+            ).sum()
+            self._results[cache_key] = _add_rates(grouped)
+        return self._results[cache_key]
+
+    def series(self, keys, indicator):
+        """One indicator per group, keeping only the groups where it is non-zero"""
+        values = self.by(keys)[indicator]
+        return values[values > 0]
+
+    def aids_by(self, keys):
+        """Number of beneficiaries of each aid per value of keys"""
+        cache_key = ('aides', keys)
+        if cache_key not in self._results:
+            self._results[cache_key] = group_aid_totals(self.aid_codes, self.data[keys], weights=self.counts)
+        return self._results[cache_key]
+
+    def aid_summary(self):
+        """Beneficiaries, abandons and abandon rate for each aid, as a DataFrame indexed by aid"""
+        if 'aid_summary' not in self._results:
+            summary = pd.DataFrame({
+                'Bénéficiaires': aid_totals(self.aid_codes, weights=self.counts),
+                'Abandons': aid_totals(self.aid_codes, weights=self.counts * self.abandon_mask),
+            })
+            summary['Taux_Abandon'] = np.where(
+                summary['Bénéficiaires'] > 0,
+                summary['Abandons'] / np.maximum(summary['Bénéficiaires'], 1) * 100,
+                0.0,
+            )
+            self._results['aid_summary'] = summary
+        return self._results['aid_summary']
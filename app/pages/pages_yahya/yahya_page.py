@@ -1,7 +1,94 @@
+import hashlib
+import re
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from data_engine.cache import cached_read, fingerprint_file
+from data_engine.compaction import compact_dataframe
+from data_engine.excel import excel_variant, read_excel_fast
+from data_engine.indexes import DatasetIndex, HierarchyIndex
+from data_engine.masks import mask_cache_stats
+from data_engine.upsert import upsert_frames
+from pages.pages_yahya.aides import AIDES, AIDES_CODE_COLUMN, pack_aides
+from pages.pages_yahya.cube import COUNT_COLUMN, build_cube, slice_cube, update_cube
+from pages.pages_yahya.kpi import KpiEngine
+from utils import format_bytes
+
+# Column renaming for consistency
+COLS_MAPPING = {
+    'id_situation': 'situation',
+    'GenreFr': 'genre',
+    'cycle': 'cycle',
+    'niveux': 'niveau',
+    'LL_MIL': 'milieu',
+    'll_com': 'commune',
+    'NOM_ETABL': 'etab',
+    'Age': 'age'
+}
+# Student identifier columns (code Massar, id...), kept for monthly delta updates
+ID_COLUMN_PATTERN = re.compile(r"^id|massar|^code", re.IGNORECASE)
+# Columns read from the files: the dashboard columns, the aids and the identifiers
+USED_COLUMNS = set(COLS_MAPPING) | set(COLS_MAPPING.values()) | set(AIDES)
+
+
+def is_used_column(col):
+    return str(col) in USED_COLUMNS or bool(ID_COLUMN_PATTERN.search(str(col)))
+
+
+def prepare_students(df):
+    """Rename the columns and pack the social aids columns into one uint8 bitmask per student"""
+    df = df.rename(columns={c: COLS_MAPPING[c] for c in COLS_MAPPING if c in df.columns})
+    # Missing aid columns simply leave their bit at 0
+    df[AIDES_CODE_COLUMN] = pack_aides(df)
+    return df.drop(columns=[aide for aide in AIDES if aide in df.columns])
+
+
+def apply_student_delta(data, delta, key, delta_fingerprint):
+    """
+    Upsert a monthly delta file into loaded dashboard data, by the key column.
+    The student rows, the cube, its filter index and the dependent filter
+    hierarchies are updated incrementally; data itself is not modified.
+    The new cube is keyed (for the shared mask cache) by the current cube's key,
+    the delta fingerprint and the key column, so every chain of deltas gets its
+    own key.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (data['cube_index'].key, delta_fingerprint, str(key)):
+        digest.update(str(part).encode())
+    fingerprint = digest.hexdigest()
+
+    delta, _ = compact_dataframe(delta)
+    delta = prepare_students(delta)
+    students, info = upsert_frames(data['students'], delta, key)
+    cube, appended, dropped = update_cube(data['cube'], info['replaced'], students.take(info['new_rows']))
+
+    if len(dropped):
+        # Combinations emptied by the delta were removed: positions changed, the indexes are rebuilt
+        cube_index = DatasetIndex(cube, key=fingerprint)
+        hierarchies = {
+            child: HierarchyIndex(cube, hierarchy.parent, child) for child, hierarchy in data['hierarchies'].items()
+        }
+    else:
+        # Existing cube rows keep their position and dimensions: only appended rows are indexed
+        cube_index = data['cube_index'].upserted(cube, [], key=fingerprint)
+        hierarchies = {
+            child: hierarchy.updated(cube.take(appended)) for child, hierarchy in data['hierarchies'].items()
+        }
+
+    updated = dict(data)
+    updated.update({
+        'students': students,
+        'rows': len(students),
+        'cube': cube,
+        'cube_index': cube_index,
+        'hierarchies': hierarchies,
+        'updates': data.get('updates', []) + [{
+            'updated': len(info['updated_rows']),
+            'inserted': info['inserted'],
+        }],
+    })
+    return updated
 
 def show_page():
     
@@ -217,66 +304,125 @@ def show_page():
     )
     st.markdown('</div>', unsafe_allow_html=True)
 
-    @st.cache_data
-    def load_data(file):
-        """Load data from uploaded file"""
+    # Required columns for the dashboard
+    required_columns = ['situation', 'age']
+
+    @st.cache_resource(max_entries=8)
+    def load_data(fingerprint, _file):
+        """
+        Load data from uploaded file (through the on-disk dataset cache), compact dtypes
+        and aggregate the students into the dashboard cube with its bitmap filter index.
+        The file is identified by its fingerprint so Streamlit does not hash its whole content;
+        the result is shared as is (not copied on each rerun) and must not be modified.
+        """
         try:
-            if file.name.endswith(".csv"):
-                df = pd.read_csv(file)
+            if _file.name.endswith(".csv"):
+                df = cached_read(_file, pd.read_csv, variant="csv")
             else:
-                df = pd.read_excel(file)
-            return df
+                # Only the columns used by the dashboard (and the identifiers) are parsed from workbooks
+                df = cached_read(
+                    _file,
+                    lambda f: read_excel_fast(f, usecols=is_used_column),
+                    variant=excel_variant(0, sorted(USED_COLUMNS)) + "+ids",
+                )
+            df, compaction_report = compact_dataframe(df)
         except Exception as e:
             st.error(f"Erreur lors du chargement du fichier: {str(e)}")
             return None
 
+        # Rename columns if they exist
+        df = df.rename(columns={c: COLS_MAPPING[c] for c in COLS_MAPPING if c in df.columns})
+
+        data = {
+            'preview': df.head(),
+            'rows': len(df),
+            'columns': len(df.columns),
+            'memory': compaction_report,
+            'cube': None,
+            'cube_index': None,
+            'hierarchies': {},
+            'students': None,
+        }
+
+        if all(col in df.columns for col in required_columns):
+            # Compact student rows (aids packed in one uint8), kept for monthly delta updates
+            df = prepare_students(df)
+            data['students'] = df
+
+            # Every KPI and chart is a slice or roll-up of this cube; the filter bitmaps
+            # are cached per (fingerprint, column, selection) and reused across reruns
+            data['cube'] = build_cube(df)
+            data['cube_index'] = DatasetIndex(data['cube'], key=fingerprint)
+
+            # Dependent filters: children of each parent value, precomputed once
+            for parent, child in [('commune', 'etab'), ('cycle', 'niveau')]:
+                if parent in df.columns and child in df.columns:
+                    data['hierarchies'][child] = HierarchyIndex(data['cube'], parent, child)
+
+        return data
+
     if uploaded_file:
-        df = load_data(uploaded_file)
+        fingerprint = fingerprint_file(uploaded_file, "yahya")
+        data = load_data(fingerprint, uploaded_file)
+
+        # Monthly deltas already applied to this file in the session
+        updates = st.session_state.get("yahya_updates")
+        if data is not None and updates is not None and updates['base'] == fingerprint:
+            data = updates['data']
         
-        if df is not None:
-            # Column renaming for consistency
-            cols_mapping = {
-                'id_situation': 'situation',
-                'GenreFr': 'genre',
-                'cycle': 'cycle',
-                'niveux': 'niveau',
-                'LL_MIL': 'milieu',
-                'll_com': 'commune',
-                'NOM_ETABL': 'etab',
-                'Age': 'age'
-            }
-            
-            # Rename columns if they exist
-            df.rename(columns={c: cols_mapping[c] for c in cols_mapping if c in df.columns}, inplace=True)
+        if data is not None:
+            compaction_report = data['memory']
 
             # Data preview section with enhanced styling
             with st.expander("👀 Aperçu des données", expanded=False):
                 st.markdown('<div class="data-preview">', unsafe_allow_html=True)
-                st.dataframe(df.head(), use_container_width=True)
+                st.dataframe(data['preview'], use_container_width=True)
                 st.markdown(f"""
                 <div style="display: flex; justify-content: space-between; margin-top: 10px; padding: 10px; background: rgba(100, 255, 218, 0.1); border-radius: 8px;">
-                    <span><strong>📊 Lignes:</strong> {len(df):,}</span>
-                    <span><strong>📋 Colonnes:</strong> {len(df.columns)}</span>
+                    <span><strong>📊 Lignes:</strong> {data['rows']:,}</span>
+                    <span><strong>📋 Colonnes:</strong> {data['columns']}</span>
+                    <span><strong>💾 Mémoire:</strong> {format_bytes(compaction_report['before'])} → {format_bytes(compaction_report['after'])}</span>
                 </div>
                 """, unsafe_allow_html=True)
                 st.markdown('</div>', unsafe_allow_html=True)
 
             # Verify required columns
-            required_columns = ['situation', 'age']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in required_columns if col not in data['preview'].columns]
             
             if missing_columns:
                 st.error(f"❌ Colonnes manquantes: {', '.join(missing_columns)}")
                 st.info("Les colonnes requises sont: " + ", ".join(required_columns))
                 st.stop()
 
-            # Initialize social aids columns
-            aides = ["Internat", "Dar talib", "Programme Tayssir", "Fournitures scolaires",
-                     "Transport scolaire", "Restauration", "Un million de cartables"]
-            
-            for aide in aides:
-                if aide not in df.columns:
-                    df[aide] = 0
+            # Monthly delta: only the changed students are merged, the indexes are updated in place
+            with st.expander("🔄 Mise à jour mensuelle", expanded=False):
+                for update in data.get('updates', []):
+                    st.caption(f"Mise à jour appliquée : {update['updated']:,} élèves modifiés, {update['inserted']:,} ajoutés")
+                delta_file = st.file_uploader(
+                    "Fichier des élèves nouveaux ou modifiés",
+                    type=["xlsx", "csv"],
+                    key="yahya_delta_file",
+                )
+                id_columns = [col for col in data['students'].columns if ID_COLUMN_PATTERN.search(str(col))]
+                if not id_columns:
+                    st.info("Aucune colonne d'identifiant (id, code Massar...) dans le fichier chargé")
+                elif delta_file is not None:
+                    key_column = st.selectbox("Colonne clé", id_columns, key="yahya_delta_key")
+                    if st.button("🔄 Appliquer la mise à jour"):
+                        try:
+                            if delta_file.name.endswith(".csv"):
+                                delta = pd.read_csv(delta_file)
+                            else:
+                                delta = read_excel_fast(delta_file, usecols=is_used_column)
+                            delta_fingerprint = fingerprint_file(delta_file, "yahya-delta")
+                            data = apply_student_delta(data, delta, key_column, delta_fingerprint)
+                        except (KeyError, ValueError) as e:
+                            st.error(f"❌ Mise à jour impossible : {e}")
+                        else:
+                            st.session_state["yahya_updates"] = {'base': fingerprint, 'data': data}
+                            st.rerun()
+
+            cube = data['cube']
 
             # Sidebar filters with enhanced styling
             st.sidebar.markdown(f"""
@@ -286,7 +432,7 @@ def show_page():
             """, unsafe_allow_html=True)
             
             # Age filter
-            age_min, age_max = int(df['age'].min()), int(df['age'].max())
+            age_min, age_max = (int(bound) for bound in data['cube_index'].bounds('age'))
             age_range = st.sidebar.slider(
                 "📅 Tranche d'âge", 
                 age_min, age_max, 
@@ -296,8 +442,8 @@ def show_page():
 
             # Genre filter
             genre_options = []
-            if 'genre' in df.columns:
-                genre_options = sorted(df['genre'].dropna().unique())
+            if 'genre' in cube.columns:
+                genre_options = sorted(cube['genre'].dropna().unique())
                 genre_selection = st.sidebar.multiselect(
                     "👥 Genre", 
                     options=genre_options,
@@ -308,8 +454,8 @@ def show_page():
 
             # Milieu filter
             milieu_options = []
-            if 'milieu' in df.columns:
-                milieu_options = sorted(df['milieu'].dropna().unique())
+            if 'milieu' in cube.columns:
+                milieu_options = sorted(cube['milieu'].dropna().unique())
                 milieu_selection = st.sidebar.multiselect(
                     "🏘️ Milieu", 
                     options=milieu_options,
@@ -320,8 +466,8 @@ def show_page():
 
             # Commune filter
             commune_options = []
-            if 'commune' in df.columns:
-                commune_options = sorted(df['commune'].dropna().unique())
+            if 'commune' in cube.columns:
+                commune_options = sorted(cube['commune'].dropna().unique())
                 commune_selection = st.sidebar.multiselect(
                     "🏙️ Commune", 
                     options=commune_options,
@@ -332,11 +478,11 @@ def show_page():
 
             # Établissement filter (dependent on commune)
             etab_options = []
-            if 'etab' in df.columns:
-                if commune_selection and 'commune' in df.columns:
-                    etab_options = sorted(df[df['commune'].isin(commune_selection)]['etab'].dropna().unique())
+            if 'etab' in cube.columns:
+                if 'etab' in data['hierarchies']:
+                    etab_options = data['hierarchies']['etab'].children(commune_selection)
                 else:
-                    etab_options = sorted(df['etab'].dropna().unique())
+                    etab_options = sorted(cube['etab'].dropna().unique())
                 
                 etab_selection = st.sidebar.multiselect(
                     "🏫 Établissement", 
@@ -348,8 +494,8 @@ def show_page():
 
             # Cycle filter
             cycle_options = []
-            if 'cycle' in df.columns:
-                cycle_options = sorted(df['cycle'].dropna().unique())
+            if 'cycle' in cube.columns:
+                cycle_options = sorted(cube['cycle'].dropna().unique())
                 cycle_selection = st.sidebar.multiselect(
                     "📚 Cycle", 
                     options=cycle_options,
@@ -360,11 +506,11 @@ def show_page():
 
             # Niveau filter (dependent on cycle)
             niveau_options = []
-            if 'niveau' in df.columns:
-                if cycle_selection and 'cycle' in df.columns:
-                    niveau_options = sorted(df[df['cycle'].isin(cycle_selection)]['niveau'].dropna().unique())
+            if 'niveau' in cube.columns:
+                if 'niveau' in data['hierarchies']:
+                    niveau_options = data['hierarchies']['niveau'].children(cycle_selection)
                 else:
-                    niveau_options = sorted(df['niveau'].dropna().unique())
+                    niveau_options = sorted(cube['niveau'].dropna().unique())
                 
                 niveau_selection = st.sidebar.multiselect(
                     "📖 Niveau", 
@@ -374,41 +520,33 @@ def show_page():
             else:
                 niveau_selection = []
 
-            # Apply filters
-            filtered_data = df.copy()
-            
-            # Age filter
-            filtered_data = filtered_data[filtered_data['age'].between(age_range[0], age_range[1])]
-            
-            # Other filters
-            if genre_selection:
-                filtered_data = filtered_data[filtered_data['genre'].isin(genre_selection)]
-            if milieu_selection:
-                filtered_data = filtered_data[filtered_data['milieu'].isin(milieu_selection)]
-            if commune_selection:
-                filtered_data = filtered_data[filtered_data['commune'].isin(commune_selection)]
-            if etab_selection:
-                filtered_data = filtered_data[filtered_data['etab'].isin(etab_selection)]
-            if cycle_selection:
-                filtered_data = filtered_data[filtered_data['cycle'].isin(cycle_selection)]
-            if niveau_selection:
-                filtered_data = filtered_data[filtered_data['niveau'].isin(niveau_selection)]
-
-            # Calculate KPIs
-            total_students = len(filtered_data)
-            
-            # Define abandonment situations
-            abandon_mask = filtered_data['situation'].isin([2, 5])
-            non_reinscrit_mask = filtered_data['situation'] == 2
-            quit_school_mask = filtered_data['situation'] == 5
-            
-            total_abandons = filtered_data[abandon_mask].shape[0]
-            total_non_reinscrit = filtered_data[non_reinscrit_mask].shape[0]
-            total_quit_school = filtered_data[quit_school_mask].shape[0]
+            # Apply filters on the cube rows (one row per combination) instead of the students
+            filtered_cube = slice_cube(data['cube_index'], age_range, {
+                'genre': genre_selection,
+                'milieu': milieu_selection,
+                'commune': commune_selection,
+                'etab': etab_selection,
+                'cycle': cycle_selection,
+                'niveau': niveau_selection,
+            })
+
+            with st.sidebar.expander("🧠 Cache des filtres", expanded=False):
+                mask_stats = mask_cache_stats()
+                st.write(f"**Succès:** {mask_stats['hits']} • **Échecs:** {mask_stats['misses']} • **Taux:** {mask_stats['hit_rate']:.0%}")
+                st.write(
+                    f"**Masques:** {mask_stats['entries']} • **Taille:** {format_bytes(mask_stats['size_bytes'])}"
+                    f" / {format_bytes(mask_stats['max_bytes'])}"
+                )
+
+            # Calculate KPIs in one vectorized pass; groupings are memoized and shared by the sections
+            kpis = KpiEngine(filtered_cube)
+            kpi_totals = kpis.totals()
             
-            # Calculate beneficiaries of social aids
-            aid_beneficiaries = filtered_data[aides].any(axis=1)
-            total_beneficiaries = aid_beneficiaries.sum()
+            total_students = kpi_totals['Total_Étudiants']
+            total_abandons = kpi_totals['Total_Abandons']
+            total_non_reinscrit = kpi_totals['Non_Réinscrits']
+            total_quit_school = kpi_totals['Quittent_École']
+            total_beneficiaries = kpi_totals['Bénéficiaires']
 
             # Continue with Part 2...
             # Continuation from Part 1...
@@ -429,7 +567,7 @@ def show_page():
                 """, unsafe_allow_html=True)
             
             with col2:
-                abandon_rate = (total_abandons / total_students * 100) if total_students > 0 else 0
+                abandon_rate = kpi_totals['Taux_Abandon']
                 st.markdown(f"""
                 <div class="kpi-card">
                     <div class="kpi-title">❌ Abandons Totaux</div>
@@ -439,7 +577,7 @@ def show_page():
                 """, unsafe_allow_html=True)
             
             with col3:
-                non_reinscrit_rate = (total_non_reinscrit / total_students * 100) if total_students > 0 else 0
+                non_reinscrit_rate = kpi_totals['Taux_Non_Réinscrits']
                 st.markdown(f"""
                 <div class="kpi-card">
                     <div class="kpi-title">🔄 Non Ré-inscrits</div>
@@ -449,7 +587,7 @@ def show_page():
                 """, unsafe_allow_html=True)
             
             with col4:
-                quit_rate = (total_quit_school / total_students * 100) if total_students > 0 else 0
+                quit_rate = kpi_totals['Taux_Quittent_École']
                 st.markdown(f"""
                 <div class="kpi-card">
                     <div class="kpi-title">🚪 Quittent l'École</div>
@@ -459,7 +597,7 @@ def show_page():
                 """, unsafe_allow_html=True)
 
             # Beneficiaries metric with green arrow
-            beneficiary_rate = (total_beneficiaries / total_students * 100) if total_students > 0 else 0
+            beneficiary_rate = kpi_totals['Taux_Bénéficiaires']
             st.markdown(f"""
             <div class="dashboard-section animated-section">
                 <div class="kpi-card" style="max-width: 400px; margin: 0 auto;">
@@ -556,7 +694,7 @@ def show_page():
                 
                 with col1:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    abandon_age_data = filtered_data[abandon_mask].groupby('age').size().reset_index(name='Abandons')
+                    abandon_age_data = kpis.series('age', 'Total_Abandons').reset_index(name='Abandons')
                     if not abandon_age_data.empty:
                         fig_abandon_age = create_enhanced_chart(
                             abandon_age_data, "bar", "age", "Abandons", "Distribution des Abandons par Âge"
@@ -566,7 +704,7 @@ def show_page():
                 
                 with col2:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    beneficiary_age_data = filtered_data[aid_beneficiaries].groupby('age').size().reset_index(name='Bénéficiaires')
+                    beneficiary_age_data = kpis.series('age', 'Bénéficiaires').reset_index(name='Bénéficiaires')
                     if not beneficiary_age_data.empty:
                         fig_benef_age = create_enhanced_chart(
                             beneficiary_age_data, "bar", "age", "Bénéficiaires", "Bénéficiaires d'Aides par Âge"
@@ -576,8 +714,11 @@ def show_page():
                 
                 # Age distribution pie chart
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                age_groups = pd.cut(filtered_data['age'], bins=[0, 12, 15, 18, 25, 100], labels=['<12', '12-15', '15-18', '18-25', '25+'])
-                age_dist = age_groups.value_counts().reset_index()
+                age_groups = pd.cut(filtered_cube['age'], bins=[0, 12, 15, 18, 25, 100], labels=['<12', '12-15', '15-18', '18-25', '25+'])
+                age_dist = (
+                    filtered_cube[COUNT_COLUMN].groupby(age_groups, observed=False).sum()
+                    .sort_values(ascending=False).reset_index()
+                )
                 age_dist.columns = ['Groupe_Age', 'Nombre']
                 fig_age_dist = create_enhanced_chart(age_dist, "pie", "Groupe_Age", "Nombre", "Répartition par Groupes d'Âge")
                 st.plotly_chart(fig_age_dist, use_container_width=True)
@@ -586,7 +727,7 @@ def show_page():
                 st.markdown('</div>', unsafe_allow_html=True)
 
             # Genre Analysis Dashboard
-            if show_genre and 'genre' in filtered_data.columns:
+            if show_genre and 'genre' in filtered_cube.columns:
                 st.markdown('<div class="dashboard-section animated-section">', unsafe_allow_html=True)
                 st.markdown('<div class="section-header">👥 Dashboard d\'Analyse par Genre</div>', unsafe_allow_html=True)
                 
@@ -594,7 +735,7 @@ def show_page():
                 
                 with col1:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    abandon_genre_data = filtered_data[abandon_mask].groupby('genre').size().reset_index(name='Abandons')
+                    abandon_genre_data = kpis.series('genre', 'Total_Abandons').reset_index(name='Abandons')
                     if not abandon_genre_data.empty:
                         fig_abandon_genre = create_enhanced_chart(
                             abandon_genre_data, "pie", "genre", "Abandons", "Répartition des Abandons par Genre"
@@ -604,7 +745,7 @@ def show_page():
                 
                 with col2:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    beneficiary_genre_data = filtered_data[aid_beneficiaries].groupby('genre').size().reset_index(name='Bénéficiaires')
+                    beneficiary_genre_data = kpis.series('genre', 'Bénéficiaires').reset_index(name='Bénéficiaires')
                     if not beneficiary_genre_data.empty:
                         fig_benef_genre = create_enhanced_chart(
                             beneficiary_genre_data, "bar", "genre", "Bénéficiaires", "Bénéficiaires par Genre"
@@ -614,7 +755,7 @@ def show_page():
                 
                 # Social aids distribution by genre
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                aid_by_genre = filtered_data.groupby('genre')[aides].sum().reset_index()
+                aid_by_genre = kpis.aids_by('genre').reset_index()
                 aid_melted = aid_by_genre.melt(id_vars='genre', var_name='Type_Aide', value_name='Nombre')
                 
                 fig_aids_genre = px.bar(
@@ -633,7 +774,7 @@ def show_page():
                 st.markdown('</div>', unsafe_allow_html=True)
                 # Établissement Analysis Dashboard
 # Établissement Analysis Dashboard
-            if show_etab and 'etab' in filtered_data.columns:
+            if show_etab and 'etab' in filtered_cube.columns:
                 st.markdown('<div class="dashboard-section animated-section">', unsafe_allow_html=True)
                 st.markdown('<div class="section-header">🏫 Dashboard d\'Analyse par Établissement</div>', unsafe_allow_html=True)
                 
@@ -642,7 +783,7 @@ def show_page():
                 with col1:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     # Top establishments with most abandons
-                    abandon_etab_data = filtered_data[abandon_mask].groupby('etab').size().reset_index(name='Abandons').sort_values('Abandons', ascending=False).head(10)
+                    abandon_etab_data = kpis.series('etab', 'Total_Abandons').reset_index(name='Abandons').sort_values('Abandons', ascending=False).head(10)
                     if not abandon_etab_data.empty:
                         fig_abandon_etab = create_enhanced_chart(
                             abandon_etab_data, "bar", "etab", "Abandons", "Top 10 - Abandons par Établissement"
@@ -654,7 +795,7 @@ def show_page():
                 with col2:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     # Beneficiaries by establishment
-                    beneficiary_etab_data = filtered_data[aid_beneficiaries].groupby('etab').size().reset_index(name='Bénéficiaires').sort_values('Bénéficiaires', ascending=False).head(10)
+                    beneficiary_etab_data = kpis.series('etab', 'Bénéficiaires').reset_index(name='Bénéficiaires').sort_values('Bénéficiaires', ascending=False).head(10)
                     if not beneficiary_etab_data.empty:
                         fig_benef_etab = create_enhanced_chart(
                             beneficiary_etab_data, "bar", "etab", "Bénéficiaires", "Top 10 - Bénéficiaires par Établissement"
@@ -668,11 +809,7 @@ def show_page():
                 st.markdown('<div class="chart-title">📊 Analyse Détaillée des Établissements</div>', unsafe_allow_html=True)
                 
                 # Calculate abandon rate by establishment
-                etab_stats = filtered_data.groupby('etab').agg({
-                    'situation': ['count', lambda x: sum(x.isin([2, 5]))]
-                }).round(2)
-                etab_stats.columns = ['Total_Étudiants', 'Total_Abandons']
-                etab_stats['Taux_Abandon'] = (etab_stats['Total_Abandons'] / etab_stats['Total_Étudiants'] * 100).round(1)
+                etab_stats = kpis.by('etab')[['Total_Étudiants', 'Total_Abandons', 'Taux_Abandon']].round(1)
                 etab_stats = etab_stats.reset_index().sort_values('Taux_Abandon', ascending=False).head(15)
                 
                 if not etab_stats.empty:
@@ -695,7 +832,7 @@ def show_page():
                 st.markdown('</div>', unsafe_allow_html=True)
 
             # Milieu Analysis Dashboard
-            if show_milieu and 'milieu' in filtered_data.columns:
+            if show_milieu and 'milieu' in filtered_cube.columns:
                 st.markdown('<div class="dashboard-section animated-section">', unsafe_allow_html=True)
                 st.markdown('<div class="section-header">🏘️ Dashboard d\'Analyse par Milieu</div>', unsafe_allow_html=True)
                 
@@ -704,7 +841,7 @@ def show_page():
                 with col1:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     # Abandons by milieu
-                    abandon_milieu_data = filtered_data[abandon_mask].groupby('milieu').size().reset_index(name='Abandons')
+                    abandon_milieu_data = kpis.series('milieu', 'Total_Abandons').reset_index(name='Abandons')
                     if not abandon_milieu_data.empty:
                         fig_abandon_milieu = create_enhanced_chart(
                             abandon_milieu_data, "pie", "milieu", "Abandons", "Répartition des Abandons par Milieu"
@@ -715,7 +852,7 @@ def show_page():
                 with col2:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     # Beneficiaries by milieu
-                    beneficiary_milieu_data = filtered_data[aid_beneficiaries].groupby('milieu').size().reset_index(name='Bénéficiaires')
+                    beneficiary_milieu_data = kpis.series('milieu', 'Bénéficiaires').reset_index(name='Bénéficiaires')
                     if not beneficiary_milieu_data.empty:
                         fig_benef_milieu = create_enhanced_chart(
                             beneficiary_milieu_data, "bar", "milieu", "Bénéficiaires", "Bénéficiaires d'Aides par Milieu"
@@ -728,14 +865,10 @@ def show_page():
                 st.markdown('<div class="chart-title">🆚 Comparaison Urbain vs Rural</div>', unsafe_allow_html=True)
                 
                 # Create comparison metrics
-                milieu_comparison = filtered_data.groupby('milieu').agg({
-                    'situation': ['count', lambda x: sum(x.isin([2, 5]))],
-                    **{aide: 'sum' for aide in aides}
-                }).round(2)
-                
-                milieu_comparison.columns = ['Total_Étudiants', 'Total_Abandons'] + [f'Aide_{aide}' for aide in aides]
-                milieu_comparison['Taux_Abandon'] = (milieu_comparison['Total_Abandons'] / milieu_comparison['Total_Étudiants'] * 100).round(1)
-                milieu_comparison['Total_Aides'] = milieu_comparison[[f'Aide_{aide}' for aide in aides]].sum(axis=1)
+                # Total_Aides is the number of aids granted (sum of the popcounts of the aid codes)
+                milieu_comparison = kpis.by('milieu')[['Total_Étudiants', 'Total_Abandons', 'Total_Aides', 'Taux_Abandon']]
+                milieu_comparison = milieu_comparison.join(kpis.aids_by('milieu').add_prefix('Aide_'))
+                milieu_comparison['Taux_Abandon'] = milieu_comparison['Taux_Abandon'].round(1)
                 milieu_comparison = milieu_comparison.reset_index()
                 
                 if len(milieu_comparison) >= 2:
@@ -765,7 +898,7 @@ def show_page():
                 st.markdown('</div>', unsafe_allow_html=True)
 
             # Commune Analysis Dashboard
-            if show_commune and 'commune' in filtered_data.columns:
+            if show_commune and 'commune' in filtered_cube.columns:
                 st.markdown('<div class="dashboard-section animated-section">', unsafe_allow_html=True)
                 st.markdown('<div class="section-header">🏙️ Dashboard d\'Analyse par Commune</div>', unsafe_allow_html=True)
                 
@@ -774,7 +907,7 @@ def show_page():
                 with col1:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     # Top communes with most abandons
-                    abandon_commune_data = filtered_data[abandon_mask].groupby('commune').size().reset_index(name='Abandons').sort_values('Abandons', ascending=False).head(10)
+                    abandon_commune_data = kpis.series('commune', 'Total_Abandons').reset_index(name='Abandons').sort_values('Abandons', ascending=False).head(10)
                     if not abandon_commune_data.empty:
                         fig_abandon_commune = create_enhanced_chart(
                             abandon_commune_data, "bar", "commune", "Abandons", "Top 10 - Abandons par Commune"
@@ -786,7 +919,7 @@ def show_page():
                 with col2:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     # Top communes with most beneficiaries
-                    beneficiary_commune_data = filtered_data[aid_beneficiaries].groupby('commune').size().reset_index(name='Bénéficiaires').sort_values('Bénéficiaires', ascending=False).head(10)
+                    beneficiary_commune_data = kpis.series('commune', 'Bénéficiaires').reset_index(name='Bénéficiaires').sort_values('Bénéficiaires', ascending=False).head(10)
                     if not beneficiary_commune_data.empty:
                         fig_benef_commune = create_enhanced_chart(
                             beneficiary_commune_data, "bar", "commune", "Bénéficiaires", "Top 10 - Bénéficiaires par Commune"
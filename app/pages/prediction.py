@@ -5,12 +5,14 @@ import numpy as np
 import time
 import plotly.graph_objects as go
 import plotly.express as px
+from data_engine.schema import columns_of_kind, dataset_schema
+from utils import get_dataset
 
 def show_page():
     st.title("🤖 Modèles Prédictifs")
     
     if st.session_state["df"] is not None:
-        df = st.session_state["df"].copy()
+        df = get_dataset("df")
         
         # Section de sélection des paramètres du modèle
         st.sidebar.markdown("## 🎛️ Paramètres du modèle")
@@ -21,11 +23,13 @@ def show_page():
             df.columns
         )
         
-        # Sélection des caractéristiques
+        # Sélection des caractéristiques (les identifiants et le texte libre ne sont pas proposés par défaut)
+        schema = dataset_schema(df)
+        candidate_cols = columns_of_kind(schema, "numeric", "categorical", "datetime")
         feature_cols = st.sidebar.multiselect(
             "📊 Caractéristiques (X)",
             [col for col in df.columns if col != target_col],
-            default=[col for col in df.columns if col != target_col][:3]  # Par défaut, sélectionner les 3 premières colonnes
+            default=[col for col in candidate_cols if col != target_col][:3]  # Par défaut, sélectionner les 3 premières colonnes
         )
         
         # Option pour le traitement des valeurs catégorielles
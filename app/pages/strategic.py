@@ -6,6 +6,8 @@ import plotly.graph_objects as go
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+from data_engine.schema import columns_of_kind, convert_column, dataset_schema
+from utils import get_dataset, get_dataset_index
 
 def show_page():
     # Titre principal
@@ -17,7 +19,7 @@ def show_page():
         return
     
     # Récupérer le DataFrame
-    df = st.session_state["df"]
+    df = get_dataset("df")
     
     # Section d'introduction
     st.markdown("""
@@ -28,20 +30,11 @@ def show_page():
     # Sélection des colonnes pour l'analyse
     st.header("1. Sélection des données pour l'analyse")
     
-    # Colonnes numériques et catégorielles
-    numerical_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
-    
-    if 'date_cols' not in st.session_state:
-        # Tentative de détection des colonnes de date
-        date_cols = []
-        for col in df.columns:
-            try:
-                if pd.to_datetime(df[col], errors='coerce').notna().any():
-                    date_cols.append(col)
-            except:
-                pass
-        st.session_state['date_cols'] = date_cols
+    # Colonnes numériques, catégorielles et de date, d'après le schéma détecté au chargement
+    schema = dataset_schema(df)
+    numerical_cols = columns_of_kind(schema, 'numeric', as_text=False)
+    categorical_cols = columns_of_kind(schema, 'categorical')
+    date_cols = columns_of_kind(schema, 'datetime')
     
     # Interface de sélection des colonnes
     col1, col2 = st.columns(2)
@@ -61,10 +54,10 @@ def show_page():
         )
     
     # Sélection de la colonne temporelle si disponible
-    if st.session_state['date_cols']:
+    if date_cols:
         time_col = st.selectbox(
             "Sélectionnez une colonne temporelle pour l'analyse d'évolution (optionnel)",
-            options=["Aucune"] + st.session_state['date_cols'],
+            options=["Aucune"] + date_cols,
             index=0
         )
     else:
@@ -75,11 +68,14 @@ def show_page():
     st.header("2. Filtres interactifs")
     
     # Création des filtres pour chaque dimension sélectionnée
-    filtered_df = df.copy()
+    # (index bitmap par dimension : les sélections sont combinées sans copie intermédiaire ;
+    # index partagé de la session, construit sur le DataFrame de la session et non sur sa copie)
+    df_index = get_dataset_index(st.session_state["df"])
+    selected_bits = None
     
     for dim in selected_dimension_cols:
-        # Obtenir les valeurs uniques
-        unique_values = filtered_df[dim].dropna().unique()
+        # Obtenir les valeurs uniques parmi les lignes déjà sélectionnées
+        unique_values = df_index.values(dim, selected_bits)
         
         # Créer un sélecteur multiple
         selected_values = st.multiselect(
@@ -90,7 +86,7 @@ def show_page():
         
         # Appliquer le filtre si l'utilisateur a sélectionné des valeurs
         if selected_values:
-            filtered_df = filtered_df[filtered_df[dim].isin(selected_values)]
+            selected_bits = df_index.select({dim: selected_values}, selected_bits)
     
     # Filtres pour les colonnes numériques
     if selected_metric_cols:
@@ -106,10 +102,12 @@ def show_page():
             )
         
         # Création du slider pour filtrer
-        if numeric_filter_col != "Aucune":
+        # (bornes et plage lues dans l'index trié de la colonne, parmi les lignes déjà sélectionnées)
+        bounds = df_index.bounds(numeric_filter_col, selected_bits) if numeric_filter_col != "Aucune" else None
+        if bounds is not None:
             with col2:
-                min_val = float(filtered_df[numeric_filter_col].min())
-                max_val = float(filtered_df[numeric_filter_col].max())
+                min_val = float(bounds[0])
+                max_val = float(bounds[1])
                 
                 # Ajuster le step en fonction de la plage
                 range_val = max_val - min_val
@@ -125,10 +123,10 @@ def show_page():
                 )
                 
                 # Appliquer le filtre
-                filtered_df = filtered_df[
-                    (filtered_df[numeric_filter_col] >= selected_range[0]) & 
-                    (filtered_df[numeric_filter_col] <= selected_range[1])
-                ]
+                selected_bits = df_index.select_ranges({numeric_filter_col: selected_range}, selected_bits)
+    
+    # Une seule extraction des lignes retenues
+    filtered_df = df_index.take(selected_bits)
     
     # Afficher un aperçu des données filtrées
     st.subheader("Aperçu des données filtrées")
@@ -176,7 +174,7 @@ def show_page():
                 if selected_metric_cols:
                     # Agrégation des données par dimension
                     agg_funcs = {col: 'mean' for col in selected_metric_cols}
-                    dim_data = filtered_df.groupby(dim).agg(agg_funcs).reset_index()
+                    dim_data = filtered_df.groupby(dim, observed=True).agg(agg_funcs).reset_index()
                     
                     # Visualisation des données
                     st.subheader(f"Analyse comparative par {dim}")
@@ -216,9 +214,9 @@ def show_page():
         
         # Préparer les données temporelles
         try:
-            # Convertir en datetime si ce n'est pas déjà le cas
+            # Convertir en datetime (avec le format détecté) si ce n'est pas déjà le cas
             if not pd.api.types.is_datetime64_any_dtype(filtered_df[time_col]):
-                filtered_df[time_col] = pd.to_datetime(filtered_df[time_col], errors='coerce')
+                filtered_df[time_col] = convert_column(filtered_df[time_col], schema[time_col])
             
             # Déterminer le niveau d'agrégation (jour, mois, année)
             time_resolution = st.selectbox(
@@ -245,7 +243,7 @@ def show_page():
             )
             
             # Agréger les données par période
-            time_data = filtered_df.groupby('period')[selected_time_metric].mean().reset_index()
+            time_data = filtered_df.groupby('period', observed=True)[selected_time_metric].mean().reset_index()
             time_data = time_data.sort_values('period')
             
             # Visualisation
@@ -325,7 +323,7 @@ def show_page():
             desc_stats = filtered_df[dist_metric].describe().reset_index()
             desc_stats.columns = ["Statistique", "Valeur"]
         else:
-            desc_stats = filtered_df.groupby(dist_dimension)[dist_metric].describe().reset_index()
+            desc_stats = filtered_df.groupby(dist_dimension, observed=True)[dist_metric].describe().reset_index()
         
         st.dataframe(desc_stats, use_container_width=True)
     
@@ -471,7 +469,7 @@ def show_page():
             )
             
             # Agréger par la dimension sélectionnée
-            analysis_data = filtered_df.groupby(dimension_for_analysis)[target_metric].mean().reset_index()
+            analysis_data = filtered_df.groupby(dimension_for_analysis, observed=True)[target_metric].mean().reset_index()
             
             # Identifier les opportunités et les risques
             analysis_data['statut'] = pd.cut(
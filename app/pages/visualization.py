@@ -1,10 +1,12 @@
 import io
 import streamlit as st
 import pandas as pd
-import pyodbc
 import plotly.express as px
 import numpy as np
 from datetime import datetime
+from data_engine.access import read_table
+from data_engine.schema import columns_of_kind, convert_column, dataset_schema
+from utils import get_dataset
 
 def show_page():
     st.title("📊 Tableau de Bord Analytique")
@@ -18,10 +20,10 @@ def show_page():
             file_type = "access"
         elif "df" in st.session_state and st.session_state["df"] is not None:
             file_type = "excel_csv"
-            df = st.session_state["df"].copy()
+            df = get_dataset("df")
         elif "df_merged" in st.session_state and st.session_state["df_merged"] is not None:
             file_type = "merged"
-            df = st.session_state["df_merged"].copy()
+            df = get_dataset("df_merged")
             st.info("Visualisation basée sur les données fusionnées. Utilisez l'onglet 'Fusion' pour modifier les sources.")
         
         # Si fichier Access
@@ -30,35 +32,31 @@ def show_page():
             
             if selected_table:
                 try:
-                    conn_str = f"DRIVER={{Microsoft Access Driver (*.mdb, *.accdb)}};DBQ={st.session_state['db_path']}"
-                    conn = pyodbc.connect(conn_str)
-                    df = pd.read_sql(f"SELECT * FROM [{selected_table}]", conn)
-                    conn.close()
+                    # Table relue depuis le cache (mémoire ou Parquet) tant que la base n'est pas modifiée
+                    df = read_table(st.session_state['db_path'], selected_table)
                 except Exception as e:
                     st.error(f"Erreur lors de la connexion à la base de données: {e}")
                     return
         
         # Si fichier Excel ou CSV et pas encore de df
         elif file_type == "excel_csv" and df is None:
-            df = st.session_state["df"].copy()
+            df = get_dataset("df")
             st.sidebar.info("Données chargées à partir d'un fichier Excel ou CSV")
         
         if df is not None and not df.empty:
-            # Préparation des données pour s'adapter à tous types de données
-            # Conversion automatique des colonnes qui peuvent être converties en nombres
-            for col in df.columns:
-                try:
-                    # Essayer de convertir en numérique, ignorer si échec
-                    df[col] = pd.to_numeric(df[col], errors='ignore')
-                except:
-                    pass
+            # Préparation des données pour s'adapter à tous types de données : le schéma
+            # (calculé une fois par jeu de données) indique les colonnes de nombres stockés
+            # en texte, seules converties
+            schema = dataset_schema(df)
+            for col in columns_of_kind(schema, 'numeric', as_text=True):
+                df[col] = convert_column(df[col], schema[col])
             
             # Liste des colonnes disponibles pour les graphiques
             all_columns = df.columns.tolist()
             
             # Identifier les colonnes numériques et catégorielles
-            num_columns = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-            cat_columns = df.select_dtypes(include=['object', 'string', 'category']).columns.tolist()
+            num_columns = columns_of_kind(schema, 'numeric')
+            cat_columns = columns_of_kind(schema, 'categorical', 'text')
             
             # Si pas de colonnes numériques, créer des colonnes calculées
             if not num_columns:
@@ -514,8 +512,7 @@ def show_page():
                                          template="plotly_white")
                             
                             if show_second_year and second_y and second_y in df.columns:
-                                temp_df = df.copy()
-                                fig = px.area(temp_df, x=x_col, y=[y_col, second_y], 
+                                fig = px.area(df, x=x_col, y=[y_col, second_y], 
                                              color_discrete_sequence=[color_primary, color_secondary],
                                              template="plotly_white")
                         else:  # scatter
@@ -623,7 +620,7 @@ def show_page():
                 if len(line_y) > 0 and line_x in df.columns and all(col in df.columns for col in line_y):
                     # Pour les graphiques en ligne, on peut agréger les données pour éviter les surcharges
                     try:
-                        line_df = df.groupby(line_x)[line_y].mean().reset_index()
+                        line_df = df.groupby(line_x, observed=True)[line_y].mean().reset_index()
                         
                         if line_type == "line":
                             fig = px.line(line_df, x=line_x, y=line_y, 
@@ -724,7 +721,7 @@ def show_page():
                     else:  # bar
                         if group_by != "Aucun" and group_by in df.columns:
                             # Agrégation pour graphique à barres
-                            agg_df = df.groupby(group_by)[boxplot_col].mean().reset_index()
+                            agg_df = df.groupby(group_by, observed=True)[boxplot_col].mean().reset_index()
                             fig = px.bar(agg_df, x=group_by, y=boxplot_col,
                                         color=group_by,
                                         color_discrete_sequence=[color_primary, color_secondary, "#2D7DD2", "#97CC04"])
@@ -1,5 +1,5 @@
  # Always show cycle analysis if available
-            if 'cycle' in filtered_data.columns and 'niveau' in filtered_data.columns:
+            if 'cycle' in filtered_cube.columns and 'niveau' in filtered_cube.columns:
                 st.markdown('<div class="dashboard-section animated-section">', unsafe_allow_html=True)
                 st.markdown('<div class="section-header">📚 Dashboard d\'Analyse par Cycle et Niveau</div>', unsafe_allow_html=True)
                 
@@ -8,7 +8,7 @@
                 with col1:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     # Abandons by cycle and niveau
-                    abandon_cycle_niveau = filtered_data[abandon_mask].groupby(['cycle', 'niveau']).size().reset_index(name='Abandons')
+                    abandon_cycle_niveau = kpis.series(['cycle', 'niveau'], 'Total_Abandons').reset_index(name='Abandons')
                     if not abandon_cycle_niveau.empty:
                         fig_cycle_niveau = px.bar(
                             abandon_cycle_niveau, x='niveau', y='Abandons', color='cycle',
@@ -27,7 +27,7 @@
                 with col2:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                     # Pie chart for cycle distribution
-                    abandon_cycle_data = filtered_data[abandon_mask].groupby('cycle').size().reset_index(name='Abandons')
+                    abandon_cycle_data = kpis.series('cycle', 'Total_Abandons').reset_index(name='Abandons')
                     if not abandon_cycle_data.empty:
                         fig_pie_cycle = create_enhanced_chart(
                             abandon_cycle_data, "pie", "cycle", "Abandons", "Répartition des Abandons par Cycle"
@@ -39,11 +39,7 @@
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                 st.markdown('<div class="chart-title">📖 Analyse Détaillée par Niveau</div>', unsafe_allow_html=True)
                 
-                niveau_stats = filtered_data.groupby('niveau').agg({
-                    'situation': ['count', lambda x: sum(x.isin([2, 5]))]
-                }).round(2)
-                niveau_stats.columns = ['Total_Étudiants', 'Total_Abandons']
-                niveau_stats['Taux_Abandon'] = (niveau_stats['Total_Abandons'] / niveau_stats['Total_Étudiants'] * 100).round(1)
+                niveau_stats = kpis.by('niveau')[['Total_Étudiants', 'Total_Abandons', 'Taux_Abandon']].round(1)
                 niveau_stats = niveau_stats.reset_index().sort_values('Taux_Abandon', ascending=False)
                 
                 if not niveau_stats.empty:
@@ -74,7 +70,7 @@
             with col1:
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                 # Distribution of social aids
-                aid_distribution = filtered_data[aides].sum().reset_index()
+                aid_distribution = kpis.aid_summary()['Bénéficiaires'].reset_index()
                 aid_distribution.columns = ['Type_Aide', 'Nombre_Bénéficiaires']
                 aid_distribution = aid_distribution.sort_values('Nombre_Bénéficiaires', ascending=False)
                 
@@ -100,22 +96,8 @@
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             st.markdown('<div class="chart-title">🔍 Analyse de Corrélation: Aides vs Abandons</div>', unsafe_allow_html=True)
             
-            # Create correlation data
-            correlation_data = []
-            for aide in aides:
-                aide_beneficiaries = filtered_data[filtered_data[aide] == 1]
-                total_with_aid = len(aide_beneficiaries)
-                abandons_with_aid = len(aide_beneficiaries[aide_beneficiaries['situation'].isin([2, 5])])
-                abandon_rate_with_aid = (abandons_with_aid / total_with_aid * 100) if total_with_aid > 0 else 0
-                
-                correlation_data.append({
-                    'Type_Aide': aide,
-                    'Bénéficiaires': total_with_aid,
-                    'Abandons': abandons_with_aid,
-                    'Taux_Abandon': abandon_rate_with_aid
-                })
-            
-            correlation_df = pd.DataFrame(correlation_data)
+            # Create correlation data (beneficiaries and abandons per aid, from the aid code histogram)
+            correlation_df = kpis.aid_summary().rename_axis('Type_Aide').reset_index()
             
             if not correlation_df.empty:
                 fig_correlation = px.scatter(
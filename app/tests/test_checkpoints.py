@@ -0,0 +1,56 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_engine import arrow_store, checkpoints
+from data_engine.arrow_store import is_memory_mapped, map_dataset
+from data_engine.checkpoints import (
+    CheckpointFrame,
+    flush_checkpoints,
+    remove_checkpoint,
+    restore_checkpoints,
+    save_checkpoint,
+    schedule_checkpoint,
+)
+
+
+def test_restored_checkpoint_is_a_lazy_memory_map(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_DIR", str(tmp_path))
+    df = pd.DataFrame({
+        "id": np.arange(1_000),
+        "moyenne": np.linspace(0, 20, 1_000),
+        "etablissement": pd.Series([f"E{i % 7}" for i in range(1_000)], dtype=object),
+    })
+    assert save_checkpoint("agent", "df", df, "eleves.csv")
+
+    frames, manifest = restore_checkpoints("agent")
+    # Rien n'est lu à la restauration : un simple emplacement
+    assert isinstance(frames["df"], CheckpointFrame)
+    assert manifest["df"]["rows"] == 1_000
+
+    restored = frames["df"].load()
+    assert all(is_memory_mapped(restored[col]) for col in restored.columns)
+    assert (restored["id"].to_numpy() == df["id"].to_numpy()).all()
+    assert list(restored["etablissement"].astype(object)) == list(df["etablissement"])
+
+
+def test_scheduled_checkpoint_reuses_the_arrow_store_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    monkeypatch.setattr(arrow_store, "ARROW_STORE_DIR", str(tmp_path / "store"))
+    df = map_dataset("empreinte", pd.DataFrame({"id": np.arange(100), "note": np.linspace(0, 20, 100)}))
+
+    schedule_checkpoint("agent", "df", df, "eleves.csv", source="empreinte")
+    # Écriture remplacée avant d'avoir commencé, puis suppression : seul "df" reste
+    schedule_checkpoint("agent", "df_filtered", df, "Données filtrées")
+    remove_checkpoint("agent", "df_filtered")
+    assert flush_checkpoints(timeout=10)
+
+    frames, _ = restore_checkpoints("agent")
+    assert list(frames) == ["df"]
+    # Même fichier que celui du magasin Arrow : rien n'a été réécrit
+    assert os.path.samefile(frames["df"].path, tmp_path / "store" / "empreinte.arrow")
+    assert (frames["df"].load()["id"].to_numpy() == np.arange(100)).all()
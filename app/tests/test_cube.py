@@ -0,0 +1,126 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_engine.indexes import DatasetIndex
+from pages.pages_yahya.aides import AIDES, AIDES_CODE_COLUMN, pack_aides
+from pages.pages_yahya.cube import COUNT_COLUMN, build_cube, rollup, slice_cube, total
+from pages.pages_yahya.kpi import KpiEngine
+
+
+def raw_students(rows=3_000, seed=0):
+    # Élèves synthétiques avec les colonnes d'aides d'origine (0/1, parfois manquantes)
+    rng = np.random.default_rng(seed)
+    communes = np.array(["Agadir", "Inezgane", "Tiznit", None], dtype=object)
+    df = pd.DataFrame({
+        "age": rng.integers(8, 20, rows),
+        "genre": pd.Categorical(rng.choice(["M", "F"], rows)),
+        "milieu": pd.Categorical(rng.choice(["Urbain", "Rural"], rows)),
+        "commune": communes[rng.integers(0, 4, rows)],
+        "cycle": pd.Categorical(rng.choice(["Primaire", "Collège", "Lycée"], rows)),
+        "situation": rng.choice([1, 2, 3, 5], rows, p=[0.7, 0.1, 0.1, 0.1]),
+    })
+    df["etab"] = df["commune"].fillna("?") + "-" + rng.integers(1, 4, rows).astype(str)
+    for aide in AIDES:
+        flags = rng.choice([0.0, 1.0, np.nan], rows, p=[0.6, 0.3, 0.1])
+        df[aide] = flags
+    return df
+
+
+def students_of(raw):
+    # Comme prepare_students : aides regroupées dans un code par élève
+    students = raw.drop(columns=AIDES)
+    students[AIDES_CODE_COLUMN] = pack_aides(raw)
+    return students
+
+
+def test_cube_counts_match_the_student_rows():
+    raw = raw_students()
+    cube = build_cube(students_of(raw))
+
+    assert total(cube) == len(raw)
+    assert len(cube) < len(raw)
+    # Valeurs manquantes gardées comme un membre à part : les totaux restent exacts
+    assert int(cube.loc[cube["commune"].isna(), COUNT_COLUMN].sum()) == int(raw["commune"].isna().sum())
+    expected = raw.groupby(["commune", "genre"], observed=True).size()
+    pd.testing.assert_series_equal(
+        rollup(cube, ["commune", "genre"]).sort_index(), expected.sort_index(), check_dtype=False, check_names=False
+    )
+
+
+def test_sliced_cube_matches_filtered_rows():
+    raw = raw_students()
+    cube = build_cube(students_of(raw))
+    index = DatasetIndex(cube)
+
+    sliced = slice_cube(index, (10, 14), {"milieu": ["Rural"], "commune": ["Agadir", "Tiznit"], "genre": []})
+    filtered = raw[
+        raw["age"].between(10, 14) & raw["milieu"].isin(["Rural"]) & raw["commune"].isin(["Agadir", "Tiznit"])
+    ]
+    assert total(sliced) == len(filtered)
+    expected = filtered.groupby("etab").size()
+    pd.testing.assert_series_equal(
+        rollup(sliced, "etab").sort_index(), expected.sort_index(), check_dtype=False, check_names=False
+    )
+    # Sans filtre : tout le cube
+    assert total(slice_cube(index)) == len(raw)
+
+
+def row_level_kpis(raw, by):
+    # Calcul d'origine, ligne par ligne sur les colonnes d'aides
+    aids = raw[AIDES].fillna(0) != 0
+    indicators = pd.DataFrame({
+        "Total_Étudiants": 1,
+        "Total_Abandons": raw["situation"].isin([2, 5]),
+        "Non_Réinscrits": raw["situation"] == 2,
+        "Quittent_École": raw["situation"] == 5,
+        "Bénéficiaires": aids.any(axis=1),
+        "Total_Aides": aids.sum(axis=1),
+    }, index=raw.index).astype(np.int64)
+    grouped = indicators.groupby(raw[by], observed=True).sum()
+    grouped["Taux_Abandon"] = grouped["Total_Abandons"] / grouped["Total_Étudiants"] * 100
+    grouped["Taux_Non_Réinscrits"] = grouped["Non_Réinscrits"] / grouped["Total_Étudiants"] * 100
+    grouped["Taux_Quittent_École"] = grouped["Quittent_École"] / grouped["Total_Étudiants"] * 100
+    grouped["Taux_Bénéficiaires"] = grouped["Bénéficiaires"] / grouped["Total_Étudiants"] * 100
+    return grouped
+
+
+def test_kpis_on_the_cube_match_row_level_groupby():
+    raw = raw_students()
+    students = students_of(raw)
+    engine = KpiEngine(build_cube(students))
+
+    for by in ["commune", "cycle", "age"]:
+        expected = row_level_kpis(raw, by)
+        result = engine.by(by)[expected.columns]
+        pd.testing.assert_frame_equal(
+            result.sort_index(), expected.sort_index(), check_dtype=False, check_names=False, check_categorical=False
+        )
+
+    totals = engine.totals()
+    expected = row_level_kpis(raw.assign(tous=0), "tous").iloc[0]
+    assert np.allclose([totals[name] for name in expected.index], expected.to_numpy())
+    # Même résultat que sur les lignes élèves (un élève par ligne)
+    assert KpiEngine(students).totals() == totals
+
+
+def test_aid_kpis_match_row_level_counts():
+    raw = raw_students()
+    engine = KpiEngine(build_cube(students_of(raw)))
+    aids = raw[AIDES].fillna(0) != 0
+    abandons = raw["situation"].isin([2, 5])
+
+    summary = engine.aid_summary()
+    assert summary["Bénéficiaires"].tolist() == aids.sum().tolist()
+    assert summary["Abandons"].tolist() == aids[abandons].sum().tolist()
+    assert np.allclose(summary["Taux_Abandon"], aids[abandons].sum() / aids.sum() * 100)
+
+    expected = aids.astype(np.int64).groupby(raw["cycle"], observed=True).sum()
+    pd.testing.assert_frame_equal(
+        engine.aids_by("cycle").sort_index(), expected.sort_index(),
+        check_dtype=False, check_names=False, check_categorical=False, check_index_type=False,
+    )
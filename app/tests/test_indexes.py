@@ -0,0 +1,81 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_engine.indexes import DatasetIndex
+
+
+def dataset(rows=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    communes = np.array(["Agadir", "Inezgane", "Tiznit", None], dtype=object)
+    return pd.DataFrame({
+        # Valeurs fréquentes (bitmaps) et rares (listes de lignes)
+        "commune": communes[rng.choice(4, rows, p=[0.5, 0.3, 0.19, 0.01])],
+        "etab": pd.Categorical(rng.integers(0, 400, rows).astype(str)),
+        "niveau": rng.integers(1, 7, rows),
+        "age": rng.integers(6, 20, rows),
+        "moyenne": np.where(rng.random(rows) < 0.05, np.nan, rng.uniform(0, 20, rows)),
+    })
+
+
+def test_select_matches_isin():
+    df = dataset()
+    index = DatasetIndex(df)
+    selections = [
+        {"commune": ["Tiznit"]},
+        {"commune": ["Agadir", "Inezgane"], "etab": ["7", "42", "399"]},
+        {"etab": ["12", "inconnu"], "niveau": [1, 2]},
+        {"commune": []},
+    ]
+    for selection in selections:
+        mask = np.ones(len(df), dtype=bool)
+        for col, values in selection.items():
+            if values:
+                mask &= df[col].isin(values).to_numpy()
+        result = index.take(index.select(selection))
+        pd.testing.assert_frame_equal(result, df[mask])
+    # Aucun filtre : toutes les lignes
+    assert index.select({"commune": []}) is None
+
+
+def test_values_among_selected_rows():
+    df = dataset()
+    index = DatasetIndex(df)
+    bits = index.select({"commune": ["Tiznit"]})
+    assert sorted(index.values("etab", bits)) == sorted(df.loc[df["commune"] == "Tiznit", "etab"].unique())
+    # Les valeurs manquantes ne sont pas une option
+    assert sorted(index.values("commune")) == ["Agadir", "Inezgane", "Tiznit"]
+
+
+def test_select_ranges_matches_between():
+    df = dataset()
+    index = DatasetIndex(df)
+    for ranges in [{"age": (10, 12)}, {"moyenne": (9.5, 14.25)}, {"age": (15, 30), "moyenne": (0, 10)}]:
+        mask = np.ones(len(df), dtype=bool)
+        for col, (low, high) in ranges.items():
+            mask &= df[col].between(low, high).to_numpy()
+        pd.testing.assert_frame_equal(index.take(index.select_ranges(ranges)), df[mask])
+
+    # Plages combinées avec une sélection
+    bits = index.select_ranges({"age": (8, 9)}, index.select({"commune": ["Agadir"]}))
+    expected = df[df["age"].between(8, 9) & (df["commune"] == "Agadir")]
+    pd.testing.assert_frame_equal(index.take(bits), expected)
+
+
+def test_full_range_and_bounds():
+    df = dataset()
+    index = DatasetIndex(df)
+    # Plage couvrant toute la colonne : aucun filtre
+    assert index.select_ranges({"age": (0, 100)}) is None
+    # Les valeurs manquantes sont exclues comme par une comparaison
+    assert len(index.take(index.select_ranges({"moyenne": (0, 20)}))) == int(df["moyenne"].notna().sum())
+
+    assert index.bounds("age") == (df["age"].min(), df["age"].max())
+    bits = index.select({"commune": ["Tiznit"]})
+    selected = df.loc[df["commune"] == "Tiznit", "moyenne"]
+    assert index.bounds("moyenne", bits) == (selected.min(), selected.max())
+    assert index.bounds("age", index.select({"etab": ["inconnu"]})) is None
@@ -0,0 +1,37 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_engine.ingestion import read_csv_chunked
+
+
+def csv_file(rows, late_values):
+    moyenne = np.round(np.linspace(0, 20, rows), 2).astype(object)
+    # Valeurs absentes de l'échantillon de typage, au-delà des premières lignes
+    moyenne[-len(late_values):] = late_values
+    df = pd.DataFrame({"id": np.arange(rows), "moyenne": moyenne, "cycle": ["Primaire", "Collège"] * (rows // 2)})
+    return io.BytesIO(df.to_csv(index=False).encode())
+
+
+def test_sentinel_after_the_sample_loads_like_read_csv():
+    file = csv_file(60_000, ["ND", "-"])
+    result = read_csv_chunked(file, chunk_rows=10_000)
+    file.seek(0)
+    expected = pd.read_csv(file)
+
+    assert len(result) == len(expected)
+    assert list(result["moyenne"].astype(str)[-2:]) == ["ND", "-"]
+    assert (result["moyenne"].astype(str) == expected["moyenne"].astype(str)).all()
+
+
+def test_missing_value_after_the_sample_keeps_floats():
+    file = csv_file(60_000, [np.nan])
+    result = read_csv_chunked(file, chunk_rows=10_000)
+    assert result["moyenne"].dtype == "float64"
+    assert result["moyenne"].isna().sum() == 1
+    assert isinstance(result["cycle"].dtype, pd.CategoricalDtype)
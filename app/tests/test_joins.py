@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_engine.arrow_store import open_mapped
+from data_engine.joins import hash_join
+from data_engine.partitioned_join import partitioned_join
+
+
+def categorical_tables():
+    # Clés texte compactées en catégories, avec des catégories différentes de chaque côté
+    left = pd.DataFrame({
+        "etab": pd.Categorical(["A", "B", "C", "A"]),
+        "eleves": [10, 20, 30, 40],
+    })
+    right = pd.DataFrame({
+        "etab": pd.Categorical(["B", "D", "E"]),
+        "commune": ["X", "Y", "Z"],
+    })
+    return left, right
+
+
+def test_outer_join_on_categorical_keys_with_different_categories():
+    left, right = categorical_tables()
+    result = hash_join(left, right, ["etab"], ["etab"], "outer")
+
+    assert list(result.columns) == ["etab", "eleves", "commune"]
+    assert list(result["etab"].astype(str)) == ["A", "B", "C", "A", "D", "E"]
+    assert list(result["commune"].fillna("-")) == ["-", "X", "-", "-", "Y", "Z"]
+
+
+def test_outer_join_on_categorical_and_text_keys():
+    left, right = categorical_tables()
+    right["etab"] = right["etab"].astype(str)
+    result = hash_join(left, right, ["etab"], ["etab"], "outer")
+    assert list(result["etab"].astype(str)) == ["A", "B", "C", "A", "D", "E"]
+
+
+def test_partitioned_outer_join_on_categorical_keys(tmp_path):
+    left, right = categorical_tables()
+    output = str(tmp_path / "out.arrow")
+    report = partitioned_join([left], [right], ["etab"], ["etab"], output, "outer", partitions=2)
+
+    result = open_mapped(output)
+    assert report["rows"] == len(result) == 6
+    assert sorted(result["etab"].astype(str)) == ["A", "A", "B", "C", "D", "E"]
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_engine.arrow_store import open_mapped
+from data_engine.joins import hash_join
+from data_engine.partitioned_join import partition_numbers, partitioned_join
+
+
+def chunks(df, rows):
+    for start in range(0, len(df), rows):
+        yield df.iloc[start:start + rows].reset_index(drop=True)
+
+
+def test_integer_keys_split_again_at_each_depth():
+    keys = [pd.Series(np.arange(100_000))]
+    first = partition_numbers(keys, 8, depth=0)
+    # Lignes d'une même partition : la passe suivante doit les répartir sur toutes les sous-partitions
+    same = first == 0
+    second = partition_numbers([keys[0][same]], 8, depth=1)
+    counts = np.bincount(second, minlength=8)
+    assert (counts > 0).all()
+    assert counts.max() < same.sum() * 0.2
+
+
+def test_equal_integer_and_float_keys_share_a_partition():
+    for depth in range(3):
+        left = partition_numbers([pd.Series([1, 2, 3])], 16, depth)
+        right = partition_numbers([pd.Series([1.0, 2.0, 3.0])], 16, depth)
+        assert (left == right).all()
+
+
+def test_repartitioned_integer_join_matches_in_memory_join(tmp_path, caplog):
+    rng = np.random.default_rng(0)
+    left = pd.DataFrame({"id": np.arange(20_000), "a": rng.random(20_000)})
+    right = pd.DataFrame({"id": np.arange(20_000) + 5_000, "b": rng.random(20_000)})
+    output = str(tmp_path / "out.arrow")
+    # Budget minuscule : chaque paire de partitions est répartie de nouveau
+    report = partitioned_join(
+        chunks(left, 3_000), chunks(right, 3_000), ["id"], ["id"], output, "outer",
+        memory_budget=200_000, partitions=4,
+    )
+    assert report["partitions"] > 4
+    # Aucune paire jointe au-delà du budget : les nouvelles répartitions ont bien divisé les partitions
+    assert not [record for record in caplog.records if "au-delà du budget" in record.getMessage()]
+
+    result = open_mapped(output)
+    expected = hash_join(left, right, ["id"], ["id"], "outer")
+    assert len(result) == len(expected) == report["rows"]
+    result = result.astype("float64").sort_values("id").reset_index(drop=True)
+    expected = expected.astype("float64").sort_values("id").reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected)
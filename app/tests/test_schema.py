@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_engine.schema import columns_of_kind, convert_column, dataset_schema, infer_schema
+
+
+def test_id_like_numeric_columns():
+    rows = 1_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        # Entiers distincts au nom d'identifiant : des identifiants
+        "id_eleve": np.arange(rows),
+        "code_massar": np.arange(rows) + 10 ** 9,
+        # Entiers distincts sans nom d'identifiant : une mesure
+        "revenu": rng.permutation(rows) * 37,
+        # Nom d'identifiant mais valeurs répétées : un nombre (code de niveau...)
+        "code_niveau": rng.integers(1, 7, rows),
+        # Décimaux distincts au nom d'identifiant : pas un identifiant
+        "id_score": rng.random(rows),
+        # Identifiants saisis comme texte, avec des zéros en tête
+        "cd_etab": [f"{i:06d}" for i in range(rows)],
+        "age": rng.integers(6, 20, rows),
+    })
+    schema = infer_schema(df)
+
+    assert columns_of_kind(schema, "id") == ["id_eleve", "code_massar", "cd_etab"]
+    assert columns_of_kind(schema, "numeric") == ["revenu", "code_niveau", "id_score", "age"]
+    assert schema["cd_etab"]["stored_as_text"]
+    assert not schema["id_eleve"]["stored_as_text"]
+
+
+def test_text_columns_holding_numbers_and_dates():
+    df = pd.DataFrame({
+        "moyenne": ["12,5", "8,25", "15"] * 100,
+        "date_naissance": ["01/09/2010", "15/03/2011", "30/12/2009"] * 100,
+        "commune": pd.Categorical(["Agadir", "Tiznit", "Inezgane"] * 100),
+    })
+    schema = dataset_schema(df)
+
+    assert schema["moyenne"]["kind"] == "numeric" and schema["moyenne"]["decimal"] == ","
+    assert schema["date_naissance"]["kind"] == "datetime" and schema["date_naissance"]["format"] == "%d/%m/%Y"
+    assert schema["commune"]["kind"] == "categorical"
+    assert convert_column(df["moyenne"], schema["moyenne"]).tolist()[:3] == [12.5, 8.25, 15.0]
+    # Schéma calculé une fois par jeu de données
+    assert dataset_schema(df) is schema
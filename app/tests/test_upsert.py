@@ -0,0 +1,109 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_engine.indexes import DatasetIndex
+from data_engine.upsert import upsert_frames
+from pages.pages_yahya.cube import COUNT_COLUMN, CUBE_DIMENSIONS, build_cube, update_cube
+
+
+def base_frame():
+    return pd.DataFrame({
+        "id": np.arange(6, dtype=np.int32),
+        "commune": pd.Categorical(["A", "B", "A", "C", "B", "A"]),
+        "age": np.array([10, 11, 12, 10, 11, 12], dtype=np.int8),
+        "situation": np.array([1, 1, 2, 1, 5, 1], dtype=np.int8),
+    })
+
+
+def test_upsert_updates_in_place_and_appends_new_keys():
+    base = base_frame()
+    delta = pd.DataFrame({
+        "id": [4, 9, 1, 4],
+        "commune": ["D", "A", "C", "B"],
+        "age": [13, 14, 15, 16],
+        "situation": [1, 2, 1, 1],
+    })
+    merged, info = upsert_frames(base, delta, "id")
+
+    # Lignes mises à jour à leur place (dernière ligne du delta pour une clé répétée), nouvelle clé à la fin
+    assert merged["id"].tolist() == [0, 1, 2, 3, 4, 5, 9]
+    assert merged["commune"].astype(str).tolist() == ["A", "C", "A", "C", "B", "A", "A"]
+    assert merged["age"].tolist() == [10, 15, 12, 10, 16, 12, 14]
+    assert info["updated_rows"].tolist() == [1, 4]
+    assert info["new_rows"].tolist() == [1, 4, 6]
+    assert info["inserted"] == 1
+    assert info["replaced"]["id"].tolist() == [1, 4]
+
+
+def test_upsert_keeps_the_loaded_dtypes():
+    base = base_frame()
+    delta = pd.DataFrame({
+        "id": np.array([2, 7], dtype=np.int64),
+        "commune": ["Z", "A"],
+        "age": np.array([9, 8], dtype=np.int16),
+        "situation": np.array([1, 300], dtype=np.int16),
+    })
+    merged, _ = upsert_frames(base, delta, "id")
+
+    assert isinstance(merged["commune"].dtype, pd.CategoricalDtype)
+    assert merged["commune"].astype(str).tolist()[-1] == "A"
+    assert merged.loc[2, "commune"] == "Z"
+    assert merged["age"].dtype == np.int8
+    assert merged["id"].dtype == np.int32
+    # Valeur hors de la plage de int8 : la colonne est élargie plutôt que tronquée
+    assert merged["situation"].tolist()[-1] == 300
+
+
+def test_upserted_index_matches_a_rebuilt_index():
+    rng = np.random.default_rng(0)
+    base = pd.DataFrame({
+        "id": np.arange(2_000),
+        "commune": pd.Categorical(rng.choice(list("ABCDE"), 2_000)),
+        "age": rng.integers(6, 20, 2_000),
+    })
+    index = DatasetIndex(base)
+    index.select({"commune": ["A"]})
+    index.select_ranges({"age": (8, 12)})
+
+    delta = pd.DataFrame({
+        "id": np.concatenate([rng.choice(2_000, 100, replace=False), np.arange(2_000, 2_050)]),
+        "commune": rng.choice(list("ABCF"), 150),
+        "age": rng.integers(6, 25, 150),
+    })
+    merged, info = upsert_frames(base, delta, "id")
+    updated = index.upserted(merged, info["updated_rows"])
+    rebuilt = DatasetIndex(merged)
+
+    for selection in [{"commune": ["A"]}, {"commune": ["F", "B"]}]:
+        assert (updated.select(selection) == rebuilt.select(selection)).all()
+    for age_range in [(8, 12), (20, 24)]:
+        bits = updated.select_ranges({"age": age_range})
+        pd.testing.assert_frame_equal(updated.take(bits), merged[merged["age"].between(*age_range)])
+    assert updated.bounds("age") == rebuilt.bounds("age")
+
+
+def test_update_cube_drops_emptied_combinations():
+    base = base_frame()
+    cube = build_cube(base)
+    # L'élève 3 (seul de la commune C) change de commune, l'élève 9 arrive
+    delta = pd.DataFrame({"id": [3, 9], "commune": ["A", "E"], "age": [10, 11], "situation": [1, 1]})
+    merged, info = upsert_frames(base, delta, "id")
+    updated, appended, dropped = update_cube(cube, info["replaced"], merged.take(info["new_rows"]))
+
+    assert (updated[COUNT_COLUMN] > 0).all()
+    assert "C" not in updated["commune"].astype(str).tolist()
+    assert cube.loc[dropped, "commune"].astype(str).tolist() == ["C"]
+    assert updated.loc[appended, "commune"].astype(str).tolist() == ["E"]
+
+    # Même contenu qu'un cube reconstruit depuis les lignes fusionnées
+    dimensions = [dim for dim in CUBE_DIMENSIONS if dim in cube.columns]
+    expected = build_cube(merged)
+    normalize = lambda frame: (  # noqa: E731
+        frame.astype({dim: str for dim in dimensions}).sort_values(dimensions).reset_index(drop=True)
+    )
+    pd.testing.assert_frame_equal(normalize(updated), normalize(expected), check_dtype=False)
@@ -1,12 +1,34 @@
 import base64
 import json
 import os
+import time
 from datetime import datetime
+import pandas as pd
 import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from data_engine.checkpoints import prune_checkpoints, remove_checkpoint, restore_checkpoints, schedule_checkpoint
+from data_engine.indexes import DatasetIndex
+from data_engine.jobs import cancel_inactive_jobs
+from data_engine.spill import (
+    GLOBAL_MEMORY_BUDGET, SESSION_MEMORY_BUDGET, SpilledFrame, frames_to_spill, memory_by_key,
+    record_usage, remove_inactive_spills, spill_frame,
+)
+from data_engine.store import release_inactive_sessions
+
+# Copy-on-Write : une copie superficielle partage les données du DataFrame d'origine et ne
+# duplique une colonne qu'au moment où elle est modifiée (toujours actif à partir de pandas 3.0)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 # Define the path for the users database
 USERS_DB_PATH = "users.json"
 
+# Objets de données d'une session comptés dans son budget mémoire
+SESSION_DATA_KEYS = ["df", "df_filtered", "df_merged", "saved_dashboards"]
+# DataFrames dérivés pouvant être écrits sur disque quand le budget est dépassé
+SPILLABLE_FRAMES = ["df_filtered", "df_merged"]
+
 def get_users():
     """Load the users database from JSON file"""
     if os.path.exists(USERS_DB_PATH):
@@ -687,3 +709,124 @@ def display_enhanced_filter_options():
         st.session_state["show_filter_numeric"] = not st.session_state["show_filter_numeric"]
         st.session_state["show_filter_category"] = False
         st.rerun()
+
+# Function to display a byte count in a human readable form
+def format_bytes(num_bytes):
+    """Format a size in bytes as a short human readable string (Ko, Mo, Go)"""
+    size = float(num_bytes)
+    for unit in ["o", "Ko", "Mo", "Go"]:
+        if abs(size) < 1024 or unit == "Go":
+            return f"{size:,.1f} {unit}" if unit != "o" else f"{int(size)} {unit}"
+        size /= 1024
+
+# Function to get the bitmap filter index of a dataset, kept in session state
+def get_dataset_index(df, key="df_index"):
+    """Return the DatasetIndex of df stored in session state, rebuilt when the dataset changes"""
+    index = st.session_state.get(key)
+    if index is None or index.df is not df:
+        index = DatasetIndex(df)
+        st.session_state[key] = index
+    return index
+
+def get_dataset(key="df"):
+    """
+    Read a dataset held in session state (None when absent).
+    The session frame is never modified in place: pages get a shallow copy that
+    shares its data, and a column is only copied when the page changes it.
+    A frame spilled to disk by the memory budget is reloaded transparently.
+    """
+    df = st.session_state.get(key)
+    if isinstance(df, SpilledFrame):
+        df = df.load()
+        st.session_state[key] = df
+    st.session_state.setdefault("frame_access", {})[key] = time.time()
+    return None if df is None else df.copy(deep=False)
+
+def current_session_id():
+    """Id of the browser session running the script (None outside a Streamlit run)"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+def release_ended_sessions():
+    """Release the shared datasets, spill files and background jobs of sessions that are no longer connected"""
+    if not Runtime.exists():
+        return 0
+    remove_inactive_spills(Runtime.instance().is_active_session)
+    cancel_inactive_jobs(Runtime.instance().is_active_session)
+    return release_inactive_sessions(Runtime.instance().is_active_session)
+
+def enforce_memory_budget():
+    """
+    Account the memory of the session's data objects and spill the least recently
+    used derived frames to disk while the session (or the whole process) is over budget.
+    Returns the memory per object, after spilling.
+    """
+    session_id = current_session_id()
+    usage = memory_by_key({key: st.session_state.get(key) for key in SESSION_DATA_KEYS})
+    total = record_usage(session_id, sum(usage.values()))
+
+    # Au-delà du budget global, la session rend au moins sa part du dépassement
+    budget = SESSION_MEMORY_BUDGET
+    if total > GLOBAL_MEMORY_BUDGET:
+        budget = min(budget, max(sum(usage.values()) - (total - GLOBAL_MEMORY_BUDGET), 0))
+
+    last_access = st.session_state.get("frame_access", {})
+    for key in frames_to_spill(usage, last_access, SPILLABLE_FRAMES, budget):
+        spilled = spill_frame(session_id, key, st.session_state[key])
+        if spilled is not None:
+            st.session_state[key] = spilled
+            usage[key] = 0
+
+    record_usage(session_id, sum(usage.values()))
+    return usage
+
+def show_memory_usage():
+    """Sidebar indicator of the session's memory use against its budget"""
+    usage = enforce_memory_budget()
+    total = sum(usage.values())
+    st.sidebar.progress(
+        min(total / SESSION_MEMORY_BUDGET, 1.0),
+        text=f"💾 Mémoire de la session : {format_bytes(total)} / {format_bytes(SESSION_MEMORY_BUDGET)}",
+    )
+    spilled = [key for key in SPILLABLE_FRAMES if isinstance(st.session_state.get(key), SpilledFrame)]
+    if spilled:
+        st.sidebar.caption(f"Sur disque (rechargé à la demande) : {', '.join(spilled)}")
+
+def checkpoint_dataset(key, df, name="", source=None):
+    """
+    Checkpoint a session dataset for the logged-in user, so it survives a server restart.
+    The file is written by a background thread; source is the Arrow store key of a
+    memory-mapped dataset, whose file is reused instead of written again.
+    """
+    username = st.session_state.get("username")
+    if not username:
+        return False
+    if df is None:
+        remove_checkpoint(username, key)
+        return True
+    schedule_checkpoint(username, key, df, name, source)
+    return True
+
+def restore_session_datasets():
+    """
+    Put the logged-in user's checkpointed datasets back in session state, once per login.
+    Nothing is read here: each dataset stays a placeholder until a page reads it
+    through get_dataset, which memory-maps the file. Returns the restored entries.
+    """
+    username = st.session_state.get("username")
+    if not username or st.session_state.get("checkpoints_user") == username:
+        return []
+    st.session_state["checkpoints_user"] = username
+    prune_checkpoints()
+
+    frames, manifest = restore_checkpoints(username)
+    restored = []
+    for key, frame in frames.items():
+        if st.session_state.get(key) is not None:
+            continue
+        st.session_state[key] = frame
+        restored.append(manifest[key])
+    if st.session_state.get("df") is not None and st.session_state.get("df_filtered") is None:
+        # Sans filtre sauvegardé, les données filtrées sont les données brutes (même fichier mappé)
+        st.session_state["df_filtered"] = st.session_state["df"]
+    return restored